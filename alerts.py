@@ -0,0 +1,97 @@
+"""Объединение повторяющихся ошибок в сводные уведомления."""
+import os
+import re
+import time
+from collections import deque
+
+ALERT_WINDOW = int(os.getenv('ALERT_WINDOW', 3600))
+
+NUMBER_PATTERN = re.compile(r'\b0x[0-9a-f]+\b|\d+', re.IGNORECASE)
+MAPPING_PATTERN = re.compile(r'\{[^{}]*\}')
+SECRET_PATTERN = re.compile(r'\b(OAuth|Bearer)\s+(?!\*\*\*)[^\s\'",}]+'
+                            r'|(?<!\d)\d+:[\w-]{30,}')
+SUMMARY_MESSAGE = '{name} x{count} за последние {minutes} мин: {sample}'
+
+
+def redact(text):
+    """Текст без токенов ЯП и Телеграма."""
+    return SECRET_PATTERN.sub(
+        lambda match: f'{match.group(1)} ***' if match.group(1) else '***',
+        text)
+
+
+def fingerprint(error):
+    """Отпечаток ошибки: тип и текст без параметров запроса и чисел.
+
+    Заголовки и параметры запроса у каждого пользователя свои,
+    поэтому словари из текста ошибки в отпечаток не попадают.
+    """
+    text = MAPPING_PATTERN.sub('{}', redact(str(error)))
+    return type(error).__name__, NUMBER_PATTERN.sub('<N>', text)[:200]
+
+
+class ErrorAggregator:
+    """Скользящее окно ошибок с подавлением повторов.
+
+    О первой ошибке с новым отпечатком сообщается сразу, повторы
+    только считаются; по истечении окна отправляется одна сводка.
+    """
+
+    def __init__(self, window=ALERT_WINDOW, clock=time.monotonic):
+        self.window = window
+        self.clock = clock
+        self.events = {}
+        self.alerted_at = {}
+        self.suppressed = {}
+        self.samples = {}
+
+    def prune(self, key, now):
+        """Удаление событий, вышедших из окна."""
+        events = self.events[key]
+        while events and events[0] <= now - self.window:
+            events.popleft()
+
+    def summary(self, key):
+        """Текст сводки по отпечатку."""
+        return SUMMARY_MESSAGE.format(
+            name=key[0], count=len(self.events[key]),
+            minutes=self.window // 60, sample=self.samples[key])
+
+    def record(self, error, message=None):
+        """Учёт ошибки; возвращает текст уведомления или None."""
+        key = fingerprint(error)
+        now = self.clock()
+        self.events.setdefault(key, deque()).append(now)
+        self.prune(key, now)
+        self.samples[key] = redact(message or str(error))
+        if key not in self.alerted_at:
+            self.alerted_at[key] = now
+            self.suppressed[key] = 0
+            return self.samples[key]
+        if now - self.alerted_at[key] >= self.window:
+            self.alerted_at[key] = now
+            self.suppressed[key] = 0
+            return self.summary(key)
+        self.suppressed[key] += 1
+        return None
+
+    def pending(self):
+        """Сводки по ошибкам, окно которых истекло без новых уведомлений.
+
+        Отпечатки без событий в окне забываются.
+        """
+        now = self.clock()
+        summaries = []
+        for key in list(self.events):
+            self.prune(key, now)
+            if now - self.alerted_at[key] < self.window:
+                continue
+            if self.suppressed[key]:
+                summaries.append(self.summary(key))
+                self.alerted_at[key] = now
+                self.suppressed[key] = 0
+            elif not self.events[key]:
+                for storage in (self.events, self.alerted_at,
+                                self.suppressed, self.samples):
+                    del storage[key]
+        return summaries
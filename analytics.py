@@ -0,0 +1,220 @@
+"""Аналитика проверок по журналу переходов статусов.
+
+Запуск из корня репозитория::
+
+    python analytics.py --db events.sqlite3 --days 30
+
+Переходы из журнала `events` загружаются в массивы NumPy, все агрегаты
+считаются векторно: время от взятия на ревью до вердикта, доля
+возвратов по работам и нагрузка на ревьюеров по часам суток.
+"""
+import argparse
+import sqlite3
+import time
+from collections import namedtuple
+from operator import itemgetter
+
+import numpy as np
+
+from events import EVENTS_DB
+
+REVIEWING = 'reviewing'
+VERDICTS = ('approved', 'rejected')
+HOURS = 24
+
+Events = namedtuple('Events', (
+    'homework', 'name', 'new_status', 'updated_at', 'names', 'statuses'
+))
+Latency = namedtuple('Latency', ('verdict', 'name', 'seconds'))
+
+LATENCY_LINE = ('{verdict}: {count} проверок, медиана {median:.1f} ч, '
+                '90% за {p90:.1f} ч, в среднем {mean:.1f} ч')
+HOMEWORK_LINE = ('{name}: {reviews} проверок, возвратов {rate:.0%}, '
+                 'медиана проверки {median:.1f} ч')
+HOUR_LINE = '{hour:02d}:00 {count:>8} {bar}'
+REPORT = ('Переходов: {events}, работ: {homeworks}\n\n'
+          'Время проверки\n{latency}\n\n'
+          'Работы с наибольшей долей возвратов\n{rejections}\n\n'
+          'Вердикты по часам суток (UTC{offset:+d})\n{load}')
+NO_DATA = 'нет данных'
+
+
+def encode(values):
+    """Коды значений в порядке первого появления и таблица значений.
+
+    Словарь быстрее `np.unique` на строках: не нужна сортировка.
+    """
+    table = {}
+    codes = np.fromiter((table.setdefault(value, len(table))
+                         for value in values), np.int32, len(values))
+    return codes, list(table)
+
+
+def load_events(path=EVENTS_DB, since=0.0):
+    """Переходы из журнала начиная с `since` в виде массивов.
+
+    Строки выбираются одним запросом и раскладываются по колонкам;
+    строки (пользователь и работа, имя работы, статус) заменяются
+    целочисленными кодами.
+    """
+    query = ("SELECT tenant || char(0) || homework, coalesce(name, homework),"
+             ' new_status, updated_at FROM events')
+    # Весь журнал быстрее читать подряд, чем через индекс по времени.
+    where, params = (' WHERE updated_at >= ?', (since,)) if since else ('', ())
+    connection = sqlite3.connect(path)
+    try:
+        rows = connection.execute(query + where, params).fetchall()
+    finally:
+        connection.close()
+    homework, _ = encode(list(map(itemgetter(0), rows)))
+    name, names = encode(list(map(itemgetter(1), rows)))
+    status, statuses = encode(list(map(itemgetter(2), rows)))
+    updated_at = np.fromiter(map(itemgetter(3), rows), np.float64, len(rows))
+    return Events(homework, name, status, updated_at,
+                  np.array(names, dtype=str), np.array(statuses, dtype=str))
+
+
+def status_codes(events, statuses):
+    """Коды статусов в наборе; отсутствующие статусы пропускаются."""
+    return np.flatnonzero(np.isin(events.statuses, statuses))
+
+
+def group_order(groups, values):
+    """Порядок по группам, внутри группы — по значениям.
+
+    То же, что `np.lexsort((values, groups))`, но быстрее: устойчивая
+    сортировка целых кодов групп идёт поразрядно.
+    """
+    order = np.argsort(values)
+    return order[np.argsort(groups[order], kind='stable')]
+
+
+def review_latency(events):
+    """Проверки: вердикт, имя работы и время от взятия на ревью.
+
+    Переходы каждой работы упорядочиваются по времени; проверкой
+    считается пара соседних переходов «→ reviewing», «→ вердикт».
+    """
+    order = group_order(events.homework, events.updated_at)
+    homework = events.homework[order]
+    status = events.new_status[order]
+    updated_at = events.updated_at[order]
+    reviewing = status_codes(events, [REVIEWING])
+    pairs = ((homework[1:] == homework[:-1])
+             & np.isin(status[:-1], reviewing)
+             & np.isin(status[1:], status_codes(events, VERDICTS)))
+    return Latency(status[1:][pairs], events.name[order][1:][pairs],
+                   updated_at[1:][pairs] - updated_at[:-1][pairs])
+
+
+def latency_summary(seconds):
+    """Число проверок и их длительность в часах."""
+    if not len(seconds):
+        return None
+    hours = seconds / 3600
+    median, p90 = np.percentile(hours, [50, 90])
+    return {'count': len(hours), 'median': median, 'p90': p90,
+            'mean': hours.mean()}
+
+
+def group_medians(groups, values, size):
+    """Медиана `values` в каждой группе (NaN для пустых групп)."""
+    order = group_order(groups, values)
+    counts = np.bincount(groups, minlength=size)
+    starts = np.cumsum(counts) - counts
+    medians = np.full(size, np.nan)
+    present = counts > 0
+    low = starts[present] + (counts[present] - 1) // 2
+    high = starts[present] + counts[present] // 2
+    ordered = values[order]
+    medians[present] = (ordered[low] + ordered[high]) / 2
+    return medians
+
+
+def rejection_rates(events, latency=None):
+    """Проверки, доля возвратов и медиана проверки по именам работ.
+
+    Возвращает массивы, индексированные кодом имени работы.
+    """
+    latency = review_latency(events) if latency is None else latency
+    size = len(events.names)
+    verdicts = np.isin(events.new_status, status_codes(events, VERDICTS))
+    rejected = np.isin(events.new_status, status_codes(events, ['rejected']))
+    reviews = np.bincount(events.name[verdicts], minlength=size)
+    returns = np.bincount(events.name[rejected], minlength=size)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        rates = returns / reviews
+    medians = group_medians(latency.name, latency.seconds / 3600, size)
+    return reviews, rates, medians
+
+
+def load_by_hour(events, utc_offset=0):
+    """Число вердиктов по часам суток со сдвигом `utc_offset` часов."""
+    verdicts = np.isin(events.new_status, status_codes(events, VERDICTS))
+    hours = ((events.updated_at[verdicts] // 3600 + utc_offset)
+             % HOURS).astype(np.int64)
+    return np.bincount(hours, minlength=HOURS)
+
+
+def build_report(events, top=10, utc_offset=0):
+    """Текстовый отчёт по набору переходов."""
+    latency = review_latency(events)
+    lines = []
+    for verdict in [None, *VERDICTS]:
+        seconds = latency.seconds
+        if verdict is not None:
+            seconds = seconds[np.isin(latency.verdict,
+                                      status_codes(events, [verdict]))]
+        summary = latency_summary(seconds)
+        if summary:
+            lines.append(LATENCY_LINE.format(verdict=verdict or 'все',
+                                             **summary))
+    reviews, rates, medians = rejection_rates(events, latency)
+    reviewed = np.flatnonzero(reviews)
+    worst = reviewed[np.lexsort((-reviews[reviewed],
+                                 -rates[reviewed]))][:top]
+    load = load_by_hour(events, utc_offset)
+    scale = 40 / max(load.max(initial=0), 1)
+    return REPORT.format(
+        events=len(events.updated_at),
+        homeworks=len(np.unique(events.homework)),
+        latency='\n'.join(lines) or NO_DATA,
+        rejections='\n'.join(
+            HOMEWORK_LINE.format(name=events.names[code],
+                                 reviews=reviews[code], rate=rates[code],
+                                 median=medians[code])
+            for code in worst
+        ) or NO_DATA,
+        offset=utc_offset,
+        load='\n'.join(
+            HOUR_LINE.format(hour=hour, count=count,
+                             bar='#' * round(count * scale))
+            for hour, count in enumerate(load)
+        )
+    )
+
+
+def parse_args(args=None):
+    """Разбор аргументов командной строки."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--db', default=EVENTS_DB,
+                        help='файл журнала переходов')
+    parser.add_argument('--days', type=float,
+                        help='только переходы за последние дни')
+    parser.add_argument('--top', type=int, default=10,
+                        help='число работ в таблице возвратов')
+    parser.add_argument('--utc-offset', type=int, default=3,
+                        help='часовой пояс для нагрузки по часам')
+    return parser.parse_args(args)
+
+
+def main(args=None):
+    """Загрузка журнала и вывод отчёта."""
+    options = parse_args(args)
+    since = 0.0 if options.days is None else time.time() - options.days * 86400
+    events = load_events(options.db, since)
+    print(build_report(events, options.top, options.utc_offset))
+
+
+if __name__ == '__main__':
+    main()
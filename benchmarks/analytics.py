@@ -0,0 +1,109 @@
+"""Бенчмарк аналитики проверок на синтетическом журнале.
+
+Запуск из корня репозитория::
+
+    python -m benchmarks.analytics --events 1000000 5000000
+
+Генерирует переходы «reviewing → вердикт» для множества работ
+и замеряет загрузку журнала из SQLite (`--load`) и расчёт отчёта
+`build_report`.
+"""
+import argparse
+import os
+import sqlite3
+import tempfile
+import time
+
+import numpy as np
+
+from analytics import Events, build_report, load_events
+from events import SCHEMA
+
+REPORT = ('переходов: {events}\n'
+          'загрузка из SQLite: {load}\n'
+          'отчёт: {report_s:.2f} с ({report_ns:.0f} нс/переход)')
+STATUSES = np.array(['approved', 'rejected', 'reviewing'])
+NAMES = 40
+DAY = 86400
+
+
+def make_events(count, rng):
+    """Переходы: у каждой работы чередуются ревью и вердикты."""
+    per_homework = 4
+    homeworks = max(count // per_homework, 1)
+    homework = np.repeat(np.arange(homeworks, dtype=np.int32),
+                         per_homework)[:count]
+    step = np.tile(np.arange(per_homework), homeworks)[:count]
+    verdict = np.where(rng.random(count) < 0.3, 1, 0)
+    new_status = np.where(step % 2 == 0, 2, verdict).astype(np.int32)
+    started = rng.uniform(0, 180 * DAY, homeworks)[homework]
+    updated_at = started + step * rng.exponential(DAY, count)
+    name = (homework % NAMES).astype(np.int32)
+    return Events(homework, name, new_status, updated_at,
+                  np.array([f'hw{index:02d}' for index in range(NAMES)]),
+                  STATUSES)
+
+
+def write_database(events, path):
+    """Журнал `events` в SQLite из синтетических переходов."""
+    connection = sqlite3.connect(path)
+    try:
+        connection.executescript(SCHEMA)
+        with connection:
+            connection.executemany(
+                'INSERT INTO events (tenant, homework, name, new_status,'
+                ' updated_at) VALUES (?, ?, ?, ?, ?)',
+                zip(map(str, events.homework.tolist()),
+                    map(str, events.homework.tolist()),
+                    events.names[events.name].tolist(),
+                    events.statuses[events.new_status].tolist(),
+                    events.updated_at.tolist())
+            )
+    finally:
+        connection.close()
+
+
+def measure_load(events):
+    """Время загрузки журнала из временной базы, в секундах."""
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'events.sqlite3')
+        write_database(events, path)
+        started = time.perf_counter()
+        load_events(path)
+        return time.perf_counter() - started
+
+
+def run_benchmark(events=1000000, load=False, seed=None):
+    """Замер расчёта отчёта; возвращает отчёт."""
+    data = make_events(events, np.random.default_rng(seed))
+    started = time.perf_counter()
+    build_report(data)
+    elapsed = time.perf_counter() - started
+    return {
+        'events': events,
+        'load': f'{measure_load(data):.2f} с' if load else 'не замерялась',
+        'report_s': elapsed,
+        'report_ns': elapsed / events * 1e9,
+    }
+
+
+def parse_args(args=None):
+    """Разбор аргументов командной строки."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--events', type=int, nargs='+', default=[1000000])
+    parser.add_argument('--load', action='store_true',
+                        help='замерить и загрузку журнала из SQLite')
+    parser.add_argument('--seed', type=int)
+    return parser.parse_args(args)
+
+
+def main(args=None):
+    """Запуск бенчмарка и вывод отчёта."""
+    options = parse_args(args)
+    for events in options.events:
+        print(REPORT.format(**run_benchmark(events, options.load,
+                                            options.seed)))
+
+
+if __name__ == '__main__':
+    main()
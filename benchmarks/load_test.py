@@ -0,0 +1,168 @@
+"""Нагрузочный тест движка против локальных заменителей API.
+
+Запуск из корня репозитория::
+
+    python -m benchmarks.load_test --tenants 500 --duration 30
+
+Отчёт: опросы в секунду, p50/p99 задержки от смены статуса до приёма
+сообщения заменителем Телеграма и пиковая память процесса.
+"""
+import argparse
+import asyncio
+import logging
+import random
+import resource
+import threading
+import time
+
+import telegram
+from telegram.utils.request import Request
+
+from benchmarks.stand_ins import PracticumStandIn, TelegramStandIn
+from delivery import DELIVERY_WORKERS, GLOBAL_RATE, DeliveryQueue, RateLimiter
+from engine import POLL_CONCURRENCY, PollingEngine
+from scheduler import PollScheduler
+from tenants import Tenant
+
+BOT_TOKEN = '123456:stand-in'
+
+REPORT = ('пользователей: {tenants}, длительность: {duration:.1f} с\n'
+          'опросов: {polls} ({polls_per_second:.1f}/с), '
+          'ответов 429: {throttled}\n'
+          'соединений с API ЯП: {handshakes}, переиспользований: {reused}\n'
+          'вердиктов: {verdicts}, задержка p50: {p50:.3f} с, '
+          'p99: {p99:.3f} с\n'
+          'пиковая память: {max_rss_mb:.1f} МБ')
+
+
+def percentile(values, share):
+    """Перцентиль по ближайшему рангу; для пустой выборки — 0."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(share * len(ordered)))]
+
+
+def max_rss_mb():
+    """Пиковый размер резидентной памяти процесса в МБ."""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class VerdictLatency:
+    """Задержка от смены статуса в API ЯП до приёма сообщения.
+
+    Первое сообщение в чат — отчёт холодного старта о давно
+    сменившемся статусе, оно не учитывается.
+    """
+
+    def __init__(self, practicum, tokens):
+        self.practicum = practicum
+        self.tokens = tokens
+        self.reported = set()
+        self.samples = []
+        self.lock = threading.Lock()
+
+    def __call__(self, chat_id, text, received):
+        """Учёт сообщения, принятого заменителем Телеграма."""
+        token = self.tokens.get(chat_id)
+        if token is None:
+            return
+        with self.lock:
+            if chat_id not in self.reported:
+                self.reported.add(chat_id)
+                return
+            self.samples.append(received - self.practicum.changed_at(token))
+
+
+async def run_for(engine, duration):
+    """Работа движка в течение `duration` секунд."""
+    try:
+        await asyncio.wait_for(engine.run(), duration)
+    except asyncio.TimeoutError:
+        pass
+
+
+def run_load_test(tenants=100, duration=10.0, interval=1.0, change_every=5.0,
+                  concurrency=POLL_CONCURRENCY, global_rate=GLOBAL_RATE,
+                  practicum_latency=0.0, practicum_error_rate=0.0,
+                  telegram_latency=0.0, telegram_error_rate=0.0,
+                  throttle_rate=0.0, seed=None):
+    """Прогон движка против заменителей; возвращает словарь отчёта."""
+    rng = random.Random(seed)
+    users = [Tenant(f'token{index}', str(index)) for index in range(tenants)]
+    practicum = PracticumStandIn(latency=practicum_latency,
+                                 error_rate=practicum_error_rate,
+                                 change_every=change_every, rng=rng)
+    latency = VerdictLatency(practicum, {
+        user.chat_id: user.practicum_token for user in users
+    })
+    telegram_api = TelegramStandIn(latency=telegram_latency,
+                                   error_rate=telegram_error_rate,
+                                   throttle_rate=throttle_rate,
+                                   on_message=latency, rng=rng)
+    practicum.server.start()
+    telegram_api.server.start()
+    bot = telegram.Bot(token=BOT_TOKEN, base_url=telegram_api.base_url,
+                       request=Request(con_pool_size=DELIVERY_WORKERS))
+    engine = PollingEngine(
+        bot, users, concurrency=concurrency, endpoint=practicum.url,
+        scheduler=PollScheduler(base_interval=interval,
+                                reviewing_interval=interval,
+                                idle_interval=interval, rng=rng),
+        delivery=DeliveryQueue(bot, limiter=RateLimiter(global_rate)),
+    )
+    started = time.monotonic()
+    try:
+        asyncio.run(run_for(engine, duration))
+    finally:
+        elapsed = time.monotonic() - started
+        connections = engine.client.stats()
+        engine.client.close()
+        engine.executor.shutdown(wait=False)
+        practicum.server.stop()
+        telegram_api.server.stop()
+    return {
+        'tenants': tenants,
+        'duration': elapsed,
+        'polls': practicum.requests,
+        'polls_per_second': practicum.requests / elapsed,
+        'throttled': telegram_api.throttled,
+        'handshakes': connections['handshakes'],
+        'reused': connections['reused'],
+        'verdicts': len(latency.samples),
+        'p50': percentile(latency.samples, 0.5),
+        'p99': percentile(latency.samples, 0.99),
+        'max_rss_mb': max_rss_mb(),
+    }
+
+
+def parse_args(args=None):
+    """Разбор аргументов командной строки."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--tenants', type=int, default=100)
+    parser.add_argument('--duration', type=float, default=10.0)
+    parser.add_argument('--interval', type=float, default=1.0,
+                        help='интервал опроса пользователя, с')
+    parser.add_argument('--change-every', type=float, default=5.0,
+                        help='период смены статуса работы, с')
+    parser.add_argument('--concurrency', type=int, default=POLL_CONCURRENCY)
+    parser.add_argument('--global-rate', type=float, default=GLOBAL_RATE,
+                        help='лимит отправок бота в секунду')
+    parser.add_argument('--practicum-latency', type=float, default=0.0)
+    parser.add_argument('--practicum-error-rate', type=float, default=0.0)
+    parser.add_argument('--telegram-latency', type=float, default=0.0)
+    parser.add_argument('--telegram-error-rate', type=float, default=0.0)
+    parser.add_argument('--throttle-rate', type=float, default=0.0,
+                        help='доля ответов 429 от Телеграма')
+    parser.add_argument('--seed', type=int)
+    return parser.parse_args(args)
+
+
+def main(args=None):
+    """Запуск нагрузочного теста и вывод отчёта."""
+    logging.basicConfig(level=logging.CRITICAL)
+    print(REPORT.format(**run_load_test(**vars(parse_args(args)))))
+
+
+if __name__ == '__main__':
+    main()
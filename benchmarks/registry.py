@@ -0,0 +1,112 @@
+"""Бенчмарк памяти на состояние пользователей движка.
+
+Запуск из корня репозитория::
+
+    python -m benchmarks.registry --tenants 10000 100000
+
+Сравнивает прежнюю раскладку (отдельные словари для отметок времени,
+статусов, ошибок и времени опроса) с `TenantRegistry`. Статусы
+берутся из разобранного JSON, как в ответах API, поэтому каждая
+строка статуса в словарях — отдельный объект. Память считается через
+`tracemalloc` без учёта самих объектов `Tenant`.
+"""
+import argparse
+import json
+import random
+import tracemalloc
+
+from homework import HOMEWORK_VERDICTS
+from registry import TenantRegistry
+from tenants import Tenant
+
+REPORT = ('пользователей: {tenants}, работ у каждого: {homeworks}\n'
+          'словари: {dicts_mb:.1f} МБ ({dicts_bytes:.0f} Б/пользователь)\n'
+          'реестр: {registry_mb:.1f} МБ ({registry_bytes:.0f} Б/пользователь)')
+
+
+def make_state(tenants, homeworks, rng):
+    """Пользователи и их статусы в виде разобранного JSON."""
+    statuses = list(HOMEWORK_VERDICTS)
+    users = [Tenant(f'token{index}', str(index)) for index in range(tenants)]
+    answers = json.dumps([
+        {str(number): rng.choice(statuses) for number in range(homeworks)}
+        for _ in range(tenants)
+    ])
+    return users, answers
+
+
+def build_dicts(users, answers):
+    """Прежняя раскладка состояния в словарях.
+
+    Как и прежний движок, каждый словарь получает ключ из отдельного
+    вызова `tenant.key`, то есть свою копию строки.
+    """
+    state = {'tenants': list(users), 'by_key': {}, 'timestamps': {},
+             'statuses': {}, 'failures': {}, 'due_at': {}}
+    for tenant, statuses in zip(users, json.loads(answers)):
+        state['by_key'][tenant.key] = tenant
+        state['timestamps'][tenant.key] = 1_700_000_000
+        state['statuses'][tenant.key] = statuses
+        state['failures'][tenant.key] = 0
+        state['due_at'][tenant.key] = 12345.678
+    return state
+
+
+def build_registry(users, answers):
+    """Состояние в `TenantRegistry`."""
+    registry = TenantRegistry()
+    for tenant, statuses in zip(users, json.loads(answers)):
+        record = registry.add(tenant, 1_700_000_000, statuses)
+        registry.due_at[record.key] = 12345.678
+    return registry
+
+
+def measure(build, *args):
+    """Память, которую удерживает результат `build`, в байтах."""
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        result = build(*args)
+        used = tracemalloc.get_traced_memory()[0] - before
+    finally:
+        tracemalloc.stop()
+    del result
+    return used
+
+
+def run_benchmark(tenants=10000, homeworks=5, seed=None):
+    """Память на состояние пользователей; возвращает отчёт."""
+    users, answers = make_state(tenants, homeworks, random.Random(seed))
+    dicts = measure(build_dicts, users, answers)
+    registry = measure(build_registry, users, answers)
+    return {
+        'tenants': tenants,
+        'homeworks': homeworks,
+        'dicts_mb': dicts / 2 ** 20,
+        'dicts_bytes': dicts / tenants,
+        'registry_mb': registry / 2 ** 20,
+        'registry_bytes': registry / tenants,
+    }
+
+
+def parse_args(args=None):
+    """Разбор аргументов командной строки."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--tenants', type=int, nargs='+',
+                        default=[10000, 100000])
+    parser.add_argument('--homeworks', type=int, default=5,
+                        help='число работ у пользователя')
+    parser.add_argument('--seed', type=int)
+    return parser.parse_args(args)
+
+
+def main(args=None):
+    """Запуск бенчмарка и вывод отчёта."""
+    options = parse_args(args)
+    for tenants in options.tenants:
+        print(REPORT.format(**run_benchmark(tenants, options.homeworks,
+                                            options.seed)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,282 @@
+"""Симуляция опроса на виртуальных часах.
+
+Запуск из корня репозитория::
+
+    python -m benchmarks.simulation --tenants 1000 --days 7
+
+Движок работает в цикле событий с виртуальным временем против
+заменителя API ЯП, который отдаёт заранее составленную историю
+статусов, и заменителя бота, который запоминает сообщения. Неделя
+опроса проигрывается за секунды и детерминированно при заданном
+`--seed`. Отчёт: число опросов, пропущенные и повторные сообщения,
+задержка от смены статуса до отправки в виртуальном времени.
+"""
+import argparse
+import asyncio
+import logging
+import random
+import time
+from bisect import bisect_left, bisect_right
+from collections import defaultdict, deque, namedtuple
+from http import HTTPStatus
+
+from clock import InlineExecutor, VirtualClock, run_virtual
+from delivery import DeliveryQueue, RateLimiter
+from engine import POLL_CONCURRENCY, PollingEngine
+from benchmarks.load_test import percentile
+from scheduler import MAX_BACKOFF, PollScheduler
+from storage import SQLiteStateStore
+from tenants import Tenant
+from validation import render_status
+
+DAY = 24 * 3600
+REVIEW_TIME = 6 * 3600
+FIX_TIME = DAY
+# Между сменами статуса одной работы проходит больше максимального
+# интервала опроса, поэтому движок должен увидеть каждую смену.
+MIN_GAP = 2 * MAX_BACKOFF
+SETTLE_TIME = 2 * MAX_BACKOFF
+
+REPORT = ('пользователей: {tenants}, дней: {days:g}, '
+          'реальное время: {wall:.1f} с (ускорение {speedup:.0f}x)\n'
+          'опросов: {polls} ({polls_per_second:.0f}/с реального времени), '
+          'ошибок API: {errors}\n'
+          'смен статуса: {transitions}, из них не видны движку: '
+          '{skipped}\n'
+          'сообщений: {messages}, пропущено: {missed}, '
+          'повторов: {duplicates}\n'
+          'задержка p50: {p50:.0f} с, p99: {p99:.0f} с')
+
+Event = namedtuple('Event', ('at', 'homework', 'name', 'status'))
+
+
+def make_script(start, duration, rng, reject_rate=0.3):
+    """История статусов пользователя: работы сдаются одна за другой.
+
+    Каждая работа уходит на ревью, возвращается с вероятностью
+    `reject_rate` и снова отправляется, пока её не примут.
+    """
+    events = []
+    at = start + rng.uniform(0, duration / 4)
+    homework = 0
+    while at < start + duration:
+        status = 'reviewing'
+        while at < start + duration:
+            events.append(Event(at, homework, f'hw{homework:02d}', status))
+            if status == 'approved':
+                break
+            if status == 'reviewing':
+                status = ('rejected' if rng.random() < reject_rate
+                          else 'approved')
+                at += MIN_GAP + rng.expovariate(1 / REVIEW_TIME)
+            else:
+                status = 'reviewing'
+                at += MIN_GAP + rng.expovariate(1 / FIX_TIME)
+        homework += 1
+        at += MIN_GAP + rng.expovariate(1 / FIX_TIME)
+    return events
+
+
+def iso_date(at):
+    """Дата в формате `date_updated` API ЯП."""
+    return time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(at))
+
+
+class ScriptedResponse:
+    """Ответ заменителя API ЯП."""
+
+    def __init__(self, status_code, data):
+        self.status_code = status_code
+        self.data = data
+
+    def json(self):
+        """Тело ответа."""
+        return self.data
+
+
+class ScriptedPracticum:
+    """Заменитель API ЯП с заранее составленной историей статусов.
+
+    Передаётся движку вместо HTTP-клиента. Как и настоящий API,
+    отдаёт работы, изменившиеся с `from_date`, от новых к старым,
+    с последним статусом. В `served` запоминаются смены статуса,
+    попавшие хотя бы в один успешный ответ: о них движок обязан
+    сообщить.
+    """
+
+    def __init__(self, clock, scripts, error_rate=0.0, rng=None):
+        self.clock = clock
+        self.scripts = scripts
+        self.times = {token: [event.at for event in script]
+                      for token, script in scripts.items()}
+        self.error_rate = error_rate
+        self.rng = rng or random.Random()
+        self.requests = 0
+        self.errors = 0
+        self.served = set()
+
+    def get(self, url, headers=None, params=None, **kwargs):
+        """Ответ на опрос пользователя."""
+        self.requests += 1
+        if self.error_rate and self.rng.random() < self.error_rate:
+            self.errors += 1
+            return ScriptedResponse(HTTPStatus.INTERNAL_SERVER_ERROR, {})
+        token = headers['Authorization'].split()[-1]
+        now = self.clock.time()
+        times = self.times.get(token, [])
+        script = self.scripts.get(token, [])
+        latest = {}
+        for event in reversed(script[bisect_left(times, params['from_date']):
+                                     bisect_right(times, now)]):
+            latest.setdefault(event.homework, event)
+        self.served.update((token, event.at) for event in latest.values())
+        return ScriptedResponse(HTTPStatus.OK, {
+            'homeworks': [
+                {'id': event.homework, 'homework_name': event.name,
+                 'status': event.status, 'date_updated': iso_date(event.at)}
+                for event in latest.values()
+            ],
+            'current_date': int(now),
+        })
+
+    def stats(self):
+        """Счётчики как у `PracticumClient`; соединений нет."""
+        return {'requests': self.requests, 'handshakes': 0, 'reused': 0}
+
+    def close(self):
+        """Соединений нет, закрывать нечего."""
+
+
+class RecordingBot:
+    """Заменитель бота: запоминает сообщения с виртуальным временем."""
+
+    def __init__(self, clock):
+        self.clock = clock
+        self.sent = []
+
+    def send_message(self, chat_id=None, text=None, **kwargs):
+        """Приём сообщения."""
+        self.sent.append((self.clock.time(), chat_id, text))
+
+
+def check_messages(users, scripts, served, sent, end):
+    """Сверка сообщений с видимыми движку сменами статуса.
+
+    Движок видит только статусы из успешных ответов (`served`):
+    промежуточный статус, сменившийся во время сбоев API, не виден,
+    а возврат к прежнему статусу — не изменение. Каждое сообщение
+    сопоставляется с самой ранней ещё не отправленной видимой сменой
+    статуса с тем же текстом. Сообщение без пары — повтор; видимая
+    смена без сообщения спустя `SETTLE_TIME` — пропуск.
+    """
+    expected = defaultdict(deque)
+    for user in users:
+        seen = {}
+        for event in scripts[user.practicum_token]:
+            if (user.practicum_token, event.at) not in served:
+                continue
+            if seen.get(event.homework) == event.status:
+                continue
+            seen[event.homework] = event.status
+            text = render_status({'homework_name': event.name,
+                                  'status': event.status})
+            expected[user.chat_id, text].append(event.at)
+    visible = sum(map(len, expected.values()))
+    latency, duplicates = [], 0
+    for sent_at, chat_id, text in sent:
+        pending = expected[str(chat_id), text]
+        if pending and pending[0] <= sent_at:
+            latency.append(sent_at - pending.popleft())
+        else:
+            duplicates += 1
+    missed = sum(at <= end - SETTLE_TIME
+                 for pending in expected.values() for at in pending)
+    return latency, duplicates, missed, visible
+
+
+async def run_until(engine, clock, end):
+    """Работа движка до момента `end` виртуального времени."""
+    try:
+        await asyncio.wait_for(engine.run(), end - clock.monotonic())
+    except asyncio.TimeoutError:
+        pass
+
+
+def run_simulation(tenants=100, days=1.0, concurrency=POLL_CONCURRENCY,
+                   error_rate=0.0, reject_rate=0.3, seed=None):
+    """Прогон движка на виртуальных часах; возвращает словарь отчёта."""
+    rng = random.Random(seed)
+    clock = VirtualClock()
+    duration = days * DAY
+    users = [Tenant(f'token{index}', str(index)) for index in range(tenants)]
+    scripts = {
+        user.practicum_token: make_script(clock.time(), duration, rng,
+                                          reject_rate)
+        for user in users
+    }
+    practicum = ScriptedPracticum(clock, scripts, error_rate, rng)
+    bot = RecordingBot(clock)
+    executor = InlineExecutor()
+    engine = PollingEngine(
+        bot, users, concurrency=concurrency, client=practicum,
+        store=SQLiteStateStore(':memory:'), clock=clock, executor=executor,
+        scheduler=PollScheduler(clock=clock.monotonic, rng=rng),
+        delivery=DeliveryQueue(
+            bot, executor=executor, clock=clock.monotonic,
+            limiter=RateLimiter(clock=clock.monotonic)),
+    )
+    # Повторов отправки и сводок в симуляции нет, а расписание опроса
+    # будит движок само, поэтому фоновые задачи просыпаются реже.
+    engine.dispatch_tick = engine.housekeeping_tick = 60
+    engine.outbox_tick = 60
+    started = time.perf_counter()
+    try:
+        run_virtual(run_until(engine, clock, duration), clock)
+    finally:
+        wall = time.perf_counter() - started
+        engine.store.close()
+    latency, duplicates, missed, visible = check_messages(
+        users, scripts, practicum.served, bot.sent, clock.time())
+    transitions = sum(event.at <= clock.time()
+                      for script in scripts.values() for event in script)
+    return {
+        'tenants': tenants,
+        'days': days,
+        'wall': wall,
+        'speedup': duration / wall,
+        'polls': practicum.requests,
+        'polls_per_second': practicum.requests / wall,
+        'errors': practicum.errors,
+        'transitions': transitions,
+        'skipped': transitions - visible,
+        'messages': len(bot.sent),
+        'missed': missed,
+        'duplicates': duplicates,
+        'p50': percentile(latency, 0.5),
+        'p99': percentile(latency, 0.99),
+        'sent': bot.sent,
+    }
+
+
+def parse_args(args=None):
+    """Разбор аргументов командной строки."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--tenants', type=int, default=100)
+    parser.add_argument('--days', type=float, default=1.0)
+    parser.add_argument('--concurrency', type=int, default=POLL_CONCURRENCY)
+    parser.add_argument('--error-rate', type=float, default=0.0,
+                        help='доля ответов 500 от API ЯП')
+    parser.add_argument('--reject-rate', type=float, default=0.3,
+                        help='доля возвращённых на доработку работ')
+    parser.add_argument('--seed', type=int)
+    return parser.parse_args(args)
+
+
+def main(args=None):
+    """Запуск симуляции и вывод отчёта."""
+    logging.basicConfig(level=logging.CRITICAL)
+    print(REPORT.format(**run_simulation(**vars(parse_args(args)))))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,203 @@
+"""Локальные заменители API ЯП и Bot API Телеграма.
+
+Оба сервера работают в отдельных потоках и позволяют задать задержку
+ответа, долю ошибок и (для Телеграма) долю ответов 429.
+"""
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+STATUSES = ('reviewing', 'rejected', 'approved')
+
+
+class StandInServer(ThreadingHTTPServer):
+    """HTTP-сервер в фоновом потоке без вывода ошибок клиентов."""
+
+    daemon_threads = True
+
+    def __init__(self, handler, stand_in):
+        super().__init__(('127.0.0.1', 0), handler)
+        self.stand_in = stand_in
+        self.thread = threading.Thread(target=self.serve_forever,
+                                       daemon=True)
+
+    @property
+    def url(self):
+        """Адрес сервера."""
+        return f'http://127.0.0.1:{self.server_port}'
+
+    def handle_error(self, request, client_address):
+        """Разорванные клиентом соединения не интересны."""
+
+    def start(self):
+        """Запуск сервера."""
+        self.thread.start()
+        return self
+
+    def stop(self):
+        """Остановка сервера."""
+        self.shutdown()
+        self.server_close()
+
+
+class JsonHandler(BaseHTTPRequestHandler):
+    """Обработчик, отвечающий JSON через keep-alive соединения."""
+
+    protocol_version = 'HTTP/1.1'
+
+    def send_json(self, status, data):
+        """Отправка JSON-ответа."""
+        body = json.dumps(data).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        """Журнал запросов не ведётся."""
+
+
+class PracticumHandler(JsonHandler):
+    """GET статусов домашних работ."""
+
+    def do_GET(self):
+        """Ответ на опрос пользователя."""
+        stand_in = self.server.stand_in
+        token = self.headers.get('Authorization', '').split()[-1]
+        status, data = stand_in.answer(token)
+        self.send_json(status, data)
+
+
+class TelegramHandler(JsonHandler):
+    """POST `sendMessage` Bot API."""
+
+    def do_POST(self):
+        """Приём сообщения."""
+        length = int(self.headers.get('Content-Length', 0))
+        payload = json.loads(self.rfile.read(length) or b'{}')
+        status, data = self.server.stand_in.answer(payload)
+        self.send_json(status, data)
+
+
+class PracticumStandIn:
+    """Заменитель API ЯП.
+
+    У каждого пользователя одна работа, статус которой меняется раз
+    в `change_every` секунд со случайным для пользователя сдвигом.
+    `changed_at` возвращает время последней смены статуса по
+    `time.monotonic`, чтобы измерить задержку доставки вердикта.
+    """
+
+    def __init__(self, latency=0.0, error_rate=0.0, change_every=5.0,
+                 rng=None):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.change_every = change_every
+        self.rng = rng or random.Random()
+        self.offsets = {}
+        self.requests = 0
+        self.lock = threading.Lock()
+        self.started = time.monotonic()
+        self.server = StandInServer(PracticumHandler, self)
+
+    @property
+    def url(self):
+        """Адрес эндпоинта статусов."""
+        return self.server.url + '/api/user_api/homework_statuses/'
+
+    def offset(self, token):
+        """Сдвиг смены статусов пользователя."""
+        with self.lock:
+            if token not in self.offsets:
+                self.offsets[token] = self.rng.random() * self.change_every
+            return self.offsets[token]
+
+    def version(self, token):
+        """Номер текущего статуса пользователя."""
+        elapsed = time.monotonic() - self.started
+        return int((elapsed + self.offset(token)) // self.change_every)
+
+    def changed_at(self, token):
+        """Время последней смены статуса пользователя."""
+        version = self.version(token)
+        return (self.started + version * self.change_every
+                - self.offset(token))
+
+    def answer(self, token):
+        """Код и тело ответа для пользователя."""
+        with self.lock:
+            self.requests += 1
+        if self.latency:
+            time.sleep(self.latency)
+        if self.rng.random() < self.error_rate:
+            return 500, {'code': 'internal_error'}
+        version = self.version(token)
+        return 200, {
+            'homeworks': [{
+                'id': 1,
+                'homework_name': 'homework.zip',
+                'status': STATUSES[version % len(STATUSES)],
+                'reviewer_comment': 'stand-in',
+            }],
+            'current_date': int(time.time()),
+        }
+
+
+class TelegramStandIn:
+    """Заменитель Bot API: принимает `sendMessage` и запоминает время.
+
+    `on_message(chat_id, text, received)` вызывается для каждого
+    принятого сообщения; доля `throttle_rate` запросов получает
+    429 с `retry_after` секунд.
+    """
+
+    def __init__(self, latency=0.0, error_rate=0.0, throttle_rate=0.0,
+                 retry_after=1, on_message=None, rng=None):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.retry_after = retry_after
+        self.on_message = on_message
+        self.rng = rng or random.Random()
+        self.received = 0
+        self.throttled = 0
+        self.lock = threading.Lock()
+        self.server = StandInServer(TelegramHandler, self)
+
+    @property
+    def base_url(self):
+        """Значение `base_url` для `telegram.Bot`."""
+        return self.server.url + '/bot'
+
+    def answer(self, payload):
+        """Код и тело ответа на `sendMessage`."""
+        if self.latency:
+            time.sleep(self.latency)
+        roll = self.rng.random()
+        if roll < self.throttle_rate:
+            with self.lock:
+                self.throttled += 1
+            return 429, {
+                'ok': False, 'error_code': 429,
+                'description': 'Too Many Requests',
+                'parameters': {'retry_after': self.retry_after},
+            }
+        if roll < self.throttle_rate + self.error_rate:
+            return 500, {'ok': False, 'error_code': 500,
+                         'description': 'Internal Server Error'}
+        received = time.monotonic()
+        with self.lock:
+            self.received += 1
+            message_id = self.received
+        if self.on_message:
+            self.on_message(str(payload.get('chat_id')),
+                            payload.get('text'), received)
+        return 200, {'ok': True, 'result': {
+            'message_id': message_id,
+            'date': int(time.time()),
+            'chat': {'id': payload.get('chat_id'), 'type': 'private'},
+            'text': payload.get('text'),
+        }}
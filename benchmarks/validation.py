@@ -0,0 +1,99 @@
+"""Микробенчмарк проверки списка домашних работ.
+
+Запуск из корня репозитория::
+
+    python -m benchmarks.validation --homeworks 10000 --invalid-rate 0.01
+
+Сравнивает `validate_homeworks` с поштучной проверкой через
+`parse_status`, которая бросает исключение на каждой испорченной
+записи. Отчёт: стоимость одной записи в наносекундах.
+"""
+import argparse
+import random
+import timeit
+
+from homework import HOMEWORK_VERDICTS, parse_status
+from validation import render_status, validate_homeworks
+
+REPORT = ('работ: {homeworks}, испорченных: {invalid}\n'
+          'validate_homeworks: {batch_ns:.0f} нс/работа\n'
+          'validate_homeworks + render_status: '
+          '{batch_render_ns:.0f} нс/работа\n'
+          'parse_status по одной: {single_ns:.0f} нс/работа')
+
+BROKEN = (
+    lambda index: {'status': 'approved'},
+    lambda index: {'homework_name': f'hw{index}'},
+    lambda index: {'homework_name': f'hw{index}', 'status': 'lost'},
+    lambda index: f'hw{index}',
+)
+
+
+def make_homeworks(count, invalid_rate, rng):
+    """Список работ с долей `invalid_rate` испорченных записей."""
+    statuses = list(HOMEWORK_VERDICTS)
+    homeworks = []
+    for index in range(count):
+        if rng.random() < invalid_rate:
+            homeworks.append(rng.choice(BROKEN)(index))
+        else:
+            homeworks.append({'id': index, 'homework_name': f'hw{index}',
+                              'status': rng.choice(statuses)})
+    return homeworks
+
+
+def parse_one_by_one(homeworks):
+    """Поштучная проверка с перехватом исключений."""
+    messages = []
+    for homework in homeworks:
+        try:
+            messages.append(parse_status(homework))
+        except (KeyError, ValueError, TypeError):
+            continue
+    return messages
+
+
+def validate_and_render(homeworks):
+    """Проверка списка и сообщения о корректных работах."""
+    valid, _ = validate_homeworks(homeworks)
+    return [render_status(homework) for homework in valid]
+
+
+def per_item_ns(func, homeworks, repeat):
+    """Лучшее из `repeat` измерений в наносекундах на одну работу."""
+    best = min(timeit.repeat(lambda: func(homeworks), number=1,
+                             repeat=repeat))
+    return best / len(homeworks) * 1e9
+
+
+def run_benchmark(homeworks=10000, invalid_rate=0.01, repeat=5, seed=None):
+    """Замер стоимости проверки одной работы; возвращает отчёт."""
+    items = make_homeworks(homeworks, invalid_rate, random.Random(seed))
+    _, errors = validate_homeworks(items)
+    return {
+        'homeworks': homeworks,
+        'invalid': len(errors),
+        'batch_ns': per_item_ns(validate_homeworks, items, repeat),
+        'batch_render_ns': per_item_ns(validate_and_render, items, repeat),
+        'single_ns': per_item_ns(parse_one_by_one, items, repeat),
+    }
+
+
+def parse_args(args=None):
+    """Разбор аргументов командной строки."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--homeworks', type=int, default=10000)
+    parser.add_argument('--invalid-rate', type=float, default=0.01,
+                        help='доля испорченных записей')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--seed', type=int)
+    return parser.parse_args(args)
+
+
+def main(args=None):
+    """Запуск бенчмарка и вывод отчёта."""
+    print(REPORT.format(**run_benchmark(**vars(parse_args(args)))))
+
+
+if __name__ == '__main__':
+    main()
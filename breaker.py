@@ -0,0 +1,106 @@
+"""Предохранитель для вызовов внешних сервисов."""
+import os
+import threading
+import time
+
+from exceptions import CircuitOpenError
+from metrics import Gauge
+
+FAILURE_THRESHOLD = int(os.getenv('BREAKER_FAILURE_THRESHOLD', 5))
+RESET_TIMEOUT = float(os.getenv('BREAKER_RESET_TIMEOUT', 60))
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+STATES = (CLOSED, HALF_OPEN, OPEN)
+BREAKER_STATE = Gauge(
+    'bot_breaker_state',
+    'Состояние предохранителя: 0 closed, 1 half_open, 2 open'
+)
+
+CIRCUIT_OPEN_ERROR = ('Предохранитель {name} разомкнут, повтор через '
+                      '{retry_in:.0f} с')
+
+
+class CircuitBreaker:
+    """Предохранитель с состояниями closed, open и half_open.
+
+    После `failure_threshold` ошибок подряд вызовы отклоняются без
+    обращения к сервису. Через `reset_timeout` секунд пропускается
+    один пробный вызов: успех замыкает цепь, ошибка снова размыкает.
+    """
+
+    def __init__(self, name, failure_threshold=FAILURE_THRESHOLD,
+                 reset_timeout=RESET_TIMEOUT, is_failure=None,
+                 clock=time.monotonic):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.is_failure = is_failure or (lambda error: True)
+        self.clock = clock
+        self.lock = threading.Lock()
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.rejected = 0
+        BREAKER_STATE.set_function(lambda: STATES.index(self.state),
+                                   name=name)
+
+    def retry_in(self):
+        """Секунды до следующего пробного вызова."""
+        if self.state == CLOSED:
+            return 0.0
+        return max(0.0, self.opened_at + self.reset_timeout - self.clock())
+
+    def allow(self):
+        """Можно ли выполнить вызов прямо сейчас."""
+        with self.lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN and self.retry_in() == 0:
+                self.state = HALF_OPEN
+                return True
+            self.rejected += 1
+            return False
+
+    def record_success(self):
+        """Успешный вызов замыкает цепь."""
+        with self.lock:
+            self.state = CLOSED
+            self.failures = 0
+
+    def record_failure(self):
+        """Ошибка вызова; при превышении порога цепь размыкается."""
+        with self.lock:
+            self.failures += 1
+            if (self.state == HALF_OPEN
+                    or self.failures >= self.failure_threshold):
+                self.state = OPEN
+                self.opened_at = self.clock()
+
+    def call(self, func, *args, **kwargs):
+        """Вызов функции под защитой предохранителя."""
+        if not self.allow():
+            raise CircuitOpenError(CIRCUIT_OPEN_ERROR.format(
+                name=self.name, retry_in=self.retry_in()))
+        try:
+            result = func(*args, **kwargs)
+        except Exception as error:
+            if self.is_failure(error):
+                self.record_failure()
+            else:
+                self.record_success()
+            raise
+        self.record_success()
+        return result
+
+    def snapshot(self):
+        """Состояние предохранителя для мониторинга."""
+        return {
+            'name': self.name,
+            'state': self.state,
+            'failures': self.failures,
+            'rejected': self.rejected,
+            'retry_in': self.retry_in(),
+        }
@@ -0,0 +1,102 @@
+"""Кеш ответов API ЯП в памяти процесса."""
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+
+from metrics import Counter, Gauge
+
+CACHE_TTL = float(os.getenv('PRACTICUM_CACHE_TTL', 30))
+CACHE_MAX_BYTES = int(os.getenv('PRACTICUM_CACHE_MAX_BYTES', 16 * 2 ** 20))
+
+CACHE_REQUESTS = Counter('bot_cache_requests_total',
+                         'Обращения к кешу ответов API ЯП')
+CACHE_EVICTIONS = Counter('bot_cache_evictions_total',
+                          'Записи, вытесненные из кеша')
+CACHE_BYTES = Gauge('bot_cache_bytes', 'Размер записей в кеше, байт')
+
+
+def json_size(value):
+    """Размер значения в JSON, байт."""
+    return len(json.dumps(value, ensure_ascii=False).encode())
+
+
+class ResponseCache:
+    """Кеш с временем жизни, вытеснением LRU и ограничением по байтам.
+
+    Одновременные запросы одного ключа выполняются один раз: остальные
+    потоки ждут результата первого. Ошибки не кешируются, но передаются
+    всем ожидающим.
+    """
+
+    def __init__(self, ttl=CACHE_TTL, max_bytes=CACHE_MAX_BYTES,
+                 sizeof=json_size, clock=time.monotonic, name='practicum'):
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self.clock = clock
+        self.name = name
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+        self.inflight = {}
+        self.bytes = 0
+        CACHE_BYTES.set_function(lambda: self.bytes, cache=name)
+
+    def get(self, key, fetch):
+        """Значение из кеша или результат `fetch()` с сохранением в кеш."""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry and entry[2] > self.clock():
+                self.entries.move_to_end(key)
+                CACHE_REQUESTS.inc(cache=self.name, result='hit')
+                return entry[0]
+            if entry:
+                self.discard(key)
+            future = self.inflight.get(key)
+            leader = future is None
+            if leader:
+                future = self.inflight[key] = Future()
+        if not leader:
+            CACHE_REQUESTS.inc(cache=self.name, result='shared')
+            return future.result()
+        CACHE_REQUESTS.inc(cache=self.name, result='miss')
+        try:
+            value = fetch()
+        except BaseException as error:
+            with self.lock:
+                del self.inflight[key]
+            future.set_exception(error)
+            raise
+        with self.lock:
+            del self.inflight[key]
+            self.store(key, value)
+        future.set_result(value)
+        return value
+
+    def store(self, key, value):
+        """Запись значения с вытеснением давно не читанных записей."""
+        if self.ttl <= 0:
+            return
+        size = self.sizeof(value)
+        if size > self.max_bytes:
+            return
+        if key in self.entries:
+            self.discard(key)
+        self.entries[key] = (value, size, self.clock() + self.ttl)
+        self.bytes += size
+        while self.bytes > self.max_bytes:
+            self.discard(next(iter(self.entries)))
+            CACHE_EVICTIONS.inc(cache=self.name)
+
+    def discard(self, key):
+        """Удаление записи."""
+        _, size, _ = self.entries.pop(key)
+        self.bytes -= size
+
+    def clear(self):
+        """Удаление всех записей."""
+        with self.lock:
+            self.entries.clear()
+            self.bytes = 0
@@ -0,0 +1,48 @@
+"""Поиск изменившихся статусов домашних работ."""
+import hashlib
+from collections import namedtuple
+
+Change = namedtuple(
+    'Change', ('key', 'homework', 'old_status', 'new_status', 'silent'),
+    defaults=(False,)
+)
+
+
+def homework_key(homework):
+    """Ключ работы: `id`, а при его отсутствии — `homework_name`."""
+    return str(homework.get('id', homework.get('homework_name')))
+
+
+def change_key(tenant_key, change):
+    """Ключ идемпотентности сообщения об изменении статуса.
+
+    Одно и то же изменение, обнаруженное повторно, получает тот же ключ;
+    возврат работы в прежний статус после исправлений — новый, так как
+    у неё меняется `date_updated`.
+    """
+    source = '\n'.join((tenant_key, change.key, str(change.new_status),
+                        str(change.homework.get('date_updated', ''))))
+    return hashlib.sha256(source.encode()).hexdigest()
+
+
+def detect_changes(homeworks, previous, cold_start=False):
+    """Изменения статусов относительно сохранённых.
+
+    API отдаёт работы от новых к старым, поэтому для повторяющейся
+    работы учитывается только первая запись. При холодном старте
+    сообщать нужно только о самой свежей работе: остальные
+    изменения помечаются `silent` и лишь запоминаются.
+    """
+    changes = []
+    seen = set()
+    for homework in homeworks:
+        key = homework_key(homework)
+        if key in seen:
+            continue
+        seen.add(key)
+        status = homework.get('status')
+        old_status = previous.get(key)
+        if status != old_status:
+            silent = cold_start and bool(changes)
+            changes.append(Change(key, homework, old_status, status, silent))
+    return changes
@@ -0,0 +1,140 @@
+"""Часы движка: системные и виртуальные для симуляции.
+
+Движок и его компоненты берут время только у переданных часов,
+а ждут через `asyncio.sleep` и таймеры цикла событий. Поэтому
+с `VirtualClock` и `VirtualTimeLoop` дни опроса проигрываются
+за секунды: когда циклу нечего делать, время сразу сдвигается
+к ближайшему таймеру.
+"""
+import asyncio
+import selectors
+import time
+from concurrent.futures import Executor, Future
+
+STALLED_ERROR = ('Симуляция остановилась: нет ни готовых задач, '
+                 'ни таймеров')
+
+
+class Clock:
+    """Системные часы."""
+
+    def time(self):
+        """Время в секундах от начала эпохи."""
+        return time.time()
+
+    def monotonic(self):
+        """Монотонное время для интервалов."""
+        return time.monotonic()
+
+
+SYSTEM_CLOCK = Clock()
+
+
+class VirtualClock(Clock):
+    """Часы, которые идут только при вызове `advance`."""
+
+    def __init__(self, start=0.0, epoch=1_700_000_000.0):
+        self.now = start
+        self.epoch = epoch
+
+    def time(self):
+        """Виртуальное время в секундах от начала эпохи."""
+        return self.epoch + self.now
+
+    def monotonic(self):
+        """Виртуальное время от запуска часов."""
+        return self.now
+
+    def advance(self, seconds):
+        """Сдвиг часов вперёд."""
+        self.now += max(seconds, 0.0)
+
+
+class InlineExecutor(Executor):
+    """Исполнитель, выполняющий вызов сразу в вызывающем потоке.
+
+    В симуляции заменяет пул потоков: блокирующие стадии
+    выполняются детерминированно и не занимают реального времени
+    вне цикла событий.
+    """
+
+    def submit(self, fn, /, *args, **kwargs):
+        """Выполнение вызова; возвращает завершённый future."""
+        future = Future()
+        try:
+            future.set_result(fn(*args, **kwargs))
+        except BaseException as error:
+            future.set_exception(error)
+        return future
+
+
+class VirtualSelector:
+    """Селектор, который вместо ожидания сдвигает виртуальные часы."""
+
+    def __init__(self, clock, selector=None):
+        self.clock = clock
+        self.selector = selector or selectors.DefaultSelector()
+
+    def select(self, timeout=None):
+        """Готовые события без ожидания.
+
+        Если событий нет, цикл ждал бы `timeout` секунд до ближайшего
+        таймера: часы сдвигаются на это время.
+        """
+        events = self.selector.select(0)
+        if events or timeout == 0:
+            return events
+        if timeout is None:
+            raise RuntimeError(STALLED_ERROR)
+        self.clock.advance(timeout)
+        return []
+
+    def __getattr__(self, name):
+        return getattr(self.selector, name)
+
+
+class VirtualTimeLoop(asyncio.SelectorEventLoop):
+    """Цикл событий, в котором время берётся из `VirtualClock`."""
+
+    def __init__(self, clock):
+        super().__init__(VirtualSelector(clock))
+        self.clock = clock
+
+    def time(self):
+        """Время цикла для таймеров и `asyncio.sleep`."""
+        return self.clock.monotonic()
+
+    def run_in_executor(self, executor, func, *args):
+        """Вызов через `InlineExecutor` выполняется сразу.
+
+        Результат не проходит через пробуждение цикла из другого
+        потока, как у обычного исполнителя.
+        """
+        if not isinstance(executor, InlineExecutor):
+            return super().run_in_executor(executor, func, *args)
+        future = self.create_future()
+        try:
+            future.set_result(func(*args))
+        except Exception as error:
+            future.set_exception(error)
+        return future
+
+
+def run_virtual(coroutine, clock):
+    """Выполнение сопрограммы в цикле с виртуальным временем.
+
+    Как `asyncio.run`: по завершении оставшиеся задачи отменяются.
+    """
+    loop = VirtualTimeLoop(clock)
+    try:
+        asyncio.set_event_loop(loop)
+        return loop.run_until_complete(coroutine)
+    finally:
+        tasks = asyncio.all_tasks(loop)
+        for task in tasks:
+            task.cancel()
+        loop.run_until_complete(
+            asyncio.gather(*tasks, return_exceptions=True))
+        loop.run_until_complete(loop.shutdown_asyncgens())
+        asyncio.set_event_loop(None)
+        loop.close()
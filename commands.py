@@ -0,0 +1,135 @@
+"""Команды бота `/status` и `/history`.
+
+Ответы строятся из снимка последних статусов в памяти процесса,
+без запросов к API ЯП.
+"""
+import logging
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+from telegram.ext import CommandHandler, Updater
+
+from validation import render_status
+
+TELEGRAM_COMMANDS = os.getenv('TELEGRAM_COMMANDS')
+TELEGRAM_WEBHOOK_URL = os.getenv('TELEGRAM_WEBHOOK_URL')
+TELEGRAM_WEBHOOK_PORT = int(os.getenv('TELEGRAM_WEBHOOK_PORT', 8443))
+HISTORY_LIMIT = int(os.getenv('HISTORY_LIMIT', 10))
+COMMAND_WORKERS = 1
+
+NO_STATUS_MESSAGE = 'Пока нет данных о ваших работах.'
+NO_HISTORY_MESSAGE = 'Изменений статусов пока не было.'
+HISTORY_LINE = '{when:%d.%m %H:%M} {text}'
+COMMANDS_MESSAGE = 'Команды бота принимаются через {mode}'
+
+
+class StatusIndex:
+    """Последние статусы работ и история изменений по чатам.
+
+    Движок записывает сюда каждое изменение, команды читают
+    из других потоков, поэтому доступ защищён блокировкой.
+    """
+
+    def __init__(self, history_limit=HISTORY_LIMIT, clock=time.time):
+        self.history_limit = history_limit
+        self.clock = clock
+        self.lock = threading.Lock()
+        self.latest = {}
+        self.changes = {}
+
+    def seed(self, chat_id, statuses, names=None):
+        """Статусы из хранилища, известные до первого опроса.
+
+        Имена работ берутся из `names` (журнала переходов); для работы
+        без имени показывается её ключ.
+        """
+        names = names or {}
+        with self.lock:
+            latest = self.latest.setdefault(str(chat_id), {})
+            for key, status in statuses.items():
+                latest.setdefault(key, render_status(
+                    {'homework_name': names.get(key, key),
+                     'status': status}))
+
+    def record(self, chat_id, key, text, notify=True):
+        """Новый статус работы.
+
+        В историю попадают только изменения, о которых сообщалось
+        пользователю (`notify`).
+        """
+        chat_id = str(chat_id)
+        with self.lock:
+            self.latest.setdefault(chat_id, {})[key] = text
+            if not notify:
+                return
+            history = self.changes.get(chat_id)
+            if history is None:
+                history = self.changes[chat_id] = deque(
+                    maxlen=self.history_limit)
+            history.append((self.clock(), text))
+
+    def status(self, chat_id):
+        """Ответ на `/status`: последний статус каждой работы."""
+        with self.lock:
+            texts = list(self.latest.get(str(chat_id), {}).values())
+        return '\n\n'.join(texts) or NO_STATUS_MESSAGE
+
+    def history(self, chat_id):
+        """Ответ на `/history`: последние изменения, от новых к старым."""
+        with self.lock:
+            changes = list(self.changes.get(str(chat_id), ()))
+        return '\n\n'.join(
+            HISTORY_LINE.format(when=datetime.fromtimestamp(when), text=text)
+            for when, text in reversed(changes)
+        ) or NO_HISTORY_MESSAGE
+
+
+def make_handlers(index, reply=None):
+    """Обработчики команд, отвечающие из `index`.
+
+    `reply(chat_id, text)` отправляет ответ; без него ответ уходит
+    сразу через `reply_text`, мимо лимитов и предохранителя очереди
+    отправки.
+    """
+
+    def answer(update, text):
+        if reply is None:
+            update.effective_message.reply_text(text)
+        else:
+            reply(update.effective_chat.id, text)
+
+    def status(update, context):
+        answer(update, index.status(update.effective_chat.id))
+
+    def history(update, context):
+        answer(update, index.history(update.effective_chat.id))
+
+    return [CommandHandler('status', status),
+            CommandHandler('history', history)]
+
+
+def start_commands(bot, index, webhook_url=TELEGRAM_WEBHOOK_URL,
+                   port=TELEGRAM_WEBHOOK_PORT, reply=None):
+    """Приём команд через вебхук, если задан его адрес, иначе long polling.
+
+    `webhook_url` — публичный адрес бота; Телеграм присылает обновления
+    на `<webhook_url>/<токен бота>`. Обновления обрабатываются в потоках
+    `Updater`, ответы отправляет `reply` (см. `make_handlers`);
+    возвращает `Updater` для остановки.
+    """
+    updater = Updater(bot=bot, workers=COMMAND_WORKERS)
+    for handler in make_handlers(index, reply):
+        updater.dispatcher.add_handler(handler)
+    if webhook_url:
+        updater.start_webhook(listen='0.0.0.0', port=port,
+                              url_path=bot.token,
+                              webhook_url=f'{webhook_url.rstrip("/")}/'
+                                          f'{bot.token}')
+        logging.info(COMMANDS_MESSAGE.format(mode=f'вебхук {port}'))
+    else:
+        updater.start_polling()
+        logging.info(COMMANDS_MESSAGE.format(mode='long polling'))
+    return updater
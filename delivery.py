@@ -0,0 +1,233 @@
+"""Очередь отправки сообщений в Телеграм с учётом лимитов API."""
+import asyncio
+import logging
+import os
+import time
+from functools import partial
+
+import telegram
+
+from breaker import CircuitBreaker
+from exceptions import CircuitOpenError
+from metrics import Counter, Gauge, Histogram
+
+GLOBAL_RATE = float(os.getenv('TELEGRAM_GLOBAL_RATE', 30))
+CHAT_RATE = float(os.getenv('TELEGRAM_CHAT_RATE', 1))
+DELIVERY_WORKERS = int(os.getenv('DELIVERY_WORKERS', 30))
+MAX_RETRY_AFTER = 5
+PRUNE_THRESHOLD = 10000
+BREAKER_POLL = 0.1
+
+DEBUG_MESSAGE = "'{message}' - сообщение было отправлено в чат {chat_id}"
+ERROR_MESSAGE = ('{error}. {message} - сообщение не удалось отправить '
+                 'в чат {chat_id}')
+RETRY_AFTER_MESSAGE = 'Телеграм просит подождать {seconds} с'
+RETRY_LIMIT_ERROR = 'Исчерпаны повторы после RetryAfter'
+
+SENDS = Counter('bot_sends_total', 'Отправки сообщений в Телеграм')
+SEND_SECONDS = Histogram('bot_telegram_send_seconds',
+                         'Длительность отправки сообщения в Телеграм')
+QUEUE_DEPTH = Gauge('bot_delivery_queue_depth',
+                    'Сообщения, ожидающие отправки')
+
+
+class TokenBucket:
+    """Ведро токенов: `rate` отправок в секунду, не больше `capacity` подряд.
+
+    Токен можно взять в долг: тогда следующий `delay` вернёт время,
+    за которое долг будет погашен.
+    """
+
+    def __init__(self, rate, capacity=1, clock=time.monotonic):
+        self.rate = rate
+        self.capacity = capacity
+        self.clock = clock
+        self.tokens = capacity
+        self.updated = clock()
+
+    def refill(self):
+        """Начисление токенов за прошедшее время."""
+        now = self.clock()
+        self.tokens = min(self.capacity,
+                          self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self):
+        """Время ожидания следующего токена без его списания."""
+        self.refill()
+        return max(0.0, (1 - self.tokens) / self.rate)
+
+    def take(self):
+        """Списание токена, в том числе в долг."""
+        self.refill()
+        self.tokens -= 1
+
+    @property
+    def idle(self):
+        """Ведро полное: его можно забыть без потери ограничений."""
+        self.refill()
+        return self.tokens >= self.capacity
+
+
+class RateLimiter:
+    """Общий лимит бота и отдельный лимит для каждого чата."""
+
+    def __init__(self, global_rate=GLOBAL_RATE, chat_rate=CHAT_RATE,
+                 clock=time.monotonic):
+        self.clock = clock
+        self.chat_rate = chat_rate
+        self.global_bucket = TokenBucket(global_rate, global_rate, clock)
+        self.chat_buckets = {}
+
+    def reserve(self, chat_id):
+        """Бронирование отправки в чат; возвращает время ожидания."""
+        bucket = self.chat_buckets.get(chat_id)
+        if bucket is None:
+            if len(self.chat_buckets) >= PRUNE_THRESHOLD:
+                self.prune()
+            bucket = self.chat_buckets[chat_id] = TokenBucket(
+                self.chat_rate, 1, self.clock)
+        delay = max(self.global_bucket.delay(), bucket.delay())
+        self.global_bucket.take()
+        bucket.take()
+        return delay
+
+    def prune(self):
+        """Удаление вёдер чатов, в которые давно ничего не отправлялось."""
+        self.chat_buckets = {
+            chat_id: bucket for chat_id, bucket in self.chat_buckets.items()
+            if not bucket.idle
+        }
+
+
+def is_telegram_failure(error):
+    """Ошибка сети Телеграма, а не конкретного сообщения или чата."""
+    return (isinstance(error, telegram.error.NetworkError)
+            and not isinstance(error, telegram.error.BadRequest))
+
+
+class DeliveryQueue:
+    """Асинхронная очередь отправки сообщений.
+
+    Используется как асинхронный контекстный менеджер: на входе
+    запускаются обработчики, на выходе очередь дожидается отправки
+    всех сообщений. При `RetryAfter` отправка приостанавливается
+    для всей очереди, при разомкнутом предохранителе сообщения ждут
+    его пробного вызова.
+    """
+
+    def __init__(self, bot, executor=None, workers=DELIVERY_WORKERS,
+                 limiter=None, breaker=None, clock=time.monotonic):
+        self.bot = bot
+        self.executor = executor
+        self.workers = workers
+        self.clock = clock
+        self.limiter = limiter or RateLimiter(clock=clock)
+        self.breaker = breaker or CircuitBreaker(
+            'telegram', is_failure=is_telegram_failure, clock=clock)
+        self.queue = None
+        self.tasks = []
+        self.paused_until = 0.0
+        self.in_flight = 0
+        self.sent = 0
+        self.failed = 0
+        self.retries = 0
+        QUEUE_DEPTH.set_function(lambda: self.metrics()['depth'])
+
+    async def __aenter__(self):
+        """Запуск обработчиков очереди."""
+        self.queue = asyncio.Queue()
+        self.tasks = [asyncio.create_task(self.worker())
+                      for _ in range(self.workers)]
+        return self
+
+    async def __aexit__(self, *exc_info):
+        """Ожидание отправки и остановка обработчиков."""
+        await self.drain()
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        self.tasks = []
+
+    def put(self, chat_id, message):
+        """Постановка сообщения в очередь; возвращает future с итогом."""
+        future = asyncio.get_running_loop().create_future()
+        self.queue.put_nowait((chat_id, message, future))
+        return future
+
+    async def drain(self):
+        """Ожидание отправки всех сообщений из очереди."""
+        await self.queue.join()
+
+    def metrics(self):
+        """Глубина очереди и счётчики отправки."""
+        return {
+            'depth': self.queue.qsize() if self.queue else 0,
+            'in_flight': self.in_flight,
+            'sent': self.sent,
+            'failed': self.failed,
+            'retries': self.retries,
+            'paused_for': max(0.0, self.paused_until - self.clock()),
+        }
+
+    async def worker(self):
+        """Обработчик очереди.
+
+        Сообщение отправляется, даже если его future уже отменён:
+        отменить можно ожидание итога, но не саму отправку.
+        """
+        while True:
+            chat_id, message, future = await self.queue.get()
+            self.in_flight += 1
+            try:
+                result = await self.deliver(chat_id, message)
+                if not future.done():
+                    future.set_result(result)
+            except Exception as error:
+                if not future.done():
+                    future.set_exception(error)
+            finally:
+                self.in_flight -= 1
+                self.queue.task_done()
+
+    async def deliver(self, chat_id, message):
+        """Отправка с ожиданием лимитов и повтором после `RetryAfter`."""
+        loop = asyncio.get_running_loop()
+        error = RETRY_LIMIT_ERROR
+        attempts = 0
+        while attempts < MAX_RETRY_AFTER:
+            pause = self.paused_until - self.clock()
+            if pause > 0:
+                await asyncio.sleep(pause)
+            delay = self.limiter.reserve(chat_id)
+            if delay:
+                await asyncio.sleep(delay)
+            try:
+                with SEND_SECONDS.time():
+                    await loop.run_in_executor(self.executor, partial(
+                        self.breaker.call, self.bot.send_message,
+                        chat_id=chat_id, text=message))
+            except CircuitOpenError:
+                await asyncio.sleep(self.breaker.retry_in() or BREAKER_POLL)
+                continue
+            except telegram.error.RetryAfter as retry:
+                attempts += 1
+                self.retries += 1
+                logging.warning(RETRY_AFTER_MESSAGE.format(
+                    seconds=retry.retry_after))
+                self.paused_until = max(self.paused_until,
+                                        self.clock() + retry.retry_after)
+                continue
+            except telegram.error.TelegramError as send_error:
+                error = send_error
+                break
+            self.sent += 1
+            SENDS.inc(result='sent')
+            logging.debug(DEBUG_MESSAGE.format(message=message,
+                                               chat_id=chat_id))
+            return True
+        self.failed += 1
+        SENDS.inc(result='failed')
+        logging.error(ERROR_MESSAGE.format(error=error, message=message,
+                                           chat_id=chat_id))
+        return False
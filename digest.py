@@ -0,0 +1,68 @@
+"""Сводки: ожидающие сообщения одного чата одним сообщением Телеграма."""
+import os
+from collections import namedtuple
+
+DIGEST_WINDOW = os.getenv('DIGEST_WINDOW')
+TELEGRAM_MESSAGE_LIMIT = 4096
+DIGEST_SEPARATOR = '\n\n'
+
+Digest = namedtuple('Digest', ('chat_id', 'text', 'messages'))
+
+
+def split_text(text, limit=TELEGRAM_MESSAGE_LIMIT):
+    """Части текста не длиннее `limit`, по возможности по переводу строки."""
+    parts = []
+    while len(text) > limit:
+        cut = text.rfind('\n', 0, limit + 1)
+        if cut <= 0:
+            cut = limit
+        parts.append(text[:cut])
+        text = text[cut:].lstrip('\n')
+    if text:
+        parts.append(text)
+    return parts
+
+
+def build_digests(messages, limit=TELEGRAM_MESSAGE_LIMIT):
+    """Сводки по чатам в порядке сообщений.
+
+    Тексты сообщений одного чата склеиваются через пустую строку,
+    пока сводка укладывается в `limit`. Сообщение длиннее `limit`
+    отправляется отдельно несколькими частями.
+    """
+    chats = {}
+    for message in messages:
+        chats.setdefault(message.chat_id, []).append(message)
+    digests = []
+    for chat_id, chat_messages in chats.items():
+        texts, included, size = [], [], 0
+        for message in chat_messages:
+            if len(message.text) > limit:
+                digests.extend(
+                    Digest(chat_id, part, (message,))
+                    for part in split_text(message.text, limit)
+                )
+                continue
+            extra = len(message.text) + (len(DIGEST_SEPARATOR)
+                                         if texts else 0)
+            if texts and size + extra > limit:
+                digests.append(Digest(chat_id, DIGEST_SEPARATOR.join(texts),
+                                      tuple(included)))
+                texts, included, size = [], [], 0
+                extra = len(message.text)
+            texts.append(message.text)
+            included.append(message)
+            size += extra
+        if texts:
+            digests.append(Digest(chat_id, DIGEST_SEPARATOR.join(texts),
+                                  tuple(included)))
+    return digests
+
+
+def digest_results(digests, results):
+    """Итог по исходным сообщениям: доставлено, если доставлены все части."""
+    sent = {}
+    for digest, result in zip(digests, results):
+        for message in digest.messages:
+            sent[message] = sent.get(message, True) and bool(result)
+    return list(sent.items())
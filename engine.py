@@ -0,0 +1,624 @@
+"""Асинхронный опрос API ЯП для множества пользователей в одном процессе."""
+import asyncio
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+
+import telegram
+from telegram.utils.request import Request
+
+from alerts import ErrorAggregator
+from breaker import CircuitBreaker
+from cache import ResponseCache
+from changes import change_key, detect_changes
+from clock import SYSTEM_CLOCK
+from commands import (TELEGRAM_COMMANDS, TELEGRAM_WEBHOOK_URL, StatusIndex,
+                      start_commands)
+from delivery import (DELIVERY_WORKERS, GLOBAL_RATE, DeliveryQueue,
+                      RateLimiter)
+from digest import DIGEST_WINDOW, Digest, build_digests, digest_results
+from events import SQLiteEventStore
+from exceptions import (CircuitOpenError, ResponseError, TenantsError,
+                        TokenError)
+from homework import (PRACTICUM_TOKEN, RETRY_PERIOD, TELEGRAM_CHAT_ID,
+                      TELEGRAM_TOKEN, check_response, make_headers,
+                      next_from_date, request_api_answer)
+from hedging import configured_policy
+from http_client import POOL_SIZE, PracticumClient
+from leases import LEASE_DB, LeaseCoordinator, SQLiteLeaseStore
+from log_config import build_log_handlers, log_payload
+from metrics import (CPU_BUCKETS, METRICS_PORT, METRICS_SERVER_MESSAGE,
+                     Counter, Gauge, Histogram, start_metrics_server)
+from pipeline import Pipeline, Stage
+from registry import TenantRegistry
+from scheduler import PollScheduler
+from storage import MemoryStateStore, OutboxMessage, SQLiteStateStore
+from tenants import Tenant, load_tenants
+from validation import render_status, validate_homeworks
+
+POLL_CONCURRENCY = int(os.getenv('POLL_CONCURRENCY', 32))
+TENANTS_FILE = os.getenv('TENANTS_FILE')
+DISPATCH_TICK = 1
+HOUSEKEEPING_TICK = 1
+OUTBOX_BATCH = int(os.getenv('OUTBOX_BATCH', 100))
+OUTBOX_TICK = float(os.getenv('OUTBOX_TICK', 0.5))
+STAGE_CONCURRENCY = {
+    name: int(os.getenv(f'{name.upper()}_CONCURRENCY', 1))
+    for name in ('validate', 'diff', 'render', 'commit')
+}
+
+TENANT_ERROR = 'Сбой при опросе пользователя {chat_id}: {error}'
+INVALID_HOMEWORKS_ERROR = ('Пропущено некорректных работ пользователя '
+                           '{chat_id}: {count}, первые: {errors}')
+INVALID_HOMEWORKS_SHOWN = 5
+LEASE_ERROR = 'Не удалось продлить аренду долей пользователей: {error}'
+OUTBOX_ERROR = 'Сбой отправки сообщений из outbox: {error}'
+HOUSEKEEPING_ERROR = 'Сбой записи состояния или сводки ошибок: {error}'
+TELEGRAM_TOKEN_ERROR = 'Отсутствует переменная окружения TELEGRAM_TOKEN'
+NO_TENANTS_ERROR = ('Не задан TENANTS_FILE и отсутствуют PRACTICUM_TOKEN '
+                    'или TELEGRAM_CHAT_ID')
+
+POLLS = Counter('bot_polls_total', 'Опросы API ЯП')
+CHANGES = Counter('bot_changes_total', 'Обнаруженные изменения статусов')
+FAILURES = Counter('bot_failures_total',
+                   'Ошибки опроса по классу исключения')
+FETCH_SECONDS = Histogram('bot_practicum_request_seconds',
+                          'Длительность запроса к API ЯП')
+STAGE_SECONDS = Histogram('bot_stage_seconds',
+                          'Длительность проверки и разбора ответа',
+                          buckets=CPU_BUCKETS)
+INVALID_HOMEWORKS = Counter('bot_invalid_homeworks_total',
+                            'Пропущенные некорректные записи о работах')
+DIGEST_SAVED = Counter('bot_digest_saved_sends_total',
+                       'Отправки, сэкономленные объединением в сводки')
+SCHEDULER_LAG = Gauge('bot_scheduler_lag_seconds',
+                      'Отставание опроса от расписания')
+PRACTICUM_CONNECTIONS = Gauge(
+    'bot_practicum_connections',
+    'Запросы к API ЯП, установленные и переиспользованные соединения')
+CONNECTION_STATS = ('requests', 'handshakes', 'reused')
+
+
+def is_practicum_failure(error):
+    """Сбой API ЯП, а не ошибка конкретного пользователя.
+
+    Ответы 4xx (например, отозванный токен) касаются одного
+    пользователя и предохранитель не размыкают.
+    """
+    if isinstance(error, ResponseError):
+        return (error.status_code is not None
+                and error.status_code >= HTTPStatus.INTERNAL_SERVER_ERROR)
+    return isinstance(error, (ConnectionError, TimeoutError))
+
+
+class Poll:
+    """Опрос одного пользователя, проходящий через стадии конвейера."""
+
+    __slots__ = ('tenant', 'timestamp', 'response', 'homeworks', 'changes',
+                 'texts', 'messages')
+
+    def __init__(self, tenant, timestamp):
+        self.tenant = tenant
+        self.timestamp = timestamp
+        self.response = None
+        self.homeworks = []
+        self.changes = []
+        self.texts = []
+        self.messages = []
+
+
+class PollingEngine:
+    """Опрос пользователей ограниченным числом сопрограмм и сокетов."""
+
+    def __init__(self, bot, tenants, concurrency=POLL_CONCURRENCY,
+                 retry_period=RETRY_PERIOD, client=None, store=None,
+                 delivery=None, scheduler=None, breaker=None,
+                 alert_chat_id=None, alerts=None, endpoint=None,
+                 coordinator=None, cache=None, digest_window=None,
+                 index=None, events=None, clock=None, executor=None):
+        self.bot = bot
+        self.clock = clock = clock or SYSTEM_CLOCK
+        self.index = index or StatusIndex(clock=clock.time)
+        self.events = events
+        self.digest_window = digest_window
+        self.digest_deadlines = {}
+        self.endpoint = endpoint
+        self.coordinator = coordinator
+        self.alert_chat_id = alert_chat_id
+        self.alerts = alerts or ErrorAggregator(clock=clock.monotonic)
+        self.delivery = delivery or DeliveryQueue(bot, clock=clock.monotonic)
+        self.breaker = breaker or CircuitBreaker(
+            'practicum', is_failure=is_practicum_failure,
+            clock=clock.monotonic)
+        self.client = client or PracticumClient(
+            pool_size=POOL_SIZE or concurrency,
+            hedging=configured_policy(concurrency))
+        self.cache = cache or ResponseCache(clock=clock.monotonic)
+        self.store = store or MemoryStateStore()
+        self.concurrency = concurrency
+        self.registry = TenantRegistry()
+        self.scheduler = scheduler or PollScheduler(
+            base_interval=retry_period, clock=clock.monotonic,
+            due_at=self.registry.due_at)
+        self.rescheduled = asyncio.Event()
+        self.outbox_ready = asyncio.Event()
+        # Периоды фоновых задач; симуляция увеличивает их, чтобы
+        # не просыпаться впустую каждую виртуальную секунду.
+        self.dispatch_tick = DISPATCH_TICK
+        self.housekeeping_tick = HOUSEKEEPING_TICK
+        self.outbox_tick = OUTBOX_TICK
+        self.pipeline = None
+        self.loop = None
+        self.tenants = self.registry.tenants
+        self.timestamps = self.registry.timestamps
+        self.statuses = self.registry.statuses
+        self.failures = self.registry.failures
+        self.add_tenants(tenants)
+        SCHEDULER_LAG.set_function(self.scheduler.lag)
+        for kind in CONNECTION_STATS:
+            PRACTICUM_CONNECTIONS.set_function(
+                lambda kind=kind: self.client.stats()[kind], kind=kind)
+        self.executor = executor or ThreadPoolExecutor(max_workers=concurrency)
+
+    def add_tenants(self, tenants):
+        """Подключение пользователей с их сохранённым состоянием.
+
+        Пользователи сразу попадают в расписание, поэтому их можно
+        добавлять и в уже работающий движок.
+        """
+        state = self.store.load_all()
+        names = self.homework_names()
+        for tenant in tenants:
+            if tenant.key in self.registry:
+                continue
+            record = self.registry.add(tenant, *state.get(tenant.key, (0, {})))
+            self.index.seed(tenant.chat_id, record.statuses,
+                            names.get(tenant.key))
+            self.scheduler.add(record.key)
+        self.rescheduled.set()
+
+    def take_over(self, shards):
+        """Загрузка состояния пользователей из полученных долей.
+
+        Доля могла работать на другом узле, поэтому отметки времени
+        и статусы в памяти устарели.
+        """
+        state = self.store.load_all()
+        names = self.homework_names()
+        for tenant in self.tenants:
+            if self.coordinator.shard_of(tenant.key) not in shards:
+                continue
+            timestamp, statuses = state.get(tenant.key, (0, {}))
+            self.timestamps[tenant.key] = timestamp
+            self.statuses[tenant.key] = statuses
+            self.index.seed(tenant.chat_id, statuses, names.get(tenant.key))
+            self.scheduler.add(tenant.key)
+        self.rescheduled.set()
+
+    def homework_names(self):
+        """Имена работ из журнала переходов для снимка статусов."""
+        return self.events.names() if self.events is not None else {}
+
+    def reply(self, chat_id, text):
+        """Ответ на команду через общую очередь отправки.
+
+        Вызывается из потоков `Updater`, поэтому сообщение передаётся
+        в цикл событий движка. До запуска движка ответ уходит напрямую.
+        """
+        if self.loop is None:
+            self.bot.send_message(chat_id=chat_id, text=text)
+        else:
+            self.loop.call_soon_threadsafe(self.delivery.put, chat_id, text)
+
+    def fetch(self, tenant, timestamp):
+        """Запрос статусов домашних работ под защитой предохранителя.
+
+        Чаты одного аккаунта ЯП с одинаковой отметкой времени получают
+        ответ из кеша, а одновременные запросы выполняются один раз.
+        """
+        return self.cache.get(
+            (tenant.account, timestamp),
+            lambda: self.breaker.call(self.request, tenant, timestamp)
+        )
+
+    def request(self, tenant, timestamp):
+        """Запрос статусов домашних работ пользователя."""
+        with FETCH_SECONDS.time():
+            return request_api_answer(
+                timestamp, make_headers(tenant.practicum_token),
+                http_get=self.client.get, endpoint=self.endpoint
+            )
+
+    def alert(self, message):
+        """Уведомление администратора, если задан его чат."""
+        if message and self.alert_chat_id:
+            self.delivery.put(self.alert_chat_id, message)
+
+    def health(self):
+        """Состояние предохранителей, конвейера и очереди отправки."""
+        return {
+            'practicum': self.breaker.snapshot(),
+            'telegram': self.delivery.breaker.snapshot(),
+            'delivery': self.delivery.metrics(),
+            'pipeline': self.pipeline.snapshot() if self.pipeline else {},
+            'connections': self.client.stats(),
+        }
+
+    async def run_blocking(self, func, *args):
+        """Выполнение блокирующего вызова в общем пуле потоков."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, func, *args)
+
+    def fetch_response(self, poll):
+        """Стадия `fetch`: запрос к API ЯП."""
+        poll.response = self.fetch(poll.tenant, poll.timestamp)
+        log_payload(poll.response)
+        return poll
+
+    def validate(self, poll):
+        """Стадия `validate`: проверка ответа API и списка работ.
+
+        Испорченные записи пропускаются и попадают в журнал, остальные
+        работы обрабатываются как обычно.
+        """
+        with STAGE_SECONDS.time(stage='check_response'):
+            check_response(poll.response)
+            poll.homeworks, errors = validate_homeworks(
+                poll.response['homeworks'])
+        if errors:
+            for error in errors:
+                INVALID_HOMEWORKS.inc(reason=error.reason)
+            logging.error(INVALID_HOMEWORKS_ERROR.format(
+                chat_id=poll.tenant.chat_id, count=len(errors),
+                errors=errors[:INVALID_HOMEWORKS_SHOWN]))
+        return poll
+
+    def diff(self, poll):
+        """Стадия `diff`: изменения статусов по сравнению с известными."""
+        poll.changes = detect_changes(poll.homeworks,
+                                      self.statuses[poll.tenant.key],
+                                      cold_start=poll.timestamp == 0)
+        CHANGES.inc(len(poll.changes))
+        return poll
+
+    def render(self, poll):
+        """Стадия `render`: сообщения о новых статусах."""
+        with STAGE_SECONDS.time(stage='parse_status'):
+            poll.texts = [render_status(change.homework)
+                          for change in poll.changes]
+            poll.messages = [
+                OutboxMessage(change_key(poll.tenant.key, change),
+                              poll.tenant.chat_id, text)
+                for change, text in zip(poll.changes, poll.texts)
+                if not change.silent
+            ]
+        return poll
+
+    def commit(self, poll):
+        """Стадия `commit`: статусы, сообщения и отметка времени в outbox.
+
+        Сообщения отправляет `deliver_outbox` — последняя стадия,
+        отделённая от опроса хранилищем.
+        """
+        key = poll.tenant.key
+        statuses = {change.key: change.new_status for change in poll.changes}
+        timestamp = next_from_date(poll.timestamp, poll.response)
+        self.timestamps[key] = timestamp
+        self.statuses[key].update(statuses)
+        self.store.checkpoint(
+            key, timestamp, statuses, poll.messages,
+            not_before=(self.digest_deadline(poll.tenant.chat_id)
+                        if poll.messages else 0.0)
+        )
+        if self.events is not None and poll.changes:
+            self.events.record(key, poll.changes)
+        for change, text in zip(poll.changes, poll.texts):
+            self.index.record(poll.tenant.chat_id, change.key, text,
+                              notify=not change.silent)
+        return poll
+
+    def digest_deadline(self, chat_id):
+        """Время отправки сводки, в которую попадут новые сообщения чата.
+
+        Первое сообщение открывает окно `digest_window`; сообщения,
+        появившиеся до его конца, отправляются вместе с ним.
+        """
+        if self.digest_window is None:
+            return 0.0
+        now = self.clock.time()
+        deadline = self.digest_deadlines.get(chat_id, 0.0)
+        if deadline <= now:
+            deadline = self.digest_deadlines[chat_id] = (
+                now + self.digest_window)
+        return deadline
+
+    def stages(self):
+        """Стадии конвейера опроса с настройками из окружения."""
+        return [
+            Stage('fetch', self.fetch_response, self.concurrency,
+                  maxsize=self.concurrency, blocking=True),
+        ] + [
+            Stage(name, handler, STAGE_CONCURRENCY[name],
+                  blocking=STAGE_CONCURRENCY[name] > 1)
+            for name, handler in (('validate', self.validate),
+                                  ('diff', self.diff),
+                                  ('render', self.render),
+                                  ('commit', self.commit))
+        ]
+
+    async def poll_tenant(self, tenant):
+        """Один цикл опроса пользователя теми же стадиями, что в `run`."""
+        poll = Poll(tenant, self.timestamps[tenant.key])
+        await self.run_blocking(self.fetch_response, poll)
+        for stage in (self.validate, self.diff, self.render, self.commit):
+            stage(poll)
+
+    def admit(self, tenant):
+        """Допуск пользователя к опросу.
+
+        Пользователя из чужой доли только переносят на следующий срок.
+        """
+        if self.coordinator and not self.coordinator.owns(tenant.key):
+            self.scheduler.reschedule(tenant.key, self.statuses[tenant.key])
+            self.rescheduled.set()
+            return False
+        POLLS.inc()
+        return True
+
+    def finish(self, tenant, error=None):
+        """Учёт результата опроса и планирование следующего."""
+        if error is None:
+            self.failures[tenant.key] = 0
+        else:
+            self.failures[tenant.key] += 1
+            logging.log(
+                logging.DEBUG if isinstance(error, CircuitOpenError)
+                else logging.ERROR,
+                TENANT_ERROR.format(chat_id=tenant.chat_id, error=error)
+            )
+            FAILURES.inc(exception=type(error).__name__)
+            self.alert(self.alerts.record(error))
+        self.scheduler.reschedule(tenant.key, self.statuses[tenant.key],
+                                  self.failures[tenant.key])
+        self.rescheduled.set()
+
+    def done(self, poll):
+        """Успешный опрос: новые сообщения сразу передаются в отправку."""
+        self.finish(poll.tenant)
+        if poll.messages:
+            self.outbox_ready.set()
+
+    async def poll_once(self, tenant):
+        """Опрос пользователя с учётом ошибок и планированием следующего."""
+        if not self.admit(tenant):
+            return True
+        try:
+            await self.poll_tenant(tenant)
+        except Exception as error:
+            self.finish(tenant, error)
+        else:
+            self.finish(tenant)
+        return self.failures[tenant.key] == 0
+
+    async def poll_worker(self, tenants):
+        """Опрос пользователей из общего итератора до его исчерпания."""
+        failed = 0
+        for tenant in tenants:
+            failed += not await self.poll_once(tenant)
+        return failed
+
+    async def poll_round(self):
+        """Внеочередной опрос всех пользователей; возвращает число ошибок."""
+        tenants = iter(self.tenants)
+        async with self.delivery:
+            failed = await asyncio.gather(*(
+                self.poll_worker(tenants) for _ in range(self.concurrency)
+            ))
+            while await self.send_outbox():
+                pass
+        self.store.flush()
+        if self.events is not None:
+            self.events.flush()
+        return sum(failed)
+
+    async def send_outbox(self):
+        """Отправка пачки сообщений из outbox; возвращает её размер.
+
+        В режиме сводок сообщения одного чата отправляются одним
+        сообщением Телеграма (или несколькими, если не влезают в лимит).
+        """
+        batch = self.store.claim_messages(OUTBOX_BATCH, now=self.clock.time())
+        if self.digest_window is None:
+            digests = [Digest(message.chat_id, message.text, (message,))
+                       for message in batch]
+        else:
+            digests = build_digests(batch)
+            DIGEST_SAVED.inc(max(len(batch) - len(digests), 0))
+        results = await asyncio.gather(*(
+            self.delivery.put(digest.chat_id, digest.text)
+            for digest in digests
+        ))
+        if batch:
+            self.store.settle(digest_results(digests, results),
+                              now=self.clock.time())
+        return len(batch)
+
+    async def deliver_outbox(self):
+        """Отправка сообщений из outbox по мере их появления.
+
+        Новые сообщения будят отправку сразу; раз в `outbox_tick`
+        outbox проверяется и без этого — ради повторов и сводок.
+        Сбой хранилища (например, занятая другим процессом база)
+        не останавливает отправку: попытка повторяется через
+        `outbox_tick`.
+        """
+        while True:
+            self.outbox_ready.clear()
+            try:
+                sent = await self.send_outbox()
+            except Exception as error:
+                logging.error(OUTBOX_ERROR.format(error=error))
+                sent = 0
+            if sent < OUTBOX_BATCH:
+                await self.wait_event(self.outbox_ready, self.outbox_tick)
+
+    @staticmethod
+    async def wait_event(event, timeout):
+        """Ожидание события не дольше `timeout` секунд."""
+        # Таймер вместо asyncio.wait_for: тот может потерять отмену,
+        # если событие наступает одновременно с ней.
+        timer = asyncio.get_running_loop().call_later(timeout, event.set)
+        try:
+            await event.wait()
+        finally:
+            timer.cancel()
+
+    async def dispatch(self, pipeline):
+        """Передача пользователей в конвейер по наступлении их времени."""
+        while True:
+            for key in self.scheduler.pop_due():
+                tenant = self.registry.tenant(key)
+                if self.admit(tenant):
+                    await pipeline.put(Poll(tenant, self.timestamps[key]))
+            wait = self.scheduler.wait_time()
+            self.rescheduled.clear()
+            await self.wait_event(
+                self.rescheduled,
+                self.dispatch_tick if wait is None
+                else min(wait, self.dispatch_tick)
+            )
+
+    async def housekeeping(self):
+        """Запись состояния и сводки об ошибках раз в `housekeeping_tick`.
+
+        Работает отдельно от `dispatch`, который под нагрузкой
+        просыпается от каждого перепланирования и не ждёт таймаута.
+        Сбой одной итерации записывается в журнал, следующая
+        выполняется как обычно.
+        """
+        while True:
+            await asyncio.sleep(self.housekeeping_tick)
+            try:
+                self.store.flush()
+                if self.events is not None:
+                    # Может уплотнять журнал, поэтому не в цикле событий.
+                    await self.run_blocking(self.events.flush)
+                for message in self.alerts.pending():
+                    self.alert(message)
+            except Exception as error:
+                logging.error(HOUSEKEEPING_ERROR.format(error=error))
+
+    async def hold_leases(self):
+        """Продление аренды долей каждые `renew_interval` секунд."""
+        while True:
+            try:
+                gained, lost = await self.run_blocking(
+                    self.coordinator.balance)
+            except Exception as error:
+                logging.error(LEASE_ERROR.format(error=error))
+            else:
+                if lost:
+                    self.store.flush()
+                if gained:
+                    self.take_over(gained)
+            await asyncio.sleep(self.coordinator.renew_interval)
+
+    async def run(self):
+        """Бесконечный опрос по расписанию планировщика.
+
+        Фоновые задачи работают вместе с `dispatch`; если одна из них
+        завершилась с ошибкой, опрос останавливается с той же ошибкой,
+        а не продолжается без неё.
+        """
+        self.rescheduled = asyncio.Event()
+        self.outbox_ready = asyncio.Event()
+        self.loop = asyncio.get_running_loop()
+        self.pipeline = pipeline = Pipeline(
+            self.stages(),
+            on_done=self.done,
+            on_error=lambda poll, error: self.finish(poll.tenant, error),
+            executor=self.executor
+        )
+        async with self.delivery, pipeline:
+            workers = [asyncio.create_task(self.dispatch(pipeline)),
+                       asyncio.create_task(self.housekeeping()),
+                       asyncio.create_task(self.deliver_outbox())]
+            if self.coordinator:
+                workers.append(asyncio.create_task(self.hold_leases()))
+            try:
+                done, _ = await asyncio.wait(
+                    workers, return_when=asyncio.FIRST_EXCEPTION)
+                for worker in done:
+                    worker.result()
+            finally:
+                self.loop = None
+                for worker in workers:
+                    worker.cancel()
+                if self.coordinator:
+                    self.store.flush()
+                    self.coordinator.release()
+
+
+def configured_tenants():
+    """Пользователи из TENANTS_FILE, а без него — владелец бота из .env."""
+    if TENANTS_FILE:
+        return load_tenants(TENANTS_FILE)
+    if PRACTICUM_TOKEN and TELEGRAM_CHAT_ID:
+        return [Tenant(PRACTICUM_TOKEN, TELEGRAM_CHAT_ID)]
+    raise TenantsError(NO_TENANTS_ERROR)
+
+
+def create_engine(tenants, global_rate=GLOBAL_RATE, clock=SYSTEM_CLOCK):
+    """Движок с ботом, хранилищем SQLite и уведомлениями владельцу.
+
+    `global_rate` — доля общего лимита отправок бота, доступная
+    этому процессу; `clock` — часы движка и его компонентов.
+    """
+    if TELEGRAM_TOKEN is None:
+        logging.critical(TELEGRAM_TOKEN_ERROR)
+        raise TokenError(TELEGRAM_TOKEN_ERROR)
+    bot = telegram.Bot(token=TELEGRAM_TOKEN,
+                       request=Request(con_pool_size=DELIVERY_WORKERS))
+    return PollingEngine(
+        bot, tenants, store=SQLiteStateStore(),
+        events=SQLiteEventStore(clock=clock.time), clock=clock,
+        delivery=DeliveryQueue(bot, clock=clock.monotonic,
+                               limiter=RateLimiter(global_rate,
+                                                   clock=clock.monotonic)),
+        alert_chat_id=TELEGRAM_CHAT_ID,
+        digest_window=(float(DIGEST_WINDOW) if DIGEST_WINDOW is not None
+                       else None),
+        coordinator=(LeaseCoordinator(SQLiteLeaseStore(), clock=clock.time)
+                     if LEASE_DB else None)
+    )
+
+
+def main():
+    """Запуск опроса пользователей с сохранением состояния."""
+    engine = create_engine(configured_tenants())
+    if METRICS_PORT:
+        start_metrics_server(METRICS_PORT, health=engine.health)
+        logging.info(METRICS_SERVER_MESSAGE.format(port=METRICS_PORT))
+    updater = None
+    if TELEGRAM_COMMANDS or TELEGRAM_WEBHOOK_URL:
+        updater = start_commands(engine.bot, engine.index,
+                                 reply=engine.reply)
+    try:
+        asyncio.run(engine.run())
+    finally:
+        if updater is not None:
+            updater.stop()
+        engine.client.close()
+        engine.store.close()
+        engine.events.close()
+
+
+if __name__ == '__main__':
+    queue_handler, log_listener = build_log_handlers(__file__ + '.log')
+    logging.basicConfig(level=logging.INFO, handlers=[queue_handler])
+    log_listener.start()
+    try:
+        main()
+    finally:
+        log_listener.stop()
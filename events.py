@@ -0,0 +1,189 @@
+"""Журнал переходов статусов домашних работ.
+
+Каждое изменение, найденное движком, дописывается в таблицу `events`
+SQLite: пользователь, работа, прежний и новый статус и время перехода
+(`date_updated` из ответа API). Индексы по пользователю, работе
+и времени позволяют отвечать на запросы вроде «переходы за последний
+час» или «текущий статус работы» без полного просмотра таблицы.
+"""
+import os
+import sqlite3
+import threading
+import time
+from collections import namedtuple
+from datetime import datetime
+
+EVENTS_DB = os.getenv('EVENTS_DB', 'events.sqlite3')
+EVENTS_RETENTION = float(os.getenv('EVENTS_RETENTION', 180 * 24 * 3600))
+EVENTS_COMPACT_INTERVAL = float(os.getenv('EVENTS_COMPACT_INTERVAL',
+                                          24 * 3600))
+
+Transition = namedtuple(
+    'Transition',
+    ('tenant', 'homework', 'name', 'old_status', 'new_status', 'updated_at')
+)
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY,
+    tenant TEXT NOT NULL,
+    homework TEXT NOT NULL,
+    name TEXT,
+    old_status TEXT,
+    new_status TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE UNIQUE INDEX IF NOT EXISTS events_key
+    ON events (tenant, homework, updated_at, new_status);
+CREATE INDEX IF NOT EXISTS events_time ON events (updated_at);
+CREATE INDEX IF NOT EXISTS events_homework ON events (name, updated_at);
+'''
+
+COLUMNS = 'tenant, homework, name, old_status, new_status, updated_at'
+
+
+def updated_at(homework, default):
+    """Время изменения работы из `date_updated` или `default`."""
+    value = homework.get('date_updated')
+    if not isinstance(value, str):
+        return default
+    try:
+        return datetime.fromisoformat(value.replace('Z', '+00:00')).timestamp()
+    except ValueError:
+        return default
+
+
+def transitions(tenant, changes, now=None):
+    """Переходы статусов из изменений `detect_changes`."""
+    now = time.time() if now is None else now
+    return [
+        Transition(tenant, change.key, change.homework.get('homework_name'),
+                   change.old_status, change.new_status,
+                   updated_at(change.homework, now))
+        for change in changes
+    ]
+
+
+class SQLiteEventStore:
+    """Журнал переходов в SQLite с пакетной записью и уплотнением.
+
+    Переходы накапливаются в памяти и записываются в `flush`. Повторно
+    найденный переход (тот же статус с тем же `date_updated`)
+    не дублируется. Раз в `compact_interval` секунд `flush` уплотняет
+    журнал: из переходов старше `retention` у каждой работы остаётся
+    только последний, поэтому текущий статус всегда известен, а место
+    возвращается файлу базы.
+    """
+
+    def __init__(self, path=EVENTS_DB, retention=EVENTS_RETENTION,
+                 compact_interval=EVENTS_COMPACT_INTERVAL, clock=time.time):
+        self.retention = retention
+        self.compact_interval = compact_interval
+        self.clock = clock
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        # Действует только для новой базы: до создания таблиц.
+        self.connection.execute('PRAGMA auto_vacuum=INCREMENTAL')
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('PRAGMA synchronous=NORMAL')
+        self.connection.executescript(SCHEMA)
+        self.pending = []
+        self.compacted_at = clock()
+
+    def record(self, tenant, changes):
+        """Запоминание изменений статусов пользователя."""
+        events = transitions(tenant, changes, self.clock())
+        with self.lock:
+            self.pending.extend(events)
+
+    def write_pending(self):
+        """Запись накопленных переходов одной транзакцией."""
+        with self.lock:
+            events, self.pending = self.pending, []
+            if events:
+                with self.connection:
+                    self.connection.executemany(
+                        f'INSERT OR IGNORE INTO events ({COLUMNS})'
+                        ' VALUES (?, ?, ?, ?, ?, ?)', events)
+
+    def flush(self):
+        """Запись накопленных переходов и, если пора, уплотнение."""
+        self.write_pending()
+        now = self.clock()
+        if now - self.compacted_at >= self.compact_interval:
+            self.compact(now - self.retention)
+
+    def compact(self, before):
+        """Уплотнение переходов старше `before`; возвращает число удалённых."""
+        with self.lock:
+            with self.connection:
+                deleted = self.connection.execute(
+                    'DELETE FROM events WHERE updated_at < ? AND EXISTS ('
+                    ' SELECT 1 FROM events AS later'
+                    ' WHERE later.tenant = events.tenant'
+                    ' AND later.homework = events.homework'
+                    ' AND later.updated_at > events.updated_at)',
+                    (before,)
+                ).rowcount
+            self.connection.execute('PRAGMA incremental_vacuum')
+            self.compacted_at = self.clock()
+        return deleted
+
+    def query(self, where, params):
+        """Переходы по условию `where` в порядке времени."""
+        self.write_pending()
+        with self.lock:
+            rows = self.connection.execute(
+                f'SELECT {COLUMNS} FROM events WHERE {where}'
+                ' ORDER BY updated_at',
+                params
+            ).fetchall()
+        return [Transition(*row) for row in rows]
+
+    def since(self, start, end=None, tenant=None):
+        """Переходы за период, при заданном `tenant` — только его."""
+        end = float('inf') if end is None else end
+        if tenant is None:
+            return self.query('updated_at >= ? AND updated_at < ?',
+                              (start, end))
+        return self.query('tenant = ? AND updated_at >= ? AND updated_at < ?',
+                          (tenant, start, end))
+
+    def history(self, tenant, homework):
+        """Все сохранённые переходы работы пользователя."""
+        return self.query('tenant = ? AND homework = ?', (tenant, homework))
+
+    def by_name(self, name, start=0.0):
+        """Переходы работы с именем `name` у всех пользователей."""
+        return self.query('name = ? AND updated_at >= ?', (name, start))
+
+    def current(self, tenant, homework):
+        """Текущий статус работы пользователя или None."""
+        self.write_pending()
+        with self.lock:
+            row = self.connection.execute(
+                'SELECT new_status FROM events'
+                ' WHERE tenant = ? AND homework = ?'
+                ' ORDER BY updated_at DESC LIMIT 1',
+                (tenant, homework)
+            ).fetchone()
+        return row[0] if row else None
+
+    def names(self):
+        """Последние имена работ: {пользователь: {работа: имя}}."""
+        self.write_pending()
+        with self.lock:
+            # Голые колонки при max() берутся из строки с максимумом.
+            rows = self.connection.execute(
+                'SELECT tenant, homework, name, max(updated_at) FROM events'
+                ' WHERE name IS NOT NULL GROUP BY tenant, homework'
+            ).fetchall()
+        names = {}
+        for tenant, homework, name, _ in rows:
+            names.setdefault(tenant, {})[homework] = name
+        return names
+
+    def close(self):
+        """Запись переходов и закрытие базы."""
+        self.write_pending()
+        self.connection.close()
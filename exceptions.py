@@ -2,7 +2,21 @@
 class ResponseError(Exception):
     """ошибка при запросе"""
 
-    pass
+    def __init__(self, message='', status_code=None):
+        super().__init__(message)
+        self.status_code = status_code
 
 class TokenError(Exception):
-    pass
\ No newline at end of file
+    pass
+
+
+class TenantsError(Exception):
+    """ошибка в списке пользователей"""
+
+    pass
+
+
+class CircuitOpenError(Exception):
+    """внешний сервис временно отключён предохранителем"""
+
+    pass
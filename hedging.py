@@ -0,0 +1,137 @@
+"""Дублирование медленных запросов (hedged requests).
+
+Если запрос не ответил за время, которое укладывается в заданный
+перцентиль недавних задержек, отправляется второй такой же запрос,
+и используется ответ, пришедший первым. Доля дополнительных запросов
+ограничена бюджетом.
+"""
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from metrics import Counter, Gauge
+
+HEDGE_PERCENTILE = os.getenv('PRACTICUM_HEDGE_PERCENTILE')
+HEDGE_BUDGET = float(os.getenv('PRACTICUM_HEDGE_BUDGET', 0.05))
+HEDGE_WINDOW = 1000
+HEDGE_MIN_SAMPLES = 50
+HEDGE_REFRESH = 50
+HEDGE_BURST = 10
+
+HEDGES = Counter('bot_hedges_total',
+                 'Дополнительные запросы: отправленные, выигравшие, '
+                 'проигравшие и отклонённые бюджетом')
+HEDGE_THRESHOLD = Gauge('bot_hedge_threshold_seconds',
+                        'Задержка, после которой отправляется второй запрос')
+
+
+class HedgeBudget:
+    """Бюджет дополнительных запросов в доле от основных.
+
+    Каждый основной запрос добавляет `ratio` токена, второй запрос
+    тратит целый токен; накопить можно не больше `burst` токенов.
+    """
+
+    def __init__(self, ratio=HEDGE_BUDGET, burst=HEDGE_BURST):
+        self.ratio = ratio
+        self.burst = burst
+        self.tokens = 0.0
+        self.lock = threading.Lock()
+
+    def earn(self):
+        """Учёт основного запроса."""
+        with self.lock:
+            self.tokens = min(self.burst, self.tokens + self.ratio)
+
+    def spend(self):
+        """Попытка потратить токен на второй запрос."""
+        with self.lock:
+            if self.tokens < 1:
+                return False
+            self.tokens -= 1
+            return True
+
+
+class HedgingPolicy:
+    """Второй запрос после порога, равного перцентилю задержек.
+
+    Пока задержек меньше `min_samples`, запросы не дублируются.
+    Порог пересчитывается раз в `refresh` ответов по последним
+    `window` задержкам.
+    """
+
+    def __init__(self, percentile=0.95, budget=None, workers=32,
+                 window=HEDGE_WINDOW, min_samples=HEDGE_MIN_SAMPLES,
+                 refresh=HEDGE_REFRESH, clock=time.monotonic):
+        self.percentile = percentile
+        self.budget = budget or HedgeBudget()
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+        self.latencies = deque(maxlen=window)
+        self.min_samples = min_samples
+        self.refresh = refresh
+        self.clock = clock
+        self.threshold = None
+        self.observed = 0
+        self.lock = threading.Lock()
+        HEDGE_THRESHOLD.set_function(lambda: self.threshold or 0)
+
+    def observe(self, latency):
+        """Учёт задержки ответа и пересчёт порога."""
+        with self.lock:
+            self.latencies.append(latency)
+            self.observed += 1
+            if (len(self.latencies) >= self.min_samples
+                    and self.observed % self.refresh == 0):
+                ordered = sorted(self.latencies)
+                index = min(int(len(ordered) * self.percentile),
+                            len(ordered) - 1)
+                self.threshold = ordered[index]
+
+    def timed(self, func, args, kwargs):
+        """Вызов с замером задержки."""
+        started = self.clock()
+        result = func(*args, **kwargs)
+        self.observe(self.clock() - started)
+        return result
+
+    def call(self, func, *args, **kwargs):
+        """Вызов `func` с возможным вторым запросом.
+
+        Возвращается первый успешный результат; исключение поднимается,
+        только если не удались все отправленные запросы.
+        """
+        self.budget.earn()
+        primary = self.executor.submit(self.timed, func, args, kwargs)
+        if self.threshold is None:
+            return primary.result()
+        done, _ = wait([primary], timeout=self.threshold)
+        if done:
+            return primary.result()
+        if not self.budget.spend():
+            HEDGES.inc(result='denied')
+            return primary.result()
+        HEDGES.inc(result='issued')
+        hedge = self.executor.submit(self.timed, func, args, kwargs)
+        pending = {primary, hedge}
+        while True:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            succeeded = [future for future in done
+                         if future.exception() is None]
+            if succeeded or not pending:
+                future = (succeeded or list(done))[0]
+                HEDGES.inc(result='won' if future is hedge else 'lost')
+                return future.result()
+
+    def close(self):
+        """Остановка пула без ожидания проигравших запросов."""
+        self.executor.shutdown(wait=False)
+
+
+def configured_policy(workers):
+    """Политика из PRACTICUM_HEDGE_PERCENTILE или `None`, если не задана."""
+    if not HEDGE_PERCENTILE:
+        return None
+    return HedgingPolicy(percentile=float(HEDGE_PERCENTILE),
+                         workers=workers * 2)
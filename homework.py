@@ -7,7 +7,10 @@ import requests
 import telegram
 from dotenv import load_dotenv
 
+from alerts import ErrorAggregator
+from changes import detect_changes
 from exceptions import TokenError, ResponseError
+from log_config import build_log_handlers, log_payload
 
 load_dotenv()
 TELEGRAM_TOKEN = os.getenv('TELEGRAM_TOKEN')
@@ -15,9 +18,11 @@ PRACTICUM_TOKEN = os.getenv('PRACTICUM_TOKEN')
 TELEGRAM_CHAT_ID = os.getenv('TELEGRAM_CHAT_ID')
 
 RETRY_PERIOD = 600
+REQUEST_TIMEOUT = (3.05, 30)
 
 ENDPOINT = 'https://practicum.yandex.ru/api/user_api/homework_statuses/'
 HEADERS = {'Authorization': f'OAuth {PRACTICUM_TOKEN}'}
+REDACTED = 'OAuth ***'
 
 MESSAGE = 'Изменился статус проверки работы'
 API_ERROR = ('API сервиса ЯП недоступен: {error}.'
@@ -78,11 +83,27 @@ def check_tokens():
         raise TokenError('Отсутсвует обязательная переменная окружения')
 
 
+def redact_headers(headers):
+    """Заголовки запроса для сообщений об ошибках: без токена."""
+    return {name: REDACTED if name == 'Authorization' else value
+            for name, value in headers.items()}
+
+
+def make_headers(token):
+    """Заголовки авторизации для произвольного токена ЯП."""
+    return {'Authorization': f'OAuth {token}'}
+
+
 def send_message(bot, message):
     """Отправка сообщения в Телеграм."""
+    return send_chat_message(bot, TELEGRAM_CHAT_ID, message)
+
+
+def send_chat_message(bot, chat_id, message):
+    """Отправка сообщения в указанный чат Телеграм."""
     try:
         bot.send_message(
-            chat_id=TELEGRAM_CHAT_ID,
+            chat_id=chat_id,
             text=message
         )
         logging.debug(DEBAG_MESSAGE.format(message=message))
@@ -94,27 +115,55 @@ def send_message(bot, message):
 
 def get_api_answer(timestamp):
     """Получение данных с API YP."""
+    return request_api_answer(timestamp, HEADERS)
+
+
+def request_api_answer(timestamp, headers, http_get=None, endpoint=None):
+    """Получение данных с API YP с заданными заголовками и HTTP-клиентом."""
     payload = {'from_date': timestamp}
+    safe_headers = redact_headers(headers)
+    http_get = http_get or requests.get
+    endpoint = endpoint or ENDPOINT
     try:
-        response = requests.get(ENDPOINT, headers=HEADERS, params=payload)
+        response = http_get(endpoint, headers=headers, params=payload,
+                            timeout=REQUEST_TIMEOUT)
     except requests.RequestException as error:
         raise ConnectionError(API_ERROR.format(error=error,
-                                               headers=HEADERS,
+                                               headers=safe_headers,
                                                params=payload,
-                                               endpoint=ENDPOINT))
-    json_answer = response.json()
+                                               endpoint=endpoint))
+    try:
+        json_answer = response.json()
+    except ValueError:
+        if response.status_code == http.HTTPStatus.OK:
+            raise
+        json_answer = {}
     invalid_keys = ['error', 'code']
     for key in invalid_keys:
         if json_answer in invalid_keys:
             raise ValueError(RESPONSE_KEY_ERROR.format(
-                key=key, headers=HEADERS, params=payload,
-                endpoint=ENDPOINT, response=response[key]))
+                key=key, headers=safe_headers, params=payload,
+                endpoint=endpoint, response=response[key]))
     if response.status_code == http.HTTPStatus.OK:
         return json_answer
     raise ResponseError(API_ERROR_MESSAGE.format(response=response.status_code,
-                                                 headers=HEADERS,
+                                                 headers=safe_headers,
                                                  params=payload,
-                                                 endpoint=ENDPOINT))
+                                                 endpoint=endpoint),
+                        status_code=response.status_code)
+
+
+def next_from_date(timestamp, response):
+    """Отметка `from_date` для следующего запроса.
+
+    Берётся `current_date` из ответа, но отметка никогда не сдвигается
+    назад: ответ другого сервера с отстающими часами не должен
+    расширять окно запроса.
+    """
+    current_date = response.get('current_date')
+    if isinstance(current_date, int) and current_date > timestamp:
+        return current_date
+    return timestamp
 
 
 def check_response(response):
@@ -147,32 +196,43 @@ def parse_status(homework):
 
 def main():
     """Основная логика работы бота."""
-    last_error = None
+    alerts = ErrorAggregator()
     check_tokens()
     bot = telegram.Bot(token=TELEGRAM_TOKEN)
     timestamp = 0
+    statuses = {}
     while True:
         try:
             response = get_api_answer(timestamp)
-            print(response)
+            log_payload(response)
             check_response(response)
-            message = parse_status(response['homeworks'][0])
-            if send_message(bot, message):
-                timestamp = response.get('current_date', timestamp)
+            delivered = True
+            for change in detect_changes(response['homeworks'], statuses,
+                                         cold_start=timestamp == 0):
+                if (change.silent
+                        or send_message(bot, parse_status(change.homework))):
+                    statuses[change.key] = change.new_status
+                else:
+                    delivered = False
+            if delivered:
+                timestamp = next_from_date(timestamp, response)
         except Exception as error:
-            debug_message = logging.debug(MESSAGE_ERROR.format(
-                error=error,
-                timestamp=timestamp))
-            if debug_message != last_error:
-                if not send_message(bot, debug_message):
-                    last_error = debug_message
+            error_message = MESSAGE_ERROR.format(error=error,
+                                                 timestamp=timestamp)
+            logging.error(error_message)
+            alert = alerts.record(error, error_message)
+            if alert:
+                send_message(bot, alert)
+        for alert in alerts.pending():
+            send_message(bot, alert)
         time.sleep(RETRY_PERIOD)
 
 
 if __name__ == '__main__':
-    logging.basicConfig(
-        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-        level=logging.INFO,
-        handlers=[logging.StreamHandler(),
-                  logging.FileHandler(filename=__file__ + '.log',)])
-    main()
+    queue_handler, log_listener = build_log_handlers(__file__ + '.log')
+    logging.basicConfig(level=logging.INFO, handlers=[queue_handler])
+    log_listener.start()
+    try:
+        main()
+    finally:
+        log_listener.stop()
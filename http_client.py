@@ -0,0 +1,204 @@
+"""Пул keep-alive соединений для запросов к API ЯП."""
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from http import HTTPStatus
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util import make_headers
+
+from metrics import Counter
+
+# Без PRACTICUM_POOL_SIZE движок открывает по соединению на сопрограмму
+# опроса (POLL_CONCURRENCY).
+POOL_SIZE = int(os.getenv('PRACTICUM_POOL_SIZE', 0))
+DEFAULT_POOL_SIZE = 32
+POOL_HOSTS = int(os.getenv('PRACTICUM_POOL_HOSTS', 4))
+CONNECT_TIMEOUT = float(os.getenv('PRACTICUM_CONNECT_TIMEOUT', 3.05))
+READ_TIMEOUT = float(os.getenv('PRACTICUM_READ_TIMEOUT', 10))
+POLL_DEADLINE = float(os.getenv('PRACTICUM_POLL_DEADLINE', 30))
+VALIDATORS_MAX_BYTES = int(os.getenv('PRACTICUM_VALIDATORS_MAX_BYTES',
+                                     4 * 2 ** 20))
+CHUNK_SIZE = 64 * 1024
+# gzip и deflate, а при установленном пакете brotli ещё и br.
+ACCEPT_ENCODING = make_headers(accept_encoding=True)['accept-encoding']
+
+DEADLINE_ERROR = 'Запрос к {url} не уложился в {deadline} с'
+
+RESPONSES = Counter('bot_practicum_responses_total',
+                    'Ответы API ЯП: новые, 304 и с прежним телом')
+RECEIVED_BYTES = Counter('bot_practicum_received_bytes_total',
+                         'Байты ответов API ЯП до распаковки')
+
+
+class FetchedResponse:
+    """Полностью прочитанный ответ: код, заголовки и тело."""
+
+    def __init__(self, status_code, headers, content):
+        self.status_code = status_code
+        self.headers = headers
+        self.content = content
+        self.decoded = None
+
+    def json(self):
+        """Разбор тела ответа как JSON; результат запоминается."""
+        if self.decoded is None:
+            self.decoded = json.loads(self.content)
+        return self.decoded
+
+
+class Validators:
+    """Последний ответ на запрос и данные для его повторной проверки."""
+
+    __slots__ = ('params', 'etag', 'last_modified', 'digest', 'response')
+
+    def __init__(self, params, etag, last_modified, digest, response):
+        self.params = params
+        self.etag = etag
+        self.last_modified = last_modified
+        self.digest = digest
+        self.response = response
+
+    def conditions(self):
+        """Заголовки условного запроса."""
+        headers = {}
+        if self.etag:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified:
+            headers['If-Modified-Since'] = self.last_modified
+        return headers
+
+
+class PracticumClient:
+    """HTTP-клиент с общим пулом соединений, таймаутами и дедлайном.
+
+    Метод `get` принимает те же аргументы, что и `requests.get`,
+    и возвращает `FetchedResponse`, поэтому клиент передаётся
+    в `request_api_answer` как `http_get`. Таймауты клиента имеют
+    приоритет над переданными в вызове. `pool_hosts` — число хостов,
+    для которых хранятся пулы, `pool_size` — соединений на хост.
+
+    Клиент запрашивает сжатые ответы и запоминает последний ответ
+    для каждого адреса и токена. Повторный запрос с теми же параметрами
+    передаёт ETag и Last-Modified; на ответ 304 или тело с тем же хешем
+    возвращается прежний ответ, JSON которого уже разобран. Запомненные
+    ответы занимают не больше `validators_max_bytes` байт тел, давно
+    не запрошенные вытесняются.
+
+    `hedging` — необязательная `HedgingPolicy`, которая дублирует
+    медленные запросы.
+    """
+
+    def __init__(self, pool_size=POOL_SIZE or DEFAULT_POOL_SIZE,
+                 connect_timeout=CONNECT_TIMEOUT,
+                 read_timeout=READ_TIMEOUT, deadline=POLL_DEADLINE,
+                 pool_hosts=POOL_HOSTS, hedging=None,
+                 validators_max_bytes=VALIDATORS_MAX_BYTES):
+        self.timeout = (connect_timeout, read_timeout)
+        self.hedging = hedging
+        self.deadline = deadline
+        self.adapter = HTTPAdapter(pool_connections=pool_hosts,
+                                   pool_maxsize=pool_size, pool_block=True)
+        self.session = requests.Session()
+        self.session.headers['Accept-Encoding'] = ACCEPT_ENCODING
+        self.session.mount('https://', self.adapter)
+        self.session.mount('http://', self.adapter)
+        self.requests = 0
+        self.validators = OrderedDict()
+        self.validators_bytes = 0
+        self.validators_max_bytes = validators_max_bytes
+        self.lock = threading.Lock()
+
+    def get(self, url, headers=None, params=None, **kwargs):
+        """GET-запрос с ограничением общего времени на ответ."""
+        kwargs['timeout'] = self.timeout
+        headers = dict(headers or {})
+        key = (url, hashlib.sha256(
+            headers.get('Authorization', '').encode()).digest())
+        with self.lock:
+            known = self.validators.get(key)
+            if known:
+                self.validators.move_to_end(key)
+        if known and known.params == params:
+            headers.update(known.conditions())
+        else:
+            known = None
+        if self.hedging:
+            fetched = self.hedging.call(self.fetch, url, headers=headers,
+                                        params=params, **kwargs)
+        else:
+            fetched = self.fetch(url, headers=headers, params=params,
+                                 **kwargs)
+        if known and fetched.status_code == HTTPStatus.NOT_MODIFIED:
+            RESPONSES.inc(result='not_modified')
+            return known.response
+        if fetched.status_code != HTTPStatus.OK:
+            return fetched
+        digest = hashlib.blake2b(fetched.content, digest_size=16).digest()
+        validators = Validators(params, fetched.headers.get('ETag'),
+                                fetched.headers.get('Last-Modified'), digest,
+                                fetched)
+        if known and known.digest == digest:
+            RESPONSES.inc(result='unchanged')
+            validators.response = known.response
+        else:
+            RESPONSES.inc(result='changed')
+        with self.lock:
+            self.remember(key, validators)
+        return validators.response
+
+    def remember(self, key, validators):
+        """Запоминание ответа с вытеснением давно не запрошенных."""
+        known = self.validators.pop(key, None)
+        if known:
+            self.validators_bytes -= len(known.response.content)
+        size = len(validators.response.content)
+        if size > self.validators_max_bytes:
+            return
+        self.validators[key] = validators
+        self.validators_bytes += size
+        while self.validators_bytes > self.validators_max_bytes:
+            _, evicted = self.validators.popitem(last=False)
+            self.validators_bytes -= len(evicted.response.content)
+
+    def fetch(self, url, **kwargs):
+        """Чтение ответа целиком не дольше `deadline` секунд."""
+        started = time.monotonic()
+        response = self.session.get(url, stream=True, **kwargs)
+        with self.lock:
+            self.requests += 1
+        chunks = []
+        with response:
+            for chunk in response.iter_content(CHUNK_SIZE):
+                chunks.append(chunk)
+                if time.monotonic() - started > self.deadline:
+                    raise requests.Timeout(DEADLINE_ERROR.format(
+                        url=url, deadline=self.deadline))
+            RECEIVED_BYTES.inc(response.raw.tell())
+        return FetchedResponse(response.status_code, response.headers,
+                               b''.join(chunks))
+
+    def stats(self):
+        """Счётчики установленных и переиспользованных соединений."""
+        pools = self.adapter.poolmanager.pools
+        handshakes = 0
+        for key in pools.keys():
+            try:
+                handshakes += pools[key].num_connections
+            except KeyError:
+                continue
+        return {
+            'requests': self.requests,
+            'handshakes': handshakes,
+            'reused': max(self.requests - handshakes, 0),
+        }
+
+    def close(self):
+        """Закрытие всех соединений пула."""
+        if self.hedging:
+            self.hedging.close()
+        self.session.close()
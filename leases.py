@@ -0,0 +1,162 @@
+"""Аренда долей пользователей несколькими узлами.
+
+Пользователи делятся на `LEASE_SHARDS` долей. Узел опрашивает только
+доли, на которые у него есть действующая аренда в общем хранилище.
+Аренда продлевается каждые `LEASE_TTL / 3` секунд; доли остановившегося
+узла освобождаются через `LEASE_TTL` и переходят к остальным.
+"""
+import hashlib
+import math
+import os
+import socket
+import sqlite3
+import threading
+import time
+
+LEASE_DB = os.getenv('LEASE_DB')
+LEASE_SHARDS = int(os.getenv('LEASE_SHARDS', 64))
+LEASE_TTL = float(os.getenv('LEASE_TTL', 30))
+LEASE_LOCK_TIMEOUT = 10
+NODE_ID = os.getenv('NODE_ID') or f'{socket.gethostname()}:{os.getpid()}'
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS leases (
+    shard INTEGER PRIMARY KEY,
+    owner TEXT NOT NULL,
+    expires REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS nodes (
+    owner TEXT PRIMARY KEY,
+    expires REAL NOT NULL
+);
+'''
+
+
+def shard_of(key, shards=LEASE_SHARDS):
+    """Доля, к которой относится пользователь."""
+    digest = hashlib.sha256(key.encode()).digest()
+    return int.from_bytes(digest[:8], 'big') % shards
+
+
+class SQLiteLeaseStore:
+    """Аренда долей в общем файле SQLite.
+
+    Все изменения выполняются в транзакции `BEGIN IMMEDIATE`, поэтому
+    два узла не могут одновременно занять одну долю.
+    """
+
+    def __init__(self, path=LEASE_DB, timeout=LEASE_LOCK_TIMEOUT):
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(path, timeout=timeout,
+                                          isolation_level=None,
+                                          check_same_thread=False)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.executescript(SCHEMA)
+
+    def rebalance(self, owner, shards, ttl, now):
+        """Продление своих долей и захват свободных до равной доли узла.
+
+        Узел отмечается в `nodes`, даже если свободных долей нет, чтобы
+        остальные учли его при расчёте равной доли. Доли сверх равной
+        доли освобождаются, чтобы их могли занять новые узлы.
+        Возвращает занятые доли и срок их аренды.
+        """
+        with self.lock:
+            self.connection.execute('BEGIN IMMEDIATE')
+            try:
+                expires = now + ttl
+                self.connection.execute(
+                    'INSERT INTO nodes (owner, expires) VALUES (?, ?) '
+                    'ON CONFLICT(owner) DO UPDATE SET '
+                    'expires = excluded.expires', (owner, expires))
+                self.connection.execute('DELETE FROM nodes WHERE expires <= ?',
+                                        (now,))
+                nodes = self.connection.execute(
+                    'SELECT COUNT(*) FROM nodes').fetchone()[0]
+                live = dict(self.connection.execute(
+                    'SELECT shard, owner FROM leases WHERE expires > ?',
+                    (now,)))
+                mine = sorted(shard for shard, holder in live.items()
+                              if holder == owner)
+                share = math.ceil(shards / nodes)
+                free = [shard for shard in range(shards) if shard not in live]
+                keep = mine[:share] + free[:max(0, share - len(mine))]
+                self.connection.executemany(
+                    'INSERT INTO leases (shard, owner, expires) '
+                    'VALUES (?, ?, ?) ON CONFLICT(shard) DO UPDATE SET '
+                    'owner = excluded.owner, expires = excluded.expires',
+                    [(shard, owner, expires) for shard in keep]
+                )
+                self.connection.executemany(
+                    'DELETE FROM leases WHERE shard = ? AND owner = ?',
+                    [(shard, owner) for shard in mine[share:]]
+                )
+                self.connection.execute('COMMIT')
+            except BaseException:
+                self.connection.execute('ROLLBACK')
+                raise
+        return set(keep), expires
+
+    def release(self, owner):
+        """Освобождение всех долей узла."""
+        with self.lock:
+            self.connection.execute('DELETE FROM leases WHERE owner = ?',
+                                    (owner,))
+            self.connection.execute('DELETE FROM nodes WHERE owner = ?',
+                                    (owner,))
+
+    def owners(self, now):
+        """Действующие аренды: {shard: owner}."""
+        with self.lock:
+            return dict(self.connection.execute(
+                'SELECT shard, owner FROM leases WHERE expires > ?', (now,)))
+
+    def close(self):
+        """Закрытие соединения."""
+        self.connection.close()
+
+
+class LeaseCoordinator:
+    """Доли пользователей, которые опрашивает этот узел.
+
+    Доля считается своей, пока до конца аренды остаётся больше
+    интервала продления: так узел, не успевший продлить аренду,
+    перестаёт опрашивать раньше, чем долю займёт другой.
+    """
+
+    def __init__(self, store, node_id=NODE_ID, shards=LEASE_SHARDS,
+                 ttl=LEASE_TTL, clock=time.time):
+        self.store = store
+        self.node_id = node_id
+        self.shards = shards
+        self.ttl = ttl
+        self.clock = clock
+        self.owned = set()
+        self.expires = 0.0
+
+    @property
+    def renew_interval(self):
+        """Период продления аренды."""
+        return self.ttl / 3
+
+    def shard_of(self, key):
+        """Доля пользователя."""
+        return shard_of(key, self.shards)
+
+    def owns(self, key):
+        """Пользователь относится к действующей доле этого узла."""
+        return (self.shard_of(key) in self.owned
+                and self.clock() < self.expires - self.renew_interval)
+
+    def balance(self):
+        """Продление аренды; возвращает полученные и потерянные доли."""
+        owned, self.expires = self.store.rebalance(
+            self.node_id, self.shards, self.ttl, self.clock())
+        gained, lost = owned - self.owned, self.owned - owned
+        self.owned = owned
+        return gained, lost
+
+    def release(self):
+        """Освобождение всех долей при остановке узла."""
+        self.store.release(self.node_id)
+        self.owned = set()
@@ -0,0 +1,141 @@
+"""Неблокирующее JSON-логирование с ротацией файла и выборкой."""
+import copy
+import gzip
+import json
+import logging
+import os
+import queue
+import shutil
+import sys
+import threading
+import time
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+from alerts import redact
+
+LOG_MAX_BYTES = int(os.getenv('LOG_MAX_BYTES', 10 * 1024 * 1024))
+LOG_BACKUP_COUNT = int(os.getenv('LOG_BACKUP_COUNT', 5))
+LOG_QUEUE_SIZE = int(os.getenv('LOG_QUEUE_SIZE', 10000))
+PAYLOAD_SAMPLES = int(os.getenv('LOG_PAYLOAD_SAMPLES', 10))
+PAYLOAD_INTERVAL = float(os.getenv('LOG_PAYLOAD_INTERVAL', 60))
+
+PAYLOAD_MESSAGE = 'Ответ API: {payload}'
+EXC_FORMATTER = logging.Formatter()
+
+
+class JsonFormatter(logging.Formatter):
+    """Запись лога одной строкой JSON без токенов в тексте."""
+
+    def format(self, record):
+        """Сериализация записи."""
+        data = {
+            'time': self.formatTime(record),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': redact(record.getMessage()),
+        }
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            data['exc'] = redact(record.exc_text)
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+class DroppingQueueHandler(QueueHandler):
+    """Обработчик, который не ждёт при переполнении очереди.
+
+    Лишние записи отбрасываются и учитываются в `dropped`.
+    """
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def enqueue(self, record):
+        """Постановка записи в очередь без ожидания."""
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def prepare(self, record):
+        """Копия записи для очереди: текст сообщения и исключения.
+
+        Стандартный `prepare` форматирует запись форматтером этого
+        обработчика (`basicConfig` ставит ему `BASIC_FORMAT`) и вклеивает
+        traceback в сообщение. Здесь сообщение остаётся как есть,
+        а исключение уходит в `exc_text` для поля `exc` в JSON.
+        """
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = record.exc_text or EXC_FORMATTER.formatException(
+                record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def gzip_rotator(source, dest):
+    """Сжатие файла лога при ротации."""
+    with open(source, 'rb') as log_file, gzip.open(dest, 'wb') as archive:
+        shutil.copyfileobj(log_file, archive)
+    os.remove(source)
+
+
+def build_log_handlers(filename, max_bytes=LOG_MAX_BYTES,
+                       backup_count=LOG_BACKUP_COUNT,
+                       queue_size=LOG_QUEUE_SIZE):
+    """Обработчик очереди для корневого логгера и поток записи в файл.
+
+    Возвращает пару (handler, listener): listener нужно запустить
+    после настройки логирования и остановить при выходе.
+    """
+    formatter = JsonFormatter()
+    file_handler = RotatingFileHandler(filename, maxBytes=max_bytes,
+                                       backupCount=backup_count,
+                                       encoding='utf-8')
+    file_handler.rotator = gzip_rotator
+    file_handler.namer = lambda name: name + '.gz'
+    stream_handler = logging.StreamHandler(sys.stdout)
+    for handler in (file_handler, stream_handler):
+        handler.setFormatter(formatter)
+    log_queue = queue.Queue(queue_size)
+    listener = QueueListener(log_queue, stream_handler, file_handler,
+                             respect_handler_level=True)
+    return DroppingQueueHandler(log_queue), listener
+
+
+class RateSampler:
+    """Не больше `limit` срабатываний за `interval` секунд."""
+
+    def __init__(self, limit=PAYLOAD_SAMPLES, interval=PAYLOAD_INTERVAL,
+                 clock=time.monotonic):
+        self.limit = limit
+        self.interval = interval
+        self.clock = clock
+        self.lock = threading.Lock()
+        self.started = clock()
+        self.count = 0
+
+    def allow(self):
+        """Можно ли записать ещё одно событие."""
+        with self.lock:
+            now = self.clock()
+            if now - self.started >= self.interval:
+                self.started = now
+                self.count = 0
+            if self.count >= self.limit:
+                return False
+            self.count += 1
+            return True
+
+
+payload_sampler = RateSampler()
+
+
+def log_payload(payload):
+    """Выборочная запись ответа API на уровне DEBUG."""
+    if (logging.getLogger().isEnabledFor(logging.DEBUG)
+            and payload_sampler.allow()):
+        logging.debug(PAYLOAD_MESSAGE.format(payload=payload))
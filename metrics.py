@@ -0,0 +1,208 @@
+"""Метрики в текстовом формате Prometheus и HTTP-сервер для их отдачи."""
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+METRICS_PORT = os.getenv('METRICS_PORT')
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10,
+                   30)
+CPU_BUCKETS = (0.00001, 0.00005, 0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05)
+
+METRICS_SERVER_MESSAGE = 'Метрики доступны на порту {port}'
+
+
+def format_labels(key, extra=()):
+    """Метки в формате `{name="value"}`."""
+    items = list(key) + list(extra)
+    if not items:
+        return ''
+    return '{' + ','.join(
+        '{}="{}"'.format(name, str(value).replace('"', '\\"'))
+        for name, value in items
+    ) + '}'
+
+
+class Registry:
+    """Набор метрик процесса."""
+
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric):
+        """Добавление метрики."""
+        self.metrics.append(metric)
+        return metric
+
+    def render(self):
+        """Все метрики в текстовом формате Prometheus."""
+        lines = []
+        for metric in self.metrics:
+            lines.append(f'# HELP {metric.name} {metric.documentation}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            lines.extend(metric.samples())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+
+class Metric:
+    """Общая часть метрик: имя, описание и значения по набору меток."""
+
+    kind = None
+
+    def __init__(self, name, documentation, registry=REGISTRY):
+        self.name = name
+        self.documentation = documentation
+        self.lock = threading.Lock()
+        self.values = {}
+        registry.register(self)
+
+    def samples(self):
+        """Строки со значениями метрики."""
+        with self.lock:
+            values = sorted(self.values.items())
+        return [f'{self.name}{format_labels(key)} {value}'
+                for key, value in values]
+
+
+class Counter(Metric):
+    """Монотонно растущий счётчик."""
+
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        """Увеличение счётчика."""
+        key = tuple(sorted(labels.items()))
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def value(self, **labels):
+        """Текущее значение."""
+        return self.values.get(tuple(sorted(labels.items())), 0)
+
+
+class Gauge(Metric):
+    """Мгновенное значение, заданное явно или функцией."""
+
+    kind = 'gauge'
+
+    def __init__(self, name, documentation, registry=REGISTRY):
+        super().__init__(name, documentation, registry)
+        self.functions = {}
+
+    def set(self, value, **labels):
+        """Установка значения."""
+        with self.lock:
+            self.values[tuple(sorted(labels.items()))] = value
+
+    def set_function(self, function, **labels):
+        """Значение вычисляется при каждом чтении метрик."""
+        with self.lock:
+            self.functions[tuple(sorted(labels.items()))] = function
+
+    def samples(self):
+        """Строки со значениями метрики."""
+        with self.lock:
+            functions = list(self.functions.items())
+        for key, function in functions:
+            self.set(function(), **dict(key))
+        return super().samples()
+
+
+class Histogram(Metric):
+    """Распределение значений по корзинам."""
+
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, buckets=LATENCY_BUCKETS,
+                 registry=REGISTRY):
+        super().__init__(name, documentation, registry)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        """Учёт одного значения."""
+        key = tuple(sorted(labels.items()))
+        with self.lock:
+            counts, total = self.values.get(
+                key, ([0] * (len(self.buckets) + 1), 0.0))
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[index] += 1
+                    break
+            else:
+                counts[-1] += 1
+            self.values[key] = (counts, total + value)
+
+    @contextmanager
+    def time(self, **labels):
+        """Замер длительности блока кода."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def count(self, **labels):
+        """Число учтённых значений."""
+        counts, _ = self.values.get(tuple(sorted(labels.items())), ([], 0))
+        return sum(counts)
+
+    def samples(self):
+        """Корзины нарастающим итогом, сумма и количество."""
+        with self.lock:
+            values = sorted(
+                (key, (list(counts), total))
+                for key, (counts, total) in self.values.items()
+            )
+        lines = []
+        for key, (counts, total) in values:
+            cumulative = 0
+            bounds = [str(bound) for bound in self.buckets] + ['+Inf']
+            for bound, count in zip(bounds, counts):
+                cumulative += count
+                lines.append(f'{self.name}_bucket'
+                             f'{format_labels(key, [("le", bound)])} '
+                             f'{cumulative}')
+            lines.append(f'{self.name}_sum{format_labels(key)} {total}')
+            lines.append(f'{self.name}_count{format_labels(key)} '
+                         f'{cumulative}')
+        return lines
+
+
+def make_handler(registry, health):
+    """Обработчик HTTP-запросов к `/metrics` и `/health`."""
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path == '/metrics':
+                body = registry.render().encode()
+                content_type = 'text/plain; version=0.0.4'
+            elif self.path == '/health' and health:
+                body = json.dumps(health(), default=str).encode()
+                content_type = 'application/json'
+            else:
+                self.send_error(404)
+                return
+            self.send_response(200)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    return MetricsHandler
+
+
+def start_metrics_server(port, registry=REGISTRY, health=None,
+                         host='0.0.0.0'):
+    """Запуск HTTP-сервера метрик в фоновом потоке."""
+    server = ThreadingHTTPServer((host, int(port)),
+                                 make_handler(registry, health))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
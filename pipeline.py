@@ -0,0 +1,135 @@
+"""Конвейер из стадий, связанных ограниченными очередями."""
+import asyncio
+import os
+
+from metrics import CPU_BUCKETS, LATENCY_BUCKETS, Counter, Gauge, Histogram
+
+PIPELINE_QUEUE_SIZE = int(os.getenv('PIPELINE_QUEUE_SIZE', 64))
+PIPELINE_BUCKETS = tuple(sorted(set(CPU_BUCKETS + LATENCY_BUCKETS)))
+
+PIPELINE_SECONDS = Histogram('bot_pipeline_stage_seconds',
+                             'Время обработки элемента стадией конвейера',
+                             buckets=PIPELINE_BUCKETS)
+PIPELINE_ITEMS = Counter('bot_pipeline_items_total',
+                         'Элементы, обработанные стадиями конвейера')
+PIPELINE_DEPTH = Gauge('bot_pipeline_queue_depth',
+                       'Элементы в очереди перед стадией')
+PIPELINE_BUSY = Gauge('bot_pipeline_busy_workers',
+                      'Занятые обработчики стадии')
+
+
+class Stage:
+    """Стадия конвейера.
+
+    `handler` получает элемент и возвращает элемент для следующей
+    стадии; `None` означает, что элемент дальше не идёт. Блокирующие
+    обработчики (`blocking=True`) выполняются в пуле потоков.
+    """
+
+    def __init__(self, name, handler, concurrency=1,
+                 maxsize=PIPELINE_QUEUE_SIZE, blocking=False):
+        self.name = name
+        self.handler = handler
+        self.concurrency = concurrency
+        self.maxsize = maxsize
+        self.blocking = blocking
+        self.queue = None
+        self.busy = 0
+        PIPELINE_DEPTH.set_function(self.depth, stage=name)
+        PIPELINE_BUSY.set_function(lambda: self.busy, stage=name)
+
+    def depth(self):
+        """Число элементов в очереди перед стадией."""
+        return self.queue.qsize() if self.queue else 0
+
+
+class Pipeline:
+    """Стадии, соединённые ограниченными очередями.
+
+    Используется как асинхронный контекстный менеджер. Заполненная
+    очередь приостанавливает предыдущую стадию, а `put` — источник
+    элементов. Результат последней стадии передаётся в `on_done`,
+    исключение любой стадии — в `on_error(item, error)`.
+    """
+
+    def __init__(self, stages, on_done=None, on_error=None, executor=None):
+        self.stages = list(stages)
+        self.on_done = on_done
+        self.on_error = on_error
+        self.executor = executor
+        self.tasks = []
+
+    async def __aenter__(self):
+        """Создание очередей и запуск обработчиков стадий."""
+        for stage in self.stages:
+            stage.queue = asyncio.Queue(maxsize=stage.maxsize)
+        self.tasks = [
+            asyncio.create_task(self.worker(index))
+            for index, stage in enumerate(self.stages)
+            for _ in range(stage.concurrency)
+        ]
+        return self
+
+    async def __aexit__(self, exc_type, *exc_info):
+        """Ожидание обработки элементов и остановка обработчиков.
+
+        При выходе по исключению, в том числе при отмене, элементы
+        в очередях не дожидаются обработки.
+        """
+        if exc_type is None:
+            await self.join()
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        self.tasks = []
+
+    async def put(self, item):
+        """Передача элемента первой стадии с ожиданием места в очереди."""
+        await self.stages[0].queue.put(item)
+
+    async def join(self):
+        """Ожидание обработки всех элементов всеми стадиями."""
+        for stage in self.stages:
+            await stage.queue.join()
+
+    def snapshot(self):
+        """Очередь и занятые обработчики каждой стадии."""
+        return {
+            stage.name: {'depth': stage.depth(), 'busy': stage.busy,
+                         'concurrency': stage.concurrency}
+            for stage in self.stages
+        }
+
+    async def call(self, stage, item):
+        """Вызов обработчика стадии."""
+        if stage.blocking:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.executor, stage.handler,
+                                              item)
+        return stage.handler(item)
+
+    async def worker(self, index):
+        """Обработчик стадии."""
+        stage = self.stages[index]
+        following = self.stages[index + 1:index + 2]
+        while True:
+            item = await stage.queue.get()
+            stage.busy += 1
+            try:
+                with PIPELINE_SECONDS.time(stage=stage.name):
+                    result = await self.call(stage, item)
+            except Exception as error:
+                PIPELINE_ITEMS.inc(stage=stage.name, result='error')
+                if self.on_error:
+                    self.on_error(item, error)
+            else:
+                PIPELINE_ITEMS.inc(stage=stage.name, result='ok')
+                if result is None:
+                    pass
+                elif following:
+                    await following[0].queue.put(result)
+                elif self.on_done:
+                    self.on_done(result)
+            finally:
+                stage.busy -= 1
+                stage.queue.task_done()
@@ -0,0 +1,204 @@
+"""Компактный реестр пользователей движка.
+
+Состояние десятков тысяч пользователей в отдельных словарях занимает
+большую часть памяти процесса. Реестр хранит числовые поля
+в колонках `array` (по строке на пользователя), а статусы работ —
+как малые целые коды, общие для всех пользователей.
+"""
+import math
+import sys
+from array import array
+from collections.abc import MutableMapping
+
+from homework import HOMEWORK_VERDICTS
+
+# Коды хранятся в `bytes`, поэтому статусов не больше 256; неизвестные
+# статусы сюда не попадают, их отсеивает `validate_homeworks`.
+STATUS_NAMES = list(HOMEWORK_VERDICTS)
+STATUS_CODES = {name: code for code, name in enumerate(STATUS_NAMES)}
+
+
+def status_code(status):
+    """Код статуса; неизвестный статус получает новый код."""
+    code = STATUS_CODES.get(status)
+    if code is None:
+        code = STATUS_CODES.setdefault(status, len(STATUS_NAMES))
+        if code == len(STATUS_NAMES):
+            STATUS_NAMES.append(status)
+    return code
+
+
+class StatusMap(MutableMapping):
+    """Статусы работ пользователя: ключ работы -> статус.
+
+    У пользователя обычно не больше нескольких десятков работ, поэтому
+    вместо словаря хранится кортеж интернированных ключей и `bytes`
+    с кодами статусов; поиск идёт перебором.
+    """
+
+    __slots__ = ('homeworks', 'codes')
+
+    def __init__(self, statuses=None):
+        self.homeworks = ()
+        self.codes = b''
+        if statuses:
+            self.update(statuses)
+
+    def __getitem__(self, key):
+        try:
+            return STATUS_NAMES[self.codes[self.homeworks.index(key)]]
+        except ValueError:
+            raise KeyError(key) from None
+
+    def get(self, key, default=None):
+        """Статус работы или `default`."""
+        try:
+            return STATUS_NAMES[self.codes[self.homeworks.index(key)]]
+        except ValueError:
+            return default
+
+    def __setitem__(self, key, status):
+        self.update({key: status})
+
+    def __delitem__(self, key):
+        merged = dict(zip(self.homeworks, self.codes))
+        del merged[key]
+        self.homeworks, self.codes = tuple(merged), bytes(merged.values())
+
+    def update(self, statuses=(), **kwargs):
+        """Запись нескольких статусов с одной перестройкой хранилища."""
+        merged = dict(zip(self.homeworks, self.codes))
+        for key, status in dict(statuses, **kwargs).items():
+            merged[sys.intern(str(key))] = status_code(status)
+        self.homeworks, self.codes = tuple(merged), bytes(merged.values())
+
+    def __iter__(self):
+        return iter(self.homeworks)
+
+    def __len__(self):
+        return len(self.homeworks)
+
+    def __repr__(self):
+        return f'StatusMap({dict(self)!r})'
+
+
+class TenantRecord:
+    """Пользователь и номер его строки в колонках реестра."""
+
+    __slots__ = ('tenant', 'key', 'row', 'statuses')
+
+    def __init__(self, tenant, key, row, statuses):
+        self.tenant = tenant
+        self.key = key
+        self.row = row
+        self.statuses = statuses
+
+
+class Column:
+    """Числовая колонка реестра с доступом по ключу пользователя.
+
+    Значение `missing` означает, что поле не задано: для него
+    `get` возвращает значение по умолчанию, а `[]` — KeyError.
+    """
+
+    def __init__(self, registry, typecode, missing):
+        self.registry = registry
+        self.values = array(typecode)
+        self.missing = missing
+
+    def append(self):
+        """Строка для нового пользователя."""
+        self.values.append(self.missing)
+
+    def is_missing(self, value):
+        """Поле не задано."""
+        if isinstance(self.missing, float) and math.isnan(self.missing):
+            return math.isnan(value)
+        return value == self.missing
+
+    def __getitem__(self, key):
+        value = self.values[self.registry.records[key].row]
+        if self.is_missing(value):
+            raise KeyError(key)
+        return value
+
+    def get(self, key, default=None):
+        """Значение поля или `default`."""
+        record = self.registry.records.get(key)
+        if record is None:
+            return default
+        value = self.values[record.row]
+        return default if self.is_missing(value) else value
+
+    def __setitem__(self, key, value):
+        self.values[self.registry.records[key].row] = value
+
+    def __delitem__(self, key):
+        self.values[self.registry.records[key].row] = self.missing
+
+    def pop(self, key, default=None):
+        """Значение поля со сбросом его в `missing`."""
+        value = self.get(key, default)
+        if key in self.registry.records:
+            del self[key]
+        return value
+
+    def __contains__(self, key):
+        return self.get(key) is not None
+
+
+class Statuses:
+    """Статусы работ пользователей по ключу пользователя."""
+
+    def __init__(self, registry):
+        self.registry = registry
+
+    def __getitem__(self, key):
+        return self.registry.records[key].statuses
+
+    def __setitem__(self, key, statuses):
+        self.registry.records[key].statuses = StatusMap(statuses)
+
+
+class TenantRegistry:
+    """Пользователи движка с их отметками времени, статусами и ошибками.
+
+    Колонки `timestamps`, `failures` и `due_at` поддерживают доступ
+    по ключу пользователя, как словари, поэтому их можно передавать
+    туда, где раньше были `dict`.
+    """
+
+    def __init__(self):
+        self.records = {}
+        self.tenants = []
+        self.timestamps = Column(self, 'q', -1)
+        self.failures = Column(self, 'l', -1)
+        self.due_at = Column(self, 'd', math.nan)
+        self.columns = (self.timestamps, self.failures, self.due_at)
+        self.statuses = Statuses(self)
+
+    def __contains__(self, key):
+        return key in self.records
+
+    def __len__(self):
+        return len(self.tenants)
+
+    def add(self, tenant, timestamp=0, statuses=None):
+        """Добавление пользователя; возвращает его запись."""
+        key = sys.intern(tenant.key)
+        record = self.records.get(key)
+        if record is not None:
+            return record
+        record = TenantRecord(tenant, key, len(self.tenants),
+                              StatusMap(statuses))
+        self.records[key] = record
+        self.tenants.append(tenant)
+        for column in self.columns:
+            column.append()
+        self.timestamps[key] = timestamp
+        self.failures[key] = 0
+        return record
+
+    def tenant(self, key):
+        """Пользователь по ключу."""
+        return self.records[key].tenant
@@ -0,0 +1,106 @@
+"""Планировщик опроса пользователей с индивидуальными интервалами."""
+import heapq
+import os
+import random
+import time
+
+from homework import RETRY_PERIOD
+
+REVIEWING_INTERVAL = int(os.getenv('REVIEWING_INTERVAL', 300))
+IDLE_INTERVAL = int(os.getenv('IDLE_INTERVAL', 1800))
+MAX_BACKOFF = int(os.getenv('MAX_BACKOFF', 3600))
+JITTER = float(os.getenv('POLL_JITTER', 0.1))
+
+
+class PollScheduler:
+    """Очередь с приоритетом по времени следующего опроса.
+
+    Актуальное время опроса хранится в `due_at`: при переносе старая
+    запись остаётся в куче и пропускается при извлечении. Вместо
+    словаря `due_at` можно передать колонку `TenantRegistry`.
+    """
+
+    def __init__(self, base_interval=RETRY_PERIOD,
+                 reviewing_interval=REVIEWING_INTERVAL,
+                 idle_interval=IDLE_INTERVAL, max_backoff=MAX_BACKOFF,
+                 jitter=JITTER, clock=time.monotonic, rng=None, due_at=None):
+        self.base_interval = base_interval
+        self.reviewing_interval = reviewing_interval
+        self.idle_interval = idle_interval
+        self.max_backoff = max_backoff
+        self.jitter = jitter
+        self.clock = clock
+        self.rng = rng or random.Random()
+        self.heap = []
+        self.due_at = {} if due_at is None else due_at
+        self.next_due = None
+
+    def add(self, key):
+        """Первый опрос в случайный момент базового интервала."""
+        self.schedule(key, self.rng.uniform(0, self.base_interval))
+
+    def schedule(self, key, delay):
+        """Опрос пользователя через `delay` секунд."""
+        due = self.clock() + delay
+        self.due_at[key] = due
+        heapq.heappush(self.heap, (due, key))
+
+    def remove(self, key):
+        """Исключение пользователя из опроса."""
+        self.due_at.pop(key, None)
+
+    def interval(self, statuses, failures=0):
+        """Интервал до следующего опроса без случайного сдвига.
+
+        Пока работа на ревью, опрашиваем чаще; если проверять нечего
+        или всё принято — реже; после ошибок интервал растёт
+        экспоненциально.
+        """
+        if failures:
+            return min(self.base_interval * 2 ** failures, self.max_backoff)
+        values = set(statuses.values())
+        if 'reviewing' in values:
+            return self.reviewing_interval
+        if not values or values == {'approved'}:
+            return self.idle_interval
+        return self.base_interval
+
+    def reschedule(self, key, statuses, failures=0):
+        """Планирование следующего опроса по состоянию пользователя."""
+        interval = self.interval(statuses, failures)
+        spread = interval * self.jitter
+        self.schedule(key, interval + self.rng.uniform(-spread, spread))
+
+    def pop_due(self):
+        """Извлечение всех пользователей, которых пора опросить."""
+        now = self.clock()
+        due = []
+        while self.heap and self.heap[0][0] <= now:
+            when, key = heapq.heappop(self.heap)
+            if self.due_at.get(key) == when:
+                del self.due_at[key]
+                due.append(key)
+        return due
+
+    def wait_time(self):
+        """Секунды до ближайшего опроса."""
+        while self.heap:
+            when, key = self.heap[0]
+            if self.due_at.get(key) == when:
+                break
+            heapq.heappop(self.heap)
+        self.next_due = self.heap[0][0] if self.heap else None
+        if self.next_due is None:
+            return None
+        return max(0.0, self.next_due - self.clock())
+
+    def lag(self):
+        """Насколько самый просроченный опрос отстаёт от расписания.
+
+        Читает только снимок `next_due`, который обновляет `wait_time`
+        в цикле опроса, поэтому безопасен для вызова из других потоков.
+        """
+        next_due = self.next_due
+        if next_due is None:
+            return 0.0
+        return max(0.0, self.clock() - next_due)
@@ -0,0 +1,266 @@
+"""Хранилища состояния опроса: отметка времени, статусы работ и outbox."""
+import logging
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import namedtuple
+
+STATE_DB = os.getenv('STATE_DB', 'state.sqlite3')
+FLUSH_BATCH = int(os.getenv('STATE_FLUSH_BATCH', 500))
+FLUSH_INTERVAL = float(os.getenv('STATE_FLUSH_INTERVAL', 5))
+OUTBOX_RETRY = float(os.getenv('OUTBOX_RETRY', 30))
+OUTBOX_MAX_RETRY = float(os.getenv('OUTBOX_MAX_RETRY', 3600))
+OUTBOX_MAX_ATTEMPTS = int(os.getenv('OUTBOX_MAX_ATTEMPTS', 10))
+OUTBOX_CLAIM = 60
+OUTBOX_RETENTION = 24 * 3600
+
+PENDING, SENT, FAILED = 'pending', 'sent', 'failed'
+
+OUTBOX_FAILED_MESSAGE = ('Сообщение {key} в чат {chat_id} не доставлено '
+                         'за {attempts} попыток')
+
+OutboxMessage = namedtuple('OutboxMessage',
+                           ('key', 'chat_id', 'text', 'attempts'),
+                           defaults=(0,))
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS checkpoints (
+    tenant TEXT PRIMARY KEY,
+    timestamp INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS statuses (
+    tenant TEXT NOT NULL,
+    homework TEXT NOT NULL,
+    status TEXT NOT NULL,
+    PRIMARY KEY (tenant, homework)
+);
+CREATE TABLE IF NOT EXISTS outbox (
+    key TEXT PRIMARY KEY,
+    chat_id TEXT NOT NULL,
+    message TEXT NOT NULL,
+    state TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS outbox_due ON outbox (state, next_attempt);
+'''
+
+
+def retry_delay(attempts):
+    """Пауза перед следующей попыткой отправки."""
+    return min(OUTBOX_RETRY * 2 ** (attempts - 1), OUTBOX_MAX_RETRY)
+
+
+def settle_message(message, sent, now):
+    """Состояние сообщения и время следующей попытки после отправки."""
+    attempts = message.attempts + 1
+    if sent:
+        return SENT, attempts, now
+    if attempts >= OUTBOX_MAX_ATTEMPTS:
+        logging.error(OUTBOX_FAILED_MESSAGE.format(
+            key=message.key, chat_id=message.chat_id, attempts=attempts))
+        return FAILED, attempts, now
+    return PENDING, attempts, now + retry_delay(attempts)
+
+
+class StateStore(ABC):
+    """Интерфейс хранилища состояния пользователей.
+
+    Записи накапливаются в памяти и сохраняются пачкой в `flush`.
+    Сообщения о новых статусах (`OutboxMessage`) сохраняются в outbox
+    той же транзакцией, что и отметка времени, и отправляются отдельно:
+    `claim_messages` выдаёт пачку на отправку, `settle` фиксирует итог.
+    Ключ сообщения уникален, повторная запись с тем же ключом
+    игнорируется. `not_before` откладывает первую отправку сообщений,
+    например до конца окна сводки.
+    """
+
+    @abstractmethod
+    def load_all(self):
+        """Состояние всех пользователей: {tenant: (timestamp, statuses)}."""
+
+    @abstractmethod
+    def checkpoint(self, tenant, timestamp, statuses=None, messages=(),
+                   not_before=0.0):
+        """Запоминание отметки времени, статусов работ и сообщений."""
+
+    @abstractmethod
+    def claim_messages(self, limit, now=None):
+        """Сообщения, которые пора отправить.
+
+        Выданные сообщения не выдаются повторно `OUTBOX_CLAIM` секунд.
+        """
+
+    @abstractmethod
+    def settle(self, results, now=None):
+        """Итог отправки: список пар (сообщение, доставлено)."""
+
+    def flush(self):
+        """Сохранение накопленных записей."""
+
+    def close(self):
+        """Сохранение записей и освобождение ресурсов."""
+        self.flush()
+
+
+class MemoryStateStore(StateStore):
+    """Хранилище в памяти процесса, для тестов."""
+
+    def __init__(self):
+        self.timestamps = {}
+        self.statuses = {}
+        self.outbox = {}
+
+    def load_all(self):
+        """Состояние всех пользователей: {tenant: (timestamp, statuses)}."""
+        return {
+            tenant: (timestamp, dict(self.statuses.get(tenant, {})))
+            for tenant, timestamp in self.timestamps.items()
+        }
+
+    def checkpoint(self, tenant, timestamp, statuses=None, messages=(),
+                   not_before=0.0):
+        """Запоминание отметки времени, статусов работ и сообщений."""
+        self.timestamps[tenant] = timestamp
+        if statuses:
+            self.statuses.setdefault(tenant, {}).update(statuses)
+        for message in messages:
+            self.outbox.setdefault(message.key,
+                                   [message, PENDING, not_before])
+
+    def claim_messages(self, limit, now=None):
+        """Сообщения, которые пора отправить."""
+        now = time.time() if now is None else now
+        due = [entry for entry in self.outbox.values()
+               if entry[1] == PENDING and entry[2] <= now][:limit]
+        for entry in due:
+            entry[2] = now + OUTBOX_CLAIM
+        return [message for message, _, _ in due]
+
+    def settle(self, results, now=None):
+        """Итог отправки: список пар (сообщение, доставлено)."""
+        now = time.time() if now is None else now
+        for message, sent in results:
+            state, attempts, next_attempt = settle_message(message, sent, now)
+            self.outbox[message.key] = [message._replace(attempts=attempts),
+                                        state, next_attempt]
+
+
+class SQLiteStateStore(StateStore):
+    """Хранилище в SQLite в режиме WAL с пакетной записью."""
+
+    def __init__(self, path=STATE_DB, batch_size=FLUSH_BATCH,
+                 flush_interval=FLUSH_INTERVAL):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('PRAGMA synchronous=NORMAL')
+        self.connection.executescript(SCHEMA)
+        self.pending_timestamps = {}
+        self.pending_statuses = {}
+        self.pending_messages = []
+        self.flushed_at = time.monotonic()
+
+    def load_all(self):
+        """Состояние всех пользователей: {tenant: (timestamp, statuses)}."""
+        self.flush()
+        with self.lock:
+            state = {
+                tenant: (timestamp, {})
+                for tenant, timestamp in self.connection.execute(
+                    'SELECT tenant, timestamp FROM checkpoints'
+                )
+            }
+            for tenant, homework, status in self.connection.execute(
+                'SELECT tenant, homework, status FROM statuses'
+            ):
+                state.setdefault(tenant, (0, {}))[1][homework] = status
+        return state
+
+    def checkpoint(self, tenant, timestamp, statuses=None, messages=(),
+                   not_before=0.0):
+        """Запоминание отметки времени, статусов работ и сообщений."""
+        with self.lock:
+            self.pending_timestamps[tenant] = timestamp
+            for homework, status in (statuses or {}).items():
+                self.pending_statuses[tenant, homework] = status
+            self.pending_messages.extend(
+                (message, not_before) for message in messages)
+            pending = len(self.pending_timestamps) + len(self.pending_statuses)
+        if (pending >= self.batch_size
+                or time.monotonic() - self.flushed_at >= self.flush_interval):
+            self.flush()
+
+    def flush(self):
+        """Сохранение накопленных записей одной транзакцией."""
+        with self.lock:
+            timestamps, self.pending_timestamps = self.pending_timestamps, {}
+            statuses, self.pending_statuses = self.pending_statuses, {}
+            messages, self.pending_messages = self.pending_messages, []
+            self.flushed_at = time.monotonic()
+            if not timestamps and not statuses and not messages:
+                return
+            with self.connection:
+                self.connection.executemany(
+                    'INSERT OR IGNORE INTO outbox'
+                    ' (key, chat_id, message, next_attempt)'
+                    ' VALUES (?, ?, ?, ?)',
+                    ((message.key, message.chat_id, message.text, not_before)
+                     for message, not_before in messages)
+                )
+                self.connection.executemany(
+                    'INSERT INTO checkpoints (tenant, timestamp) VALUES (?, ?)'
+                    ' ON CONFLICT(tenant) DO UPDATE'
+                    ' SET timestamp = excluded.timestamp',
+                    timestamps.items()
+                )
+                self.connection.executemany(
+                    'INSERT INTO statuses (tenant, homework, status)'
+                    ' VALUES (?, ?, ?) ON CONFLICT(tenant, homework)'
+                    ' DO UPDATE SET status = excluded.status',
+                    ((tenant, homework, status)
+                     for (tenant, homework), status in statuses.items())
+                )
+
+    def claim_messages(self, limit, now=None):
+        """Сообщения, которые пора отправить.
+
+        Несохранённые сообщения сначала записываются на диск: отправка
+        возможна только после того, как изменение сохранено.
+        """
+        now = time.time() if now is None else now
+        if self.pending_messages:
+            self.flush()
+        with self.lock, self.connection:
+            rows = self.connection.execute(
+                'UPDATE outbox SET next_attempt = ? WHERE key IN ('
+                ' SELECT key FROM outbox WHERE state = ? AND next_attempt <= ?'
+                ' ORDER BY next_attempt LIMIT ?)'
+                ' RETURNING key, chat_id, message, attempts',
+                (now + OUTBOX_CLAIM, PENDING, now, limit)
+            ).fetchall()
+        return [OutboxMessage(*row) for row in rows]
+
+    def settle(self, results, now=None):
+        """Итог отправки одной транзакцией; старые записи удаляются."""
+        now = time.time() if now is None else now
+        with self.lock, self.connection:
+            self.connection.executemany(
+                'UPDATE outbox SET state = ?, attempts = ?, next_attempt = ?'
+                ' WHERE key = ?',
+                (settle_message(message, sent, now) + (message.key,)
+                 for message, sent in results)
+            )
+            self.connection.execute(
+                'DELETE FROM outbox WHERE state != ? AND next_attempt < ?',
+                (PENDING, now - OUTBOX_RETENTION)
+            )
+
+    def close(self):
+        """Сохранение записей и закрытие базы."""
+        self.flush()
+        self.connection.close()
@@ -0,0 +1,287 @@
+"""Распределение пользователей по процессам-обработчикам.
+
+Супервизор запускает `WORKER_PROCESSES` процессов, каждый со своим
+движком опроса, и раздаёт им пользователей по согласованному хешированию.
+Упавший процесс перезапускается; если он падает чаще `MAX_RESTARTS` раз
+за `RESTART_WINDOW` секунд, его пользователи переходят к остальным.
+Метрики и состояние всех процессов доступны с одного порта.
+"""
+import asyncio
+import bisect
+import hashlib
+import logging
+import multiprocessing
+import os
+import queue
+import time
+from collections import deque
+
+from delivery import GLOBAL_RATE
+from engine import configured_tenants, create_engine
+from log_config import build_log_handlers
+from metrics import METRICS_PORT, METRICS_SERVER_MESSAGE, REGISTRY
+from metrics import start_metrics_server
+
+WORKER_PROCESSES = int(os.getenv('WORKER_PROCESSES', os.cpu_count() or 1))
+MAX_RESTARTS = int(os.getenv('WORKER_MAX_RESTARTS', 3))
+RESTART_WINDOW = float(os.getenv('WORKER_RESTART_WINDOW', 300))
+HASH_REPLICAS = 100
+REPORT_INTERVAL = 1
+SUPERVISE_TICK = 1
+STOP_TIMEOUT = 10
+
+WORKER_STARTED = 'Обработчик {node} (pid {pid}) запущен: {count} польз.'
+WORKER_DIED = 'Обработчик {node} завершился с кодом {code}'
+WORKER_EVICTED = ('Обработчик {node} падает слишком часто, его {count} '
+                  'польз. переданы остальным')
+
+
+class HashRing:
+    """Согласованное хеширование с виртуальными узлами.
+
+    При удалении узла к другим переходят только его ключи.
+    """
+
+    def __init__(self, nodes=(), replicas=HASH_REPLICAS):
+        self.replicas = replicas
+        self.hashes = []
+        self.owners = {}
+        self.nodes = set()
+        for node in nodes:
+            self.add(node)
+
+    @staticmethod
+    def hash(value):
+        """Позиция значения на кольце."""
+        digest = hashlib.md5(str(value).encode()).digest()
+        return int.from_bytes(digest[:8], 'big')
+
+    def add(self, node):
+        """Добавление узла."""
+        self.nodes.add(node)
+        for replica in range(self.replicas):
+            point = self.hash(f'{node}#{replica}')
+            self.owners[point] = node
+            bisect.insort(self.hashes, point)
+
+    def remove(self, node):
+        """Удаление узла."""
+        self.nodes.discard(node)
+        self.hashes = [point for point in self.hashes
+                       if self.owners[point] != node]
+        self.owners = {point: self.owners[point] for point in self.hashes}
+
+    def node_for(self, key):
+        """Узел, которому принадлежит ключ."""
+        index = bisect.bisect(self.hashes, self.hash(key)) % len(self.hashes)
+        return self.owners[self.hashes[index]]
+
+    def assign(self, tenants):
+        """Пользователи по узлам: {node: [tenant, ...]}."""
+        shards = {node: [] for node in self.nodes}
+        for tenant in tenants:
+            shards[self.node_for(tenant.key)].append(tenant)
+        return shards
+
+
+def add_worker_label(line, node):
+    """Строка метрики с меткой `worker`."""
+    series, value = line.rsplit(' ', 1)
+    name, brace, labels = series.partition('{')
+    if brace:
+        return f'{name}{{worker="{node}",{labels} {value}'
+    return f'{name}{{worker="{node}"}} {value}'
+
+
+def merge_metrics(texts):
+    """Метрики процессов одним текстом; процесс указан меткой `worker`."""
+    families = {}
+    for node, text in sorted(texts.items()):
+        family = None
+        for line in text.splitlines():
+            if line.startswith('# HELP '):
+                family = families.setdefault(line.split()[2], [line, '', []])
+            elif line.startswith('# TYPE '):
+                family[1] = line
+            elif line:
+                family[2].append(add_worker_label(line, node))
+    lines = []
+    for help_line, type_line, samples in families.values():
+        lines.extend([help_line, type_line, *samples])
+    return '\n'.join(lines) + '\n'
+
+
+async def serve_worker(engine, node, commands, reports,
+                       interval=REPORT_INTERVAL):
+    """Работа движка с приёмом новых пользователей и отчётами супервизору."""
+    polling = asyncio.create_task(engine.run())
+    while True:
+        done, _ = await asyncio.wait([polling], timeout=interval)
+        if done:
+            return polling.result()
+        while True:
+            try:
+                engine.add_tenants(commands.get_nowait())
+            except queue.Empty:
+                break
+        reports.put((node, REGISTRY.render(), engine.health()))
+
+
+def run_worker(node, tenants, commands, reports, global_rate=GLOBAL_RATE):
+    """Точка входа процесса-обработчика."""
+    queue_handler, log_listener = build_log_handlers(
+        f'{__file__}.{node}.log')
+    logging.basicConfig(level=logging.INFO, handlers=[queue_handler])
+    log_listener.start()
+    engine = create_engine(tenants, global_rate=global_rate)
+    try:
+        asyncio.run(serve_worker(engine, node, commands, reports))
+    finally:
+        engine.client.close()
+        engine.store.close()
+        engine.events.close()
+        log_listener.stop()
+
+
+class Worker:
+    """Процесс-обработчик с его пользователями и историей перезапусков."""
+
+    def __init__(self, node, tenants):
+        self.node = node
+        self.tenants = list(tenants)
+        self.process = None
+        self.commands = None
+        self.restarts = deque()
+
+
+class Supervisor:
+    """Запуск, наблюдение и перебалансировка процессов-обработчиков."""
+
+    def __init__(self, tenants, processes=WORKER_PROCESSES,
+                 max_restarts=MAX_RESTARTS, restart_window=RESTART_WINDOW,
+                 target=run_worker, context=None, clock=time.monotonic):
+        self.tenants = list(tenants)
+        self.processes = processes
+        self.max_restarts = max_restarts
+        self.restart_window = restart_window
+        self.target = target
+        self.context = context or multiprocessing.get_context('spawn')
+        self.clock = clock
+        self.ring = HashRing(range(processes))
+        self.reports = self.context.Queue()
+        self.workers = {}
+        self.snapshots = {}
+
+    def start(self):
+        """Запуск обработчиков со своей долей пользователей."""
+        for node, tenants in self.ring.assign(self.tenants).items():
+            self.workers[node] = Worker(node, tenants)
+            self.spawn(self.workers[node])
+
+    def spawn(self, worker):
+        """Запуск процесса обработчика."""
+        worker.commands = self.context.Queue()
+        worker.process = self.context.Process(
+            target=self.target, name=f'worker-{worker.node}', daemon=True,
+            args=(worker.node, worker.tenants, worker.commands, self.reports,
+                  GLOBAL_RATE / self.processes)
+        )
+        worker.process.start()
+        logging.info(WORKER_STARTED.format(node=worker.node,
+                                           pid=worker.process.pid,
+                                           count=len(worker.tenants)))
+
+    def collect(self):
+        """Приём отчётов обработчиков."""
+        while True:
+            try:
+                node, metrics, health = self.reports.get_nowait()
+            except queue.Empty:
+                return
+            if node in self.workers:
+                self.snapshots[node] = (metrics, health)
+
+    def check(self):
+        """Перезапуск упавших обработчиков или передача их пользователей."""
+        now = self.clock()
+        for worker in list(self.workers.values()):
+            if worker.process.is_alive():
+                continue
+            logging.error(WORKER_DIED.format(node=worker.node,
+                                             code=worker.process.exitcode))
+            worker.restarts.append(now)
+            while worker.restarts[0] <= now - self.restart_window:
+                worker.restarts.popleft()
+            if (len(worker.restarts) > self.max_restarts
+                    and len(self.workers) > 1):
+                self.evict(worker)
+            else:
+                self.spawn(worker)
+
+    def evict(self, worker):
+        """Передача пользователей обработчика остальным по кольцу."""
+        logging.critical(WORKER_EVICTED.format(node=worker.node,
+                                               count=len(worker.tenants)))
+        del self.workers[worker.node]
+        self.snapshots.pop(worker.node, None)
+        self.ring.remove(worker.node)
+        for node, tenants in self.ring.assign(worker.tenants).items():
+            if tenants:
+                self.workers[node].tenants.extend(tenants)
+                self.workers[node].commands.put(tenants)
+
+    def render(self):
+        """Метрики всех обработчиков в текстовом формате Prometheus."""
+        return merge_metrics({node: metrics for node, (metrics, _)
+                              in self.snapshots.items()})
+
+    def health(self):
+        """Состояние обработчиков и их движков."""
+        return {
+            node: {
+                'pid': worker.process.pid,
+                'alive': worker.process.is_alive(),
+                'tenants': len(worker.tenants),
+                'restarts': len(worker.restarts),
+                'engine': self.snapshots.get(node, (None, None))[1],
+            }
+            for node, worker in self.workers.items()
+        }
+
+    def stop(self):
+        """Остановка всех обработчиков."""
+        for worker in self.workers.values():
+            worker.process.terminate()
+        for worker in self.workers.values():
+            worker.process.join(STOP_TIMEOUT)
+
+    def run(self, tick=SUPERVISE_TICK):
+        """Бесконечное наблюдение за обработчиками."""
+        self.start()
+        try:
+            while True:
+                time.sleep(tick)
+                self.collect()
+                self.check()
+        finally:
+            self.stop()
+
+
+def main():
+    """Запуск опроса пользователей в нескольких процессах."""
+    supervisor = Supervisor(configured_tenants())
+    if METRICS_PORT:
+        start_metrics_server(METRICS_PORT, registry=supervisor,
+                             health=supervisor.health)
+        logging.info(METRICS_SERVER_MESSAGE.format(port=METRICS_PORT))
+    supervisor.run()
+
+
+if __name__ == '__main__':
+    queue_handler, log_listener = build_log_handlers(__file__ + '.log')
+    logging.basicConfig(level=logging.INFO, handlers=[queue_handler])
+    log_listener.start()
+    try:
+        main()
+    finally:
+        log_listener.stop()
@@ -0,0 +1,42 @@
+"""Пользователи бота: пара токена ЯП и чата Телеграм."""
+import hashlib
+import json
+from collections import namedtuple
+
+from exceptions import TenantsError
+
+TENANTS_FILE_ERROR = 'Не удалось прочитать файл пользователей {path}: {error}'
+TENANTS_FORMAT_ERROR = ('Файл пользователей {path} должен содержать список '
+                        'объектов с ключами `practicum_token` и `chat_id`')
+
+
+class Tenant(namedtuple('Tenant', ('practicum_token', 'chat_id'))):
+    """Пользователь бота."""
+
+    __slots__ = ()
+
+    @property
+    def account(self):
+        """Хеш токена ЯП: общий у чатов, которые следят за одним аккаунтом."""
+        return hashlib.sha256(self.practicum_token.encode()).hexdigest()
+
+    @property
+    def key(self):
+        """Устойчивый идентификатор пользователя без токена в открытом виде."""
+        return f'{self.chat_id}:{self.account[:12]}'
+
+
+def load_tenants(path):
+    """Чтение списка пользователей из JSON-файла."""
+    try:
+        with open(path, encoding='utf-8') as file:
+            data = json.load(file)
+    except (OSError, ValueError) as error:
+        raise TenantsError(TENANTS_FILE_ERROR.format(path=path, error=error))
+    if not isinstance(data, list):
+        raise TenantsError(TENANTS_FORMAT_ERROR.format(path=path))
+    try:
+        return [Tenant(str(item['practicum_token']), str(item['chat_id']))
+                for item in data]
+    except (KeyError, TypeError):
+        raise TenantsError(TENANTS_FORMAT_ERROR.format(path=path))
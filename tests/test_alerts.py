@@ -0,0 +1,50 @@
+from alerts import ErrorAggregator, fingerprint, redact
+from exceptions import ResponseError
+from utils import FakeClock
+
+
+class TestErrorAggregator:
+    def test_fingerprint_ignores_numbers(self):
+        assert fingerprint(ResponseError('Статус код:500, 1699999')) == (
+            fingerprint(ResponseError('Статус код:502, 1700000'))
+        )
+        assert fingerprint(ResponseError('a')) != fingerprint(KeyError('a'))
+
+    def test_fingerprint_ignores_request_parameters(self):
+        first = ResponseError(
+            "Статус код:500, {'Authorization': 'OAuth alpha'}, "
+            "{'from_date': 0}")
+        second = ResponseError(
+            "Статус код:503, {'Authorization': 'OAuth bravo'}, "
+            "{'from_date': 1700000000}")
+        assert fingerprint(first) == fingerprint(second)
+
+    def test_tokens_are_redacted(self):
+        text = ("{'Authorization': 'OAuth y0_secret'} "
+                "bot123456:AAHdqTcvCH1vGWJxfSeofSAs0K5PALDsaw")
+        assert redact(text) == "{'Authorization': 'OAuth ***'} bot***"
+        alerts = ErrorAggregator()
+        assert 'y0_secret' not in alerts.record(ResponseError(text))
+
+    def test_repeats_are_coalesced_into_summary(self):
+        clock = FakeClock()
+        alerts = ErrorAggregator(window=3600, clock=clock)
+        assert alerts.record(ResponseError('code 500')) == 'code 500'
+        for second in range(1, 37):
+            clock.now = second * 60
+            assert alerts.record(ResponseError(f'code {500 + second}')) is None
+        assert alerts.pending() == []
+
+        clock.now = 3600
+        summary, = alerts.pending()
+        assert summary.startswith('ResponseError x36 за последние 60 мин')
+        assert alerts.pending() == []
+
+    def test_quiet_fingerprints_are_forgotten(self):
+        clock = FakeClock()
+        alerts = ErrorAggregator(window=60, clock=clock)
+        alerts.record(ConnectionError('down'))
+        clock.now = 120
+        assert alerts.pending() == []
+        assert alerts.events == {}
+        assert alerts.record(ConnectionError('down')) == 'down'
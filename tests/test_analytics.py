@@ -0,0 +1,105 @@
+import numpy as np
+import pytest
+
+import analytics
+from benchmarks.analytics import run_benchmark
+from changes import Change
+from events import SQLiteEventStore
+
+HOUR = 3600
+
+
+def change(name, old, new, hour):
+    homework = {'id': name, 'homework_name': name, 'status': new,
+                'date_updated': f'2023-11-14T{hour:02d}:00:00Z'}
+    return Change(name, homework, old, new)
+
+
+@pytest.fixture
+def path(tmp_path):
+    path = tmp_path / 'events.sqlite3'
+    store = SQLiteEventStore(path)
+    store.record('a', [change('hw1', None, 'reviewing', 1)])
+    store.record('a', [change('hw1', 'reviewing', 'rejected', 4)])
+    store.record('a', [change('hw1', 'rejected', 'reviewing', 5)])
+    store.record('a', [change('hw1', 'reviewing', 'approved', 7)])
+    store.record('b', [change('hw1', None, 'reviewing', 2)])
+    store.record('b', [change('hw1', 'reviewing', 'approved', 3)])
+    store.record('b', [change('hw2', None, 'reviewing', 10)])
+    store.close()
+    return path
+
+
+def test_review_latency(path):
+    events = analytics.load_events(path)
+
+    latency = analytics.review_latency(events)
+
+    verdicts = events.statuses[latency.verdict]
+    assert sorted(zip(verdicts, latency.seconds / HOUR)) == [
+        ('approved', 1), ('approved', 2), ('rejected', 3)]
+    assert set(events.names[latency.name]) == {'hw1'}
+
+
+def test_rejection_rates_and_medians(path):
+    events = analytics.load_events(path)
+
+    reviews, rates, medians = analytics.rejection_rates(events)
+
+    hw1 = list(events.names).index('hw1')
+    hw2 = list(events.names).index('hw2')
+    assert reviews[hw1] == 3
+    assert rates[hw1] == pytest.approx(1 / 3)
+    assert medians[hw1] == 2
+    assert reviews[hw2] == 0
+    assert np.isnan(medians[hw2])
+
+
+def test_load_by_hour(path):
+    events = analytics.load_events(path)
+
+    load = analytics.load_by_hour(events, utc_offset=3)
+
+    assert load.sum() == 3
+    assert load[6] == load[7] == load[10] == 1
+
+
+def test_load_events_since(path):
+    since = analytics.load_events(path).updated_at.max()
+
+    events = analytics.load_events(path, since)
+
+    assert list(events.statuses[events.new_status]) == ['reviewing']
+
+
+def test_group_order_matches_lexsort():
+    rng = np.random.default_rng(1)
+    groups = rng.integers(0, 50, 1000).astype(np.int32)
+    values = rng.random(1000)
+
+    assert (analytics.group_order(groups, values)
+            == np.lexsort((values, groups))).all()
+
+
+def test_main_prints_report(path, capsys):
+    analytics.main(['--db', str(path), '--top', '1'])
+
+    report = capsys.readouterr().out
+    assert 'все: 3 проверок' in report
+    assert 'hw1: 3 проверок, возвратов 33%' in report
+
+
+def test_report_on_empty_log(tmp_path):
+    path = tmp_path / 'events.sqlite3'
+    SQLiteEventStore(path).close()
+
+    report = analytics.build_report(analytics.load_events(path))
+
+    assert report.count(analytics.NO_DATA) == 2
+
+
+def test_benchmark_runs():
+    report = run_benchmark(events=2000, load=True, seed=1)
+
+    assert report['events'] == 2000
+    assert report['report_s'] > 0
@@ -0,0 +1,44 @@
+import pytest
+
+from breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+from exceptions import CircuitOpenError
+from utils import FakeClock
+
+
+def failing():
+    raise ConnectionError('down')
+
+
+class TestCircuitBreaker:
+    def test_opens_after_threshold_and_probes_once(self):
+        clock = FakeClock()
+        breaker = CircuitBreaker('api', failure_threshold=3,
+                                 reset_timeout=60, clock=clock)
+        for _ in range(3):
+            with pytest.raises(ConnectionError):
+                breaker.call(failing)
+        assert breaker.state == OPEN
+
+        with pytest.raises(CircuitOpenError):
+            breaker.call(failing)
+        clock.now = 60
+        assert breaker.allow()
+        assert breaker.state == HALF_OPEN
+        assert not breaker.allow()
+        breaker.record_failure()
+        assert breaker.state == OPEN
+        assert breaker.retry_in() == 60
+
+        clock.now = 120
+        assert breaker.call(lambda: 'ok') == 'ok'
+        assert breaker.snapshot() == {
+            'name': 'api', 'state': CLOSED, 'failures': 0,
+            'rejected': 2, 'retry_in': 0.0,
+        }
+
+    def test_ignored_errors_do_not_open(self):
+        breaker = CircuitBreaker('api', failure_threshold=1,
+                                 is_failure=lambda error: False)
+        with pytest.raises(ConnectionError):
+            breaker.call(failing)
+        assert breaker.state == CLOSED
@@ -0,0 +1,74 @@
+import threading
+import time
+
+import pytest
+
+from cache import CACHE_REQUESTS, ResponseCache
+from utils import FakeClock
+
+
+class TestResponseCache:
+    def test_hit_until_ttl_expires(self):
+        clock = FakeClock()
+        cache = ResponseCache(ttl=10, clock=clock, name='ttl')
+        calls = []
+
+        def fetch():
+            calls.append(1)
+            return {'current_date': len(calls)}
+
+        assert cache.get('key', fetch) == {'current_date': 1}
+        clock.now = 9
+        assert cache.get('key', fetch) == {'current_date': 1}
+        clock.now = 10
+        assert cache.get('key', fetch) == {'current_date': 2}
+        assert CACHE_REQUESTS.value(cache='ttl', result='hit') == 1
+        assert CACHE_REQUESTS.value(cache='ttl', result='miss') == 2
+
+    def test_least_recently_used_is_evicted_by_size(self):
+        cache = ResponseCache(ttl=10, max_bytes=10, sizeof=len)
+        cache.get('a', lambda: 'aaaa')
+        cache.get('b', lambda: 'bbbb')
+        cache.get('a', lambda: 'new')
+        cache.get('c', lambda: 'cccc')
+        assert list(cache.entries) == ['a', 'c']
+        assert cache.bytes == 8
+        cache.get('huge', lambda: 'x' * 11)
+        assert 'huge' not in cache.entries
+
+    def test_errors_are_not_cached(self):
+        cache = ResponseCache(ttl=10)
+
+        def fail():
+            raise ConnectionError('down')
+
+        with pytest.raises(ConnectionError):
+            cache.get('key', fail)
+        assert cache.get('key', lambda: 'ok') == 'ok'
+
+    def test_concurrent_requests_are_collapsed(self):
+        cache = ResponseCache(ttl=10, name='single')
+        started = threading.Event()
+        calls = []
+        results = []
+
+        def slow_fetch():
+            calls.append(1)
+            started.set()
+            time.sleep(0.1)
+            return 'answer'
+
+        def reader():
+            results.append(cache.get('key', slow_fetch))
+
+        leader = threading.Thread(target=reader)
+        leader.start()
+        started.wait(1)
+        followers = [threading.Thread(target=reader) for _ in range(3)]
+        for thread in followers:
+            thread.start()
+        for thread in [leader] + followers:
+            thread.join()
+        assert calls == [1]
+        assert results == ['answer'] * 4
+        assert CACHE_REQUESTS.value(cache='single', result='shared') == 3
@@ -0,0 +1,48 @@
+from changes import Change, change_key, detect_changes, homework_key
+
+
+class TestDetectChanges:
+    def test_only_transitions_are_emitted(self):
+        homeworks = [
+            {'id': 1, 'homework_name': 'hw1', 'status': 'approved'},
+            {'id': 2, 'homework_name': 'hw2', 'status': 'reviewing'},
+            {'id': 3, 'homework_name': 'hw3', 'status': 'rejected'},
+        ]
+        previous = {'1': 'reviewing', '2': 'reviewing'}
+
+        changes = detect_changes(homeworks, previous)
+        assert changes == [
+            Change('1', homeworks[0], 'reviewing', 'approved'),
+            Change('3', homeworks[2], None, 'rejected'),
+        ]
+
+    def test_latest_record_wins(self):
+        homeworks = [
+            {'homework_name': 'hw', 'status': 'approved'},
+            {'homework_name': 'hw', 'status': 'reviewing'},
+        ]
+        changes = detect_changes(homeworks, {'hw': 'approved'})
+        assert changes == []
+
+    def test_homework_key_falls_back_to_name(self):
+        assert homework_key({'id': 7, 'homework_name': 'hw'}) == '7'
+        assert homework_key({'homework_name': 'hw'}) == 'hw'
+
+    def test_cold_start_reports_only_newest(self):
+        homeworks = [
+            {'id': i, 'homework_name': f'hw{i}', 'status': 'approved'}
+            for i in range(12, 0, -1)
+        ]
+        changes = detect_changes(homeworks, {}, cold_start=True)
+        assert len(changes) == 12
+        assert [change.key for change in changes
+                if not change.silent] == ['12']
+
+    def test_change_key_is_stable(self):
+        homework = {'id': 1, 'status': 'approved', 'date_updated': 'a'}
+        change, = detect_changes([homework], {})
+        again, = detect_changes([dict(homework)], {})
+        assert change_key('1:abc', change) == change_key('1:abc', again)
+        assert change_key('1:abc', change) != change_key('2:abc', change)
+        later, = detect_changes([dict(homework, date_updated='b')], {})
+        assert change_key('1:abc', later) != change_key('1:abc', change)
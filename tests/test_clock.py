@@ -0,0 +1,102 @@
+import asyncio
+import time
+
+import pytest
+
+from clock import (STALLED_ERROR, InlineExecutor, VirtualClock,
+                   VirtualTimeLoop, run_virtual)
+from engine import PollingEngine
+from utils import RecordingBot
+
+
+def test_virtual_clock_moves_only_when_advanced():
+    clock = VirtualClock(epoch=1000)
+    clock.advance(5)
+    clock.advance(2)
+    clock.advance(-1)
+
+    assert clock.monotonic() == 7
+    assert clock.time() == 1007
+
+
+def test_sleep_takes_no_real_time():
+    clock = VirtualClock()
+
+    async def scenario():
+        await asyncio.sleep(7 * 24 * 3600)
+        return asyncio.get_running_loop().time()
+
+    started = time.monotonic()
+    assert run_virtual(scenario(), clock) == 7 * 24 * 3600
+    assert time.monotonic() - started < 1
+
+
+def test_timers_fire_in_virtual_order():
+    clock = VirtualClock()
+    fired = []
+
+    async def sleeper(delay):
+        await asyncio.sleep(delay)
+        fired.append((delay, clock.monotonic()))
+
+    async def scenario():
+        await asyncio.gather(sleeper(30), sleeper(10), sleeper(20))
+
+    run_virtual(scenario(), clock)
+
+    assert fired == [(10, 10), (20, 20), (30, 30)]
+
+
+def test_inline_executor_runs_in_place():
+    executor = InlineExecutor()
+
+    async def scenario():
+        loop = asyncio.get_running_loop()
+        result = await loop.run_in_executor(executor, sum, [1, 2])
+        with pytest.raises(ZeroDivisionError):
+            await loop.run_in_executor(executor, divmod, 1, 0)
+        return result
+
+    assert run_virtual(scenario(), VirtualClock()) == 3
+    assert executor.submit(max, 1, 2).result() == 2
+
+
+def test_stalled_simulation_raises():
+    loop = VirtualTimeLoop(VirtualClock())
+    try:
+        with pytest.raises(RuntimeError, match=STALLED_ERROR):
+            loop.run_until_complete(loop.create_future())
+    finally:
+        loop.close()
+
+
+def test_pending_tasks_are_cancelled():
+    clock = VirtualClock()
+    cancelled = []
+
+    async def forever():
+        try:
+            await asyncio.sleep(float('inf'))
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+
+    async def scenario():
+        asyncio.create_task(forever())
+        await asyncio.sleep(1)
+
+    run_virtual(scenario(), clock)
+
+    assert cancelled == [True]
+
+
+def test_engine_components_use_given_clock():
+    clock = VirtualClock(epoch=1_000_000_000)
+    clock.advance(60)
+    poller = PollingEngine(RecordingBot(), [], clock=clock)
+
+    poller.index.record('1', 'hw', 'text')
+
+    assert poller.index.changes['1'][0][0] == clock.time()
+    assert poller.scheduler.clock() == poller.delivery.clock() == 60
+    poller.client.close()
@@ -0,0 +1,173 @@
+import asyncio
+import threading
+from types import SimpleNamespace
+
+import engine
+from changes import Change
+from commands import (NO_HISTORY_MESSAGE, NO_STATUS_MESSAGE, StatusIndex,
+                      make_handlers)
+from events import SQLiteEventStore
+from storage import MemoryStateStore
+from tenants import Tenant
+from utils import FakeClock, RecordingBot, fast_delivery
+
+
+class FakeMessage:
+    def __init__(self):
+        self.replies = []
+
+    def reply_text(self, text):
+        self.replies.append(text)
+
+
+def make_update(chat_id):
+    return SimpleNamespace(effective_chat=SimpleNamespace(id=chat_id),
+                           effective_message=FakeMessage())
+
+
+class TestStatusIndex:
+    def test_empty_chat(self):
+        index = StatusIndex()
+
+        assert index.status(1) == NO_STATUS_MESSAGE
+        assert index.history(1) == NO_HISTORY_MESSAGE
+
+    def test_status_keeps_latest_per_homework(self):
+        index = StatusIndex()
+        index.record('1', 'hw1', 'first')
+        index.record('1', 'hw2', 'second')
+        index.record('1', 'hw1', 'third')
+
+        assert index.status(1) == 'third\n\nsecond'
+        assert index.status('2') == NO_STATUS_MESSAGE
+
+    def test_history_is_bounded_and_newest_first(self):
+        clock = FakeClock(1_700_000_000)
+        index = StatusIndex(history_limit=2, clock=clock)
+        for number in range(3):
+            index.record('1', 'hw', f'status{number}')
+
+        history = index.history('1')
+
+        assert 'status0' not in history
+        assert history.index('status2') < history.index('status1')
+
+    def test_silent_record_updates_status_only(self):
+        index = StatusIndex()
+        index.record('1', 'hw', 'old', notify=False)
+
+        assert index.status('1') == 'old'
+        assert index.history('1') == NO_HISTORY_MESSAGE
+
+    def test_seed_does_not_override_recorded(self):
+        index = StatusIndex()
+        index.record('1', 'hw1', 'fresh')
+        index.seed('1', {'hw1': 'approved', 'hw2': 'reviewing'})
+
+        status = index.status('1')
+
+        assert status.startswith('fresh\n\n')
+        assert '"hw2"' in status
+
+    def test_seed_uses_known_names(self):
+        index = StatusIndex()
+        index.seed('1', {'101': 'approved', '102': 'reviewing'},
+                   {'101': 'hw_python'})
+
+        status = index.status('1')
+
+        assert '"hw_python"' in status
+        assert '"102"' in status
+
+
+def test_handlers_reply_from_index():
+    index = StatusIndex()
+    index.record('7', 'hw', 'approved text')
+    status, history = (handler.callback for handler in make_handlers(index))
+    update = make_update(7)
+
+    status(update, None)
+    history(update, None)
+
+    replies = update.effective_message.replies
+    assert replies[0] == 'approved text'
+    assert replies[1].endswith(' approved text')
+
+
+def test_handlers_use_given_reply():
+    index = StatusIndex()
+    index.record('7', 'hw', 'approved text')
+    sent = []
+    status, _ = (handler.callback
+                 for handler in make_handlers(index, lambda *args:
+                                              sent.append(args)))
+    update = make_update(7)
+
+    status(update, None)
+
+    assert sent == [(7, 'approved text')]
+    assert update.effective_message.replies == []
+
+
+def test_engine_poll_fills_index(monkeypatch):
+    answer = {'homeworks': [{'homework_name': 'hw1', 'status': 'approved'}],
+              'current_date': 100}
+    monkeypatch.setattr(engine, 'request_api_answer',
+                        lambda *args, **kwargs: answer)
+    tenant = Tenant('token', '1')
+    store = MemoryStateStore()
+    store.checkpoint(tenant.key, 0, {'hw0': 'reviewing'})
+    bot = RecordingBot()
+    poller = engine.PollingEngine(bot, [tenant], store=store,
+                                  delivery=fast_delivery(bot))
+
+    asyncio.run(poller.poll_round())
+
+    status = poller.index.status('1')
+    assert '"hw0"' in status
+    assert '"hw1"' in status
+    assert 'hw1' in poller.index.history('1')
+
+
+def test_restart_seeds_names_from_events(tmp_path):
+    tenant = Tenant('token', '1')
+    store = MemoryStateStore()
+    store.checkpoint(tenant.key, 100, {'101': 'approved'})
+    events = SQLiteEventStore(tmp_path / 'events.sqlite3')
+    homework = {'id': 101, 'homework_name': 'hw_python', 'status': 'approved'}
+    events.record(tenant.key, [Change('101', homework, 'reviewing',
+                                      'approved', False)])
+    bot = RecordingBot()
+
+    poller = engine.PollingEngine(bot, [tenant], store=store, events=events,
+                                  delivery=fast_delivery(bot))
+    events.close()
+
+    assert '"hw_python"' in poller.index.status('1')
+
+
+def test_engine_reply_goes_through_delivery_queue(monkeypatch):
+    bot = RecordingBot()
+    poller = engine.PollingEngine(bot, [], delivery=fast_delivery(bot))
+    puts = []
+    put = poller.delivery.put
+
+    def recording_put(chat_id, text):
+        puts.append(chat_id)
+        return put(chat_id, text)
+
+    monkeypatch.setattr(poller.delivery, 'put', recording_put)
+
+    async def scenario():
+        task = asyncio.create_task(poller.run())
+        await asyncio.sleep(0.01)
+        thread = threading.Thread(target=poller.reply, args=('7', 'text'))
+        thread.start()
+        thread.join()
+        await asyncio.sleep(0.05)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+    asyncio.run(scenario())
+    assert puts == ['7']
+    assert bot.sent == [('7', 'text')]
@@ -0,0 +1,110 @@
+import asyncio
+
+import telegram
+
+from breaker import CircuitBreaker
+from delivery import (DeliveryQueue, RateLimiter, TokenBucket,
+                      is_telegram_failure)
+from utils import FakeClock
+
+
+class FlakyBot:
+    def __init__(self, retry_after=0, errors=()):
+        self.retry_after = retry_after
+        self.errors = list(errors)
+        self.sent = []
+
+    def send_message(self, chat_id=None, text=None, **kwargs):
+        if self.retry_after:
+            retry_after, self.retry_after = self.retry_after, 0
+            raise telegram.error.RetryAfter(retry_after)
+        if self.errors:
+            raise self.errors.pop()
+        self.sent.append((chat_id, text))
+
+
+class TestRateLimiter:
+    def test_token_bucket_delay(self):
+        clock = FakeClock()
+        bucket = TokenBucket(rate=2, capacity=2, clock=clock)
+        bucket.take()
+        bucket.take()
+        assert bucket.delay() == 0.5
+        clock.now = 0.5
+        assert bucket.delay() == 0
+
+    def test_chat_limit_is_separate_from_global(self):
+        clock = FakeClock()
+        limiter = RateLimiter(global_rate=30, chat_rate=1, clock=clock)
+        assert limiter.reserve('1') == 0
+        assert limiter.reserve('2') == 0
+        assert limiter.reserve('1') == 1
+
+    def test_idle_chat_buckets_are_pruned(self):
+        clock = FakeClock()
+        limiter = RateLimiter(clock=clock)
+        limiter.reserve('1')
+        clock.now = 10
+        limiter.prune()
+        assert limiter.chat_buckets == {}
+
+
+class TestDeliveryQueue:
+    def test_retry_after_pauses_and_resends(self):
+        bot = FlakyBot(retry_after=0.01)
+        delivery = DeliveryQueue(bot, limiter=RateLimiter(1000, 1000))
+
+        async def scenario():
+            async with delivery:
+                results = await asyncio.gather(
+                    delivery.put('1', 'a'), delivery.put('2', 'b'))
+            return results
+
+        assert asyncio.run(scenario()) == [True, True]
+        assert sorted(bot.sent) == [('1', 'a'), ('2', 'b')]
+        metrics = delivery.metrics()
+        assert metrics['retries'] == 1
+        assert metrics['sent'] == 2
+        assert metrics['depth'] == 0
+
+    def test_telegram_error_is_reported(self):
+        bot = FlakyBot(errors=[telegram.error.TelegramError('boom')])
+        delivery = DeliveryQueue(bot, limiter=RateLimiter(1000, 1000))
+
+        async def scenario():
+            async with delivery:
+                return await delivery.put('1', 'a')
+
+        assert asyncio.run(scenario()) is False
+        assert delivery.metrics()['failed'] == 1
+
+    def test_messages_wait_for_breaker_probe(self):
+        bot = FlakyBot(errors=[telegram.error.NetworkError('down')])
+        breaker = CircuitBreaker('telegram', failure_threshold=1,
+                                 reset_timeout=0.05,
+                                 is_failure=is_telegram_failure)
+        delivery = DeliveryQueue(bot, limiter=RateLimiter(1000, 1000),
+                                 breaker=breaker)
+
+        async def scenario():
+            async with delivery:
+                first = await delivery.put('1', 'a')
+                second = await delivery.put('1', 'b')
+            return first, second
+
+        assert asyncio.run(scenario()) == (False, True)
+        assert breaker.state == 'closed'
+        assert bot.sent == [('1', 'b')]
+
+    def test_cancelled_future_does_not_stop_worker(self):
+        bot = FlakyBot()
+        delivery = DeliveryQueue(bot, workers=1,
+                                 limiter=RateLimiter(1000, 1000))
+
+        async def scenario():
+            async with delivery:
+                delivery.put('1', 'a').cancel()
+                return await asyncio.wait_for(delivery.put('2', 'b'), 1)
+
+        assert asyncio.run(asyncio.wait_for(scenario(), 2)) is True
+        assert bot.sent == [('1', 'a'), ('2', 'b')]
@@ -0,0 +1,76 @@
+import asyncio
+
+import engine
+from digest import build_digests, digest_results, split_text
+from storage import MemoryStateStore, OutboxMessage
+from tenants import Tenant
+from utils import RecordingBot, fast_delivery
+
+
+def message(key, chat_id, text):
+    return OutboxMessage(key, chat_id, text)
+
+
+class TestDigest:
+    def test_messages_are_grouped_per_chat(self):
+        messages = [message('a', '1', 'first'), message('b', '2', 'other'),
+                    message('c', '1', 'second')]
+        digests = build_digests(messages)
+        assert [(digest.chat_id, digest.text) for digest in digests] == [
+            ('1', 'first\n\nsecond'), ('2', 'other')]
+        assert digests[0].messages == (messages[0], messages[2])
+
+    def test_digest_is_split_by_limit(self):
+        messages = [message(str(i), '1', 'x' * 4) for i in range(5)]
+        digests = build_digests(messages, limit=10)
+        assert [digest.text for digest in digests] == [
+            'xxxx\n\nxxxx', 'xxxx\n\nxxxx', 'xxxx']
+        assert all(len(digest.text) <= 10 for digest in digests)
+
+    def test_long_message_is_sent_in_parts(self):
+        assert split_text('line one\nline two', limit=10) == [
+            'line one', 'line two']
+        assert split_text('x' * 25, limit=10) == ['x' * 10, 'x' * 10, 'x' * 5]
+        long = message('a', '1', 'x' * 25)
+        short = message('b', '1', 'ok')
+        digests = build_digests([long, short], limit=10)
+        assert len(digests) == 4
+        results = digest_results(digests, [True, False, True, True])
+        assert results == [(long, False), (short, True)]
+
+
+class TestEngineDigest:
+    def test_changes_within_window_are_sent_once(self, monkeypatch):
+        tenant = Tenant('token', '1')
+        store = MemoryStateStore()
+        store.checkpoint(tenant.key, 500, {})
+        answers = iter([
+            [{'homework_name': f'hw{i}', 'status': 'reviewing'}
+             for i in range(5)],
+            [{'homework_name': 'hw0', 'status': 'rejected'}],
+        ])
+        monkeypatch.setattr(
+            engine, 'request_api_answer',
+            lambda timestamp, headers, **kwargs: {
+                'homeworks': next(answers), 'current_date': 600}
+        )
+        bot = RecordingBot()
+        poller = engine.PollingEngine(bot, [tenant], store=store,
+                                      delivery=fast_delivery(bot),
+                                      digest_window=60)
+        asyncio.run(poller.poll_round())
+        asyncio.run(poller.poll_round())
+        assert bot.sent == []
+
+        for entry in store.outbox.values():
+            entry[2] = 0
+
+        async def send():
+            async with poller.delivery:
+                await poller.send_outbox()
+
+        asyncio.run(send())
+        (chat_id, text), = bot.sent
+        assert chat_id == '1'
+        assert text.count('Изменился статус') == 6
+        assert all(entry[1] == 'sent' for entry in store.outbox.values())
@@ -0,0 +1,449 @@
+import asyncio
+import json
+import sqlite3
+
+import pytest
+import telegram
+
+import engine
+from breaker import CircuitBreaker
+from cache import ResponseCache
+from exceptions import ResponseError, TenantsError
+from http_client import FetchedResponse
+from scheduler import PollScheduler
+from storage import MemoryStateStore
+from tenants import Tenant, load_tenants
+from utils import RecordingBot, fast_delivery
+
+
+def make_engine(monkeypatch, tenants, answers):
+    def mock_request_api_answer(timestamp, headers, **kwargs):
+        answer = answers[headers['Authorization']]
+        if isinstance(answer, Exception):
+            raise answer
+        return answer
+
+    monkeypatch.setattr(engine, 'request_api_answer', mock_request_api_answer)
+    bot = RecordingBot()
+    return bot, engine.PollingEngine(bot, tenants, concurrency=2,
+                                     delivery=fast_delivery(bot))
+
+
+class TestPollingEngine:
+    def test_poll_round_serves_all_tenants(self, monkeypatch):
+        tenants = [Tenant(f'token{i}', str(i)) for i in range(5)]
+        answers = {
+            f'OAuth token{i}': {
+                'homeworks': [{'homework_name': f'hw{i}',
+                               'status': 'approved'}],
+                'current_date': 100 + i,
+            }
+            for i in range(5)
+        }
+        bot, poller = make_engine(monkeypatch, tenants, answers)
+
+        assert asyncio.run(poller.poll_round()) == 0
+        assert sorted(chat_id for chat_id, _ in bot.sent) == [
+            str(i) for i in range(5)
+        ]
+        assert poller.timestamps[tenants[3].key] == 103
+
+    def test_failed_tenant_does_not_stop_others(self, monkeypatch):
+        tenants = [Tenant('bad', '1'), Tenant('good', '2')]
+        answers = {
+            'OAuth bad': ConnectionError('down'),
+            'OAuth good': {'homeworks': [], 'current_date': 42},
+        }
+        bot, poller = make_engine(monkeypatch, tenants, answers)
+
+        assert asyncio.run(poller.poll_round()) == 1
+        assert poller.timestamps[tenants[0].key] == 0
+        assert poller.timestamps[tenants[1].key] == 42
+        assert bot.sent == []
+
+    def test_chats_of_one_account_share_request(self, monkeypatch):
+        tenants = [Tenant('token', '1'), Tenant('token', '2')]
+        requested = []
+
+        def mock_request_api_answer(timestamp, headers, **kwargs):
+            requested.append(timestamp)
+            return {'homeworks': [{'homework_name': 'hw',
+                                   'status': 'approved'}],
+                    'current_date': 100}
+
+        monkeypatch.setattr(engine, 'request_api_answer',
+                            mock_request_api_answer)
+        bot = RecordingBot()
+        poller = engine.PollingEngine(bot, tenants,
+                                      delivery=fast_delivery(bot))
+
+        asyncio.run(poller.poll_round())
+        assert requested == [0]
+        assert sorted(chat_id for chat_id, _ in bot.sent) == ['1', '2']
+
+    def test_from_date_never_moves_back(self, monkeypatch):
+        tenant = Tenant('token', '1')
+        dates = iter([500, 400, None])
+        requested = []
+
+        def mock_request_api_answer(timestamp, headers, **kwargs):
+            requested.append(timestamp)
+            return {'homeworks': [], 'current_date': next(dates)}
+
+        monkeypatch.setattr(engine, 'request_api_answer',
+                            mock_request_api_answer)
+        bot = RecordingBot()
+        poller = engine.PollingEngine(bot, [tenant],
+                                      delivery=fast_delivery(bot),
+                                      cache=ResponseCache(ttl=0))
+        for _ in range(3):
+            asyncio.run(poller.poll_round())
+        assert requested == [0, 500, 500]
+        assert poller.timestamps[tenant.key] == 500
+
+
+class TestTenants:
+    def test_load_tenants(self, tmp_path):
+        path = tmp_path / 'tenants.json'
+        path.write_text(json.dumps([
+            {'practicum_token': 'abc', 'chat_id': 1},
+        ]))
+        tenant, = load_tenants(path)
+        assert tenant == Tenant('abc', '1')
+        assert 'abc' not in tenant.key
+
+    def test_load_tenants_invalid(self, tmp_path):
+        path = tmp_path / 'tenants.json'
+        path.write_text(json.dumps({'practicum_token': 'abc'}))
+        with pytest.raises(TenantsError):
+            load_tenants(path)
+
+
+class TestPollingEngineState:
+    def test_cold_start_resumes_from_checkpoint(self, monkeypatch):
+        tenant = Tenant('token', '1')
+        store = MemoryStateStore()
+        store.checkpoint(tenant.key, 500, {'hw': 'approved'})
+        answers = {'OAuth token': {
+            'homeworks': [{'homework_name': 'hw', 'status': 'approved'}],
+            'current_date': 600,
+        }}
+        requested = []
+
+        def mock_request_api_answer(timestamp, headers, **kwargs):
+            requested.append(timestamp)
+            return answers[headers['Authorization']]
+
+        monkeypatch.setattr(engine, 'request_api_answer',
+                            mock_request_api_answer)
+        bot = RecordingBot()
+        poller = engine.PollingEngine(bot, [tenant], store=store,
+                                      delivery=fast_delivery(bot))
+
+        asyncio.run(poller.poll_round())
+        assert requested == [500]
+        assert bot.sent == []
+        assert store.load_all()[tenant.key][0] == 600
+
+    def test_only_changed_homeworks_are_sent(self, monkeypatch):
+        tenant = Tenant('token', '1')
+        store = MemoryStateStore()
+        store.checkpoint(tenant.key, 500, {'hw1': 'approved'})
+        answers = {'OAuth token': {
+            'homeworks': [
+                {'homework_name': 'hw1', 'status': 'approved'},
+                {'homework_name': 'hw2', 'status': 'rejected'},
+                {'homework_name': 'hw3', 'status': 'reviewing'},
+            ],
+            'current_date': 600,
+        }}
+        monkeypatch.setattr(
+            engine, 'request_api_answer',
+            lambda timestamp, headers, **kwargs: answers[
+                headers['Authorization']]
+        )
+        bot = RecordingBot()
+        poller = engine.PollingEngine(bot, [tenant], store=store,
+                                      delivery=fast_delivery(bot))
+
+        asyncio.run(poller.poll_round())
+        assert [text.split('"')[1] for _, text in bot.sent] == ['hw2', 'hw3']
+        asyncio.run(poller.poll_round())
+        assert len(bot.sent) == 2
+
+    def test_undelivered_message_is_retried_not_lost(self, monkeypatch):
+        tenant = Tenant('token', '1')
+        store = MemoryStateStore()
+        store.checkpoint(tenant.key, 500, {})
+        answer = {
+            'homeworks': [{'homework_name': 'hw', 'status': 'approved'}],
+            'current_date': 600,
+        }
+        monkeypatch.setattr(engine, 'request_api_answer',
+                            lambda timestamp, headers, **kwargs: answer)
+        bot = RecordingBot()
+        poller = engine.PollingEngine(bot, [tenant], store=store,
+                                      delivery=fast_delivery(bot))
+        bot.error = telegram.error.TelegramError('down')
+
+        asyncio.run(poller.poll_round())
+        assert store.load_all()[tenant.key] == (600, {'hw': 'approved'})
+        assert bot.sent == []
+
+        bot.error = None
+        for entry in store.outbox.values():
+            entry[2] = 0
+        asyncio.run(poller.poll_round())
+        assert [text.split('"')[1] for _, text in bot.sent] == ['hw']
+
+    def test_restart_without_state_sends_only_newest(self, monkeypatch):
+        tenant = Tenant('token', '1')
+        answers = {'OAuth token': {
+            'homeworks': [
+                {'id': i, 'homework_name': f'hw{i}', 'status': 'approved'}
+                for i in range(12, 0, -1)
+            ],
+            'current_date': 600,
+        }}
+        bot, poller = make_engine(monkeypatch, [tenant], answers)
+
+        asyncio.run(poller.poll_round())
+        assert [text.split('"')[1] for _, text in bot.sent] == ['hw12']
+        assert len(poller.statuses[tenant.key]) == 12
+        asyncio.run(poller.poll_round())
+        assert len(bot.sent) == 1
+
+
+class TestScheduledRun:
+    def test_failing_tenant_is_polled_less_often(self, monkeypatch):
+        tenants = [Tenant('bad', '1'), Tenant('good', '2')]
+        calls = {'OAuth bad': 0, 'OAuth good': 0}
+
+        def mock_request_api_answer(timestamp, headers, **kwargs):
+            calls[headers['Authorization']] += 1
+            if headers['Authorization'] == 'OAuth bad':
+                raise ConnectionError('down')
+            return {'homeworks': [], 'current_date': 1}
+
+        monkeypatch.setattr(engine, 'request_api_answer',
+                            mock_request_api_answer)
+        bot = RecordingBot()
+        scheduler = PollScheduler(base_interval=0.02, reviewing_interval=0.02,
+                                  idle_interval=0.02, max_backoff=10,
+                                  jitter=0)
+        poller = engine.PollingEngine(bot, tenants, scheduler=scheduler,
+                                      delivery=fast_delivery(bot),
+                                      cache=ResponseCache(ttl=0))
+
+        async def scenario():
+            try:
+                await asyncio.wait_for(poller.run(), 0.3)
+            except asyncio.TimeoutError:
+                pass
+
+        asyncio.run(scenario())
+        assert calls['OAuth good'] > 5
+        assert calls['OAuth bad'] <= 4
+
+    def test_state_is_flushed_under_constant_load(self, monkeypatch):
+        tenants = [Tenant(f'token{i}', str(i)) for i in range(4)]
+        monkeypatch.setattr(
+            engine, 'request_api_answer',
+            lambda timestamp, headers, **kwargs: {'homeworks': [],
+                                                  'current_date': 1}
+        )
+        monkeypatch.setattr(engine, 'HOUSEKEEPING_TICK', 0.05)
+        store = MemoryStateStore()
+        flushes = []
+        monkeypatch.setattr(store, 'flush', lambda: flushes.append(1))
+        bot = RecordingBot()
+        scheduler = PollScheduler(base_interval=0.001,
+                                  reviewing_interval=0.001,
+                                  idle_interval=0.001, jitter=0)
+        poller = engine.PollingEngine(bot, tenants, scheduler=scheduler,
+                                      store=store,
+                                      delivery=fast_delivery(bot))
+
+        async def scenario():
+            try:
+                await asyncio.wait_for(poller.run(), 0.3)
+            except asyncio.TimeoutError:
+                pass
+
+        asyncio.run(scenario())
+        assert len(flushes) >= 3
+
+    def test_housekeeping_survives_flush_error(self, monkeypatch):
+        monkeypatch.setattr(engine, 'HOUSEKEEPING_TICK', 0.02)
+        store = MemoryStateStore()
+        flushes = []
+
+        def flaky_flush():
+            flushes.append(1)
+            if len(flushes) == 1:
+                raise sqlite3.OperationalError('database is locked')
+
+        monkeypatch.setattr(store, 'flush', flaky_flush)
+        bot = RecordingBot()
+        poller = engine.PollingEngine(bot, [], store=store,
+                                      delivery=fast_delivery(bot))
+
+        async def scenario():
+            try:
+                await asyncio.wait_for(poller.run(), 0.2)
+            except asyncio.TimeoutError:
+                pass
+
+        asyncio.run(scenario())
+        assert len(flushes) >= 3
+
+    def test_outage_is_probed_not_hammered(self, monkeypatch):
+        tenants = [Tenant(f'token{i}', str(i)) for i in range(20)]
+        calls = []
+
+        def mock_request_api_answer(timestamp, headers, **kwargs):
+            calls.append(headers['Authorization'])
+            raise ConnectionError('down')
+
+        monkeypatch.setattr(engine, 'request_api_answer',
+                            mock_request_api_answer)
+        bot = RecordingBot()
+        poller = engine.PollingEngine(
+            bot, tenants, concurrency=1, delivery=fast_delivery(bot),
+            breaker=CircuitBreaker('practicum', failure_threshold=3,
+                                   reset_timeout=60)
+        )
+
+        assert asyncio.run(poller.poll_round()) == 20
+        assert len(calls) == 3
+        assert poller.health()['practicum']['state'] == 'open'
+
+    def test_rejected_tokens_do_not_open_breaker(self, monkeypatch):
+        tenants = [Tenant(f'revoked{i}', str(i)) for i in range(10)]
+        tenants.append(Tenant('valid', 'ok'))
+        bot = RecordingBot()
+        poller = engine.PollingEngine(bot, tenants, concurrency=1,
+                                      delivery=fast_delivery(bot))
+
+        def mock_get(url, headers=None, **kwargs):
+            if headers['Authorization'] == 'OAuth valid':
+                return FetchedResponse(200, {}, b'{"homeworks": []}')
+            return FetchedResponse(401, {}, b'{"code": "not_authenticated"}')
+
+        monkeypatch.setattr(poller.client, 'get', mock_get)
+
+        assert asyncio.run(poller.poll_round()) == 10
+        assert poller.health()['practicum']['state'] == 'closed'
+        assert poller.failures[tenants[-1].key] == 0
+
+    def test_pool_size_defaults_to_concurrency(self, monkeypatch):
+        def maxsize(poller):
+            pool = poller.client.adapter.poolmanager.connection_pool_kw
+            poller.client.close()
+            return pool['maxsize']
+
+        monkeypatch.setattr(engine, 'POOL_SIZE', 0)
+        assert maxsize(engine.PollingEngine(RecordingBot(), [],
+                                            concurrency=5)) == 5
+        monkeypatch.setattr(engine, 'POOL_SIZE', 3)
+        assert maxsize(engine.PollingEngine(RecordingBot(), [],
+                                            concurrency=5)) == 3
+
+    def test_connection_stats_are_exported(self):
+        poller = engine.PollingEngine(RecordingBot(), [])
+
+        assert poller.health()['connections'] == {
+            'requests': 0, 'handshakes': 0, 'reused': 0}
+        assert ('bot_practicum_connections{kind="reused"} 0'
+                in engine.PRACTICUM_CONNECTIONS.samples())
+        poller.client.close()
+
+    def test_failure_classification(self):
+        assert engine.is_practicum_failure(ResponseError('', 503))
+        assert not engine.is_practicum_failure(ResponseError('', 401))
+        assert engine.is_practicum_failure(ConnectionError('timed out'))
+        assert not engine.is_practicum_failure(ValueError('bad status'))
+
+    def test_operator_alerts_are_coalesced(self, monkeypatch):
+        tokens = ['alpha', 'bravo', 'charlie', 'delta', 'echo', 'foxtrot',
+                  'golf', 'hotel']
+        tenants = [Tenant(f'y0_{token}', str(i))
+                   for i, token in enumerate(tokens)]
+        bot = RecordingBot()
+        poller = engine.PollingEngine(bot, tenants, concurrency=1,
+                                      delivery=fast_delivery(bot),
+                                      alert_chat_id='admin')
+        monkeypatch.setattr(
+            poller.client, 'get',
+            lambda url, **kwargs: FetchedResponse(500, {}, b'{}')
+        )
+
+        asyncio.run(poller.poll_round())
+        # Одно уведомление о сбое API и одно о разомкнутом предохранителе.
+        assert [chat_id for chat_id, _ in bot.sent] == ['admin', 'admin']
+        assert not any('y0_' in text for _, text in bot.sent)
+
+    def test_outbox_resumes_after_store_error(self, monkeypatch):
+        tenants = [Tenant(f'token{i}', str(i)) for i in range(2)]
+        answers = {
+            f'OAuth token{i}': {
+                'homeworks': [{'homework_name': f'hw{i}',
+                               'status': 'approved'}],
+                'current_date': 600,
+            }
+            for i in range(2)
+        }
+        monkeypatch.setattr(
+            engine, 'request_api_answer',
+            lambda timestamp, headers, **kwargs: answers[
+                headers['Authorization']]
+        )
+        bot = RecordingBot()
+        scheduler = PollScheduler(base_interval=0.01, jitter=0)
+        poller = engine.PollingEngine(bot, tenants, scheduler=scheduler,
+                                      delivery=fast_delivery(bot))
+        poller.outbox_tick = 0.01
+        claim_messages = poller.store.claim_messages
+        errors = [sqlite3.OperationalError('database is locked')]
+
+        def flaky_claim(*args, **kwargs):
+            if errors:
+                raise errors.pop()
+            return claim_messages(*args, **kwargs)
+
+        monkeypatch.setattr(poller.store, 'claim_messages', flaky_claim)
+
+        async def scenario():
+            try:
+                await asyncio.wait_for(poller.run(), 0.3)
+            except asyncio.TimeoutError:
+                pass
+
+        asyncio.run(scenario())
+        assert not errors
+        assert sorted(chat_id for chat_id, _ in bot.sent) == ['0', '1']
+
+    def test_run_stops_when_background_task_fails(self, monkeypatch):
+        bot, poller = make_engine(monkeypatch, [], {})
+
+        async def broken():
+            raise RuntimeError('broken')
+
+        monkeypatch.setattr(poller, 'housekeeping', broken)
+
+        with pytest.raises(RuntimeError, match='broken'):
+            asyncio.run(asyncio.wait_for(poller.run(), 1))
+
+
+class TestConfiguredTenants:
+    def test_single_tenant_from_env(self, monkeypatch):
+        monkeypatch.setattr(engine, 'TENANTS_FILE', None)
+        monkeypatch.setattr(engine, 'PRACTICUM_TOKEN', 'token')
+        monkeypatch.setattr(engine, 'TELEGRAM_CHAT_ID', '42')
+        assert engine.configured_tenants() == [Tenant('token', '42')]
+
+    def test_no_tenants(self, monkeypatch):
+        monkeypatch.setattr(engine, 'TENANTS_FILE', None)
+        monkeypatch.setattr(engine, 'PRACTICUM_TOKEN', None)
+        with pytest.raises(TenantsError):
+            engine.configured_tenants()
@@ -0,0 +1,154 @@
+import asyncio
+
+import pytest
+
+import engine
+from changes import detect_changes
+from events import SQLiteEventStore, updated_at
+from tenants import Tenant
+from utils import FakeClock, RecordingBot, fast_delivery
+
+HOUR = 3600
+
+
+def homework(name, status, date):
+    return {'id': name, 'homework_name': name, 'status': status,
+            'date_updated': date}
+
+
+@pytest.fixture
+def clock():
+    return FakeClock(1_700_000_000)
+
+
+@pytest.fixture
+def store(tmp_path, clock):
+    store = SQLiteEventStore(tmp_path / 'events.sqlite3',
+                             retention=24 * HOUR, compact_interval=HOUR,
+                             clock=clock)
+    yield store
+    store.close()
+
+
+def record(store, tenant, homeworks, previous=None):
+    changes = detect_changes(homeworks, previous or {})
+    store.record(tenant, changes)
+    return changes
+
+
+def test_updated_at_parses_practicum_dates():
+    assert updated_at({'date_updated': '2023-11-14T22:13:20Z'}, 0) == (
+        1_700_000_000)
+    assert updated_at({'date_updated': 'вчера'}, 5) == 5
+    assert updated_at({}, 7) == 7
+
+
+class TestEventStore:
+    def test_transitions_and_current_status(self, store):
+        record(store, 'a', [homework('hw1', 'reviewing',
+                                     '2023-11-14T20:00:00Z')])
+        record(store, 'a', [homework('hw1', 'approved',
+                                     '2023-11-14T22:00:00Z')],
+               {'hw1': 'reviewing'})
+
+        history = store.history('a', 'hw1')
+
+        assert [(event.old_status, event.new_status) for event in history] == [
+            (None, 'reviewing'), ('reviewing', 'approved')]
+        assert store.current('a', 'hw1') == 'approved'
+        assert store.current('a', 'hw2') is None
+
+    def test_repeated_transition_is_stored_once(self, store):
+        homeworks = [homework('hw1', 'approved', '2023-11-14T22:00:00Z')]
+        record(store, 'a', homeworks)
+        record(store, 'a', homeworks)
+
+        assert len(store.history('a', 'hw1')) == 1
+
+    def test_names_are_latest_per_homework(self, store):
+        first = homework('101', 'reviewing', '2023-11-14T20:00:00Z')
+        renamed = dict(homework('101', 'approved', '2023-11-14T22:00:00Z'),
+                       homework_name='hw_python')
+        record(store, 'a', [dict(first, homework_name='draft')])
+        record(store, 'a', [renamed], {'101': 'reviewing'})
+        record(store, 'b', [homework('202', 'approved',
+                                     '2023-11-14T21:00:00Z')])
+
+        assert store.names() == {'a': {'101': 'hw_python'},
+                                 'b': {'202': '202'}}
+
+    def test_since_filters_by_time_and_tenant(self, store, clock):
+        record(store, 'a', [homework('old', 'approved',
+                                     '2023-11-14T18:00:00Z')])
+        record(store, 'a', [homework('new', 'rejected',
+                                     '2023-11-14T21:30:00Z')])
+        record(store, 'b', [homework('new', 'approved',
+                                     '2023-11-14T21:45:00Z')])
+
+        last_hour = store.since(clock() - HOUR)
+
+        assert [(event.tenant, event.homework) for event in last_hour] == [
+            ('a', 'new'), ('b', 'new')]
+        assert [event.tenant for event in store.since(0, tenant='b')] == ['b']
+        assert [event.tenant for event in store.by_name('new')] == ['a', 'b']
+
+    @pytest.mark.parametrize('query', [
+        'SELECT * FROM events WHERE updated_at >= 0 ORDER BY updated_at',
+        "SELECT * FROM events WHERE tenant = 'a' AND homework = 'hw1'",
+        "SELECT * FROM events WHERE name = 'hw1' AND updated_at >= 0",
+        "SELECT * FROM events WHERE tenant = 'a' AND updated_at >= 0",
+    ])
+    def test_queries_use_indexes(self, store, query):
+        plan = store.connection.execute(
+            f'EXPLAIN QUERY PLAN {query}').fetchall()
+
+        details = ' '.join(row[-1] for row in plan)
+        assert 'USING INDEX' in details
+        assert 'SCAN events' not in details
+
+    def test_compaction_keeps_latest_transition(self, store, clock):
+        statuses = {}
+        for hour, status in enumerate(['reviewing', 'rejected', 'reviewing']):
+            record(store, 'a', [homework(
+                'hw1', status, f'2023-11-12T1{hour}:00:00Z')], statuses)
+            statuses = {'hw1': status}
+        record(store, 'a', [homework('hw2', 'reviewing',
+                                     '2023-11-12T10:00:00Z')])
+        record(store, 'a', [homework('hw1', 'approved',
+                                     '2023-11-14T21:00:00Z')], statuses)
+        store.flush()
+        assert len(store.history('a', 'hw1')) == 4
+
+        clock.now += HOUR
+        store.flush()
+
+        assert [event.new_status for event in store.history('a', 'hw1')] == [
+            'approved']
+        assert store.current('a', 'hw2') == 'reviewing'
+
+    def test_log_survives_restart(self, store, tmp_path):
+        record(store, 'a', [homework('hw1', 'approved',
+                                     '2023-11-14T22:00:00Z')])
+        store.close()
+
+        reopened = SQLiteEventStore(tmp_path / 'events.sqlite3')
+        try:
+            assert reopened.current('a', 'hw1') == 'approved'
+        finally:
+            reopened.close()
+
+
+def test_engine_records_transitions(monkeypatch, store):
+    answer = {'homeworks': [homework('hw1', 'approved',
+                                     '2023-11-14T22:00:00Z')],
+              'current_date': 100}
+    monkeypatch.setattr(engine, 'request_api_answer',
+                        lambda *args, **kwargs: answer)
+    tenant = Tenant('token', '1')
+    bot = RecordingBot()
+    poller = engine.PollingEngine(bot, [tenant], events=store,
+                                  delivery=fast_delivery(bot))
+
+    asyncio.run(poller.poll_round())
+
+    assert store.current(tenant.key, 'hw1') == 'approved'
@@ -0,0 +1,70 @@
+import itertools
+import time
+
+import pytest
+
+from hedging import HEDGES, HedgeBudget, HedgingPolicy
+
+
+def warmed_policy(ratio=1.0, threshold=0.05):
+    policy = HedgingPolicy(percentile=0.9, workers=4,
+                           budget=HedgeBudget(ratio=ratio), min_samples=1,
+                           refresh=1)
+    policy.observe(threshold)
+    return policy
+
+
+def slow_then_fast(delays):
+    calls = itertools.count()
+
+    def fetch():
+        number = next(calls)
+        delay = delays[number]
+        if isinstance(delay, Exception):
+            raise delay
+        time.sleep(delay)
+        return number
+
+    return fetch
+
+
+class TestHedgingPolicy:
+    def test_threshold_follows_percentile(self):
+        policy = HedgingPolicy(percentile=0.9, min_samples=10, refresh=10)
+        for latency in range(1, 10):
+            policy.observe(latency)
+        assert policy.threshold is None
+        policy.observe(10)
+        assert policy.threshold == 10
+        policy.close()
+
+    def test_fast_response_is_not_hedged(self):
+        policy = warmed_policy()
+        issued = HEDGES.value(result='issued')
+        assert policy.call(slow_then_fast([0])) == 0
+        assert HEDGES.value(result='issued') == issued
+        policy.close()
+
+    def test_hedge_wins_over_slow_request(self):
+        policy = warmed_policy()
+        won = HEDGES.value(result='won')
+        started = time.monotonic()
+        assert policy.call(slow_then_fast([1, 0])) == 1
+        assert time.monotonic() - started < 0.5
+        assert HEDGES.value(result='won') - won == 1
+        policy.close()
+
+    def test_budget_limits_hedges(self):
+        policy = warmed_policy(ratio=0.5)
+        denied = HEDGES.value(result='denied')
+        assert policy.call(slow_then_fast([0.1, 0])) == 0
+        assert HEDGES.value(result='denied') - denied == 1
+        assert policy.call(slow_then_fast([0.2, 0])) == 1
+        policy.close()
+
+    def test_failed_request_waits_for_the_other(self):
+        policy = warmed_policy()
+        assert policy.call(slow_then_fast([0.1, ConnectionError()])) == 0
+        with pytest.raises(ConnectionError):
+            policy.call(slow_then_fast([ConnectionError(), TimeoutError()]))
+        policy.close()
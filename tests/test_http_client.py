@@ -0,0 +1,138 @@
+import gzip
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import homework
+from http_client import RECEIVED_BYTES, RESPONSES, PracticumClient
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    delay = 0
+    etag = None
+    homeworks = []
+    seen = []
+
+    def do_GET(self):
+        time.sleep(self.delay)
+        self.seen.append(dict(self.headers))
+        if self.etag and self.headers.get('If-None-Match') == self.etag:
+            self.send_response(304)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        body = json.dumps({'homeworks': self.homeworks,
+                           'current_date': 1}).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        if 'gzip' in self.headers.get('Accept-Encoding', ''):
+            body = gzip.compress(body)
+            self.send_header('Content-Encoding', 'gzip')
+        if self.etag:
+            self.send_header('ETag', self.etag)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class QuietServer(ThreadingHTTPServer):
+    def handle_error(self, request, client_address):
+        pass
+
+
+@pytest.fixture
+def stand_in():
+    server = QuietServer(('127.0.0.1', 0), StandInHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f'http://127.0.0.1:{server.server_port}/'
+    server.shutdown()
+    server.server_close()
+
+
+class TestPracticumClient:
+    def test_connections_are_reused(self, stand_in, monkeypatch):
+        monkeypatch.setattr(homework, 'ENDPOINT', stand_in)
+        client = PracticumClient(pool_size=1)
+        for _ in range(5):
+            answer = homework.request_api_answer(
+                0, homework.make_headers('token'), http_get=client.get
+            )
+            assert answer['current_date'] == 1
+        stats = client.stats()
+        client.close()
+        assert stats == {'requests': 5, 'handshakes': 1, 'reused': 4}
+
+    def test_read_timeout_becomes_connection_error(self, stand_in,
+                                                   monkeypatch):
+        monkeypatch.setattr(homework, 'ENDPOINT', stand_in)
+        monkeypatch.setattr(StandInHandler, 'delay', 0.5)
+        client = PracticumClient(read_timeout=0.1)
+        with pytest.raises(ConnectionError):
+            homework.request_api_answer(
+                0, homework.make_headers('token'), http_get=client.get
+            )
+        client.close()
+
+    def test_pool_size_is_configurable(self):
+        client = PracticumClient(pool_hosts=7, pool_size=3)
+        assert client.adapter.poolmanager.connection_pool_kw['maxsize'] == 3
+        client.close()
+
+    def test_compressed_body_is_decoded(self, stand_in, monkeypatch):
+        monkeypatch.setattr(StandInHandler, 'homeworks', [
+            {'homework_name': 'hw', 'status': 'approved'}] * 50)
+        client = PracticumClient()
+        received = RECEIVED_BYTES.value()
+        response = client.get(stand_in, params={'from_date': 0})
+        client.close()
+        assert len(response.json()['homeworks']) == 50
+        assert RECEIVED_BYTES.value() - received < len(response.content)
+
+    def test_not_modified_reuses_decoded_answer(self, stand_in, monkeypatch):
+        monkeypatch.setattr(StandInHandler, 'etag', '"v1"')
+        monkeypatch.setattr(StandInHandler, 'seen', [])
+        client = PracticumClient()
+        before = RESPONSES.value(result='not_modified')
+        first = client.get(stand_in, headers={'Authorization': 'OAuth a'},
+                           params={'from_date': 0})
+        answer = first.json()
+        second = client.get(stand_in, headers={'Authorization': 'OAuth a'},
+                            params={'from_date': 0})
+        other = client.get(stand_in, headers={'Authorization': 'OAuth a'},
+                           params={'from_date': 1})
+        client.close()
+        assert second.json() is answer
+        assert RESPONSES.value(result='not_modified') - before == 1
+        conditions = [headers.get('If-None-Match')
+                      for headers in StandInHandler.seen]
+        assert conditions == [None, '"v1"', None]
+        assert other is not first
+
+    def test_unchanged_body_is_not_decoded_again(self, stand_in):
+        client = PracticumClient()
+        before = RESPONSES.value(result='unchanged')
+        first = client.get(stand_in, params={'from_date': 0})
+        answer = first.json()
+        second = client.get(stand_in, params={'from_date': 0})
+        client.close()
+        assert second.json() is answer
+        assert RESPONSES.value(result='unchanged') - before == 1
+
+    def test_remembered_responses_are_bounded(self, stand_in):
+        client = PracticumClient(validators_max_bytes=100)
+        for token in range(5):
+            client.get(stand_in, headers={'Authorization': f'OAuth {token}'},
+                       params={'from_date': 0})
+        client.close()
+        sizes = [len(known.response.content)
+                 for known in client.validators.values()]
+        assert sum(sizes) == client.validators_bytes <= 100
+        assert 0 < len(sizes) < 5
@@ -0,0 +1,104 @@
+import asyncio
+
+import engine
+from leases import LeaseCoordinator, SQLiteLeaseStore
+from storage import MemoryStateStore
+from tenants import Tenant
+from utils import FakeClock, RecordingBot, fast_delivery
+
+
+def make_node(path, name, clock, shards=8):
+    return LeaseCoordinator(SQLiteLeaseStore(path), node_id=name,
+                            shards=shards, ttl=30, clock=clock)
+
+
+class TestLeases:
+    def test_shards_are_split_between_nodes(self, tmp_path):
+        clock = FakeClock(1000.0)
+        first = make_node(tmp_path / 'leases.db', 'a', clock)
+        second = make_node(tmp_path / 'leases.db', 'b', clock)
+
+        assert first.balance() == (set(range(8)), set())
+        assert second.balance() == (set(), set())
+        gained, lost = first.balance()
+        assert len(lost) == 4
+        gained, _ = second.balance()
+        assert gained == lost
+        assert first.owned.isdisjoint(second.owned)
+
+    def test_shards_fail_over_after_ttl(self, tmp_path):
+        clock = FakeClock(1000.0)
+        first = make_node(tmp_path / 'leases.db', 'a', clock)
+        second = make_node(tmp_path / 'leases.db', 'b', clock)
+        first.balance()
+        second.balance()
+        first.balance()
+        second.balance()
+
+        key = next(f'{i}:abc' for i in range(100)
+                   if first.shard_of(f'{i}:abc') in first.owned)
+        assert first.owns(key)
+        clock.now += 21
+        assert not first.owns(key)
+        clock.now += 10
+        second.balance()
+        assert second.owned == set(range(8))
+
+    def test_release_frees_shards(self, tmp_path):
+        clock = FakeClock(1000.0)
+        first = make_node(tmp_path / 'leases.db', 'a', clock)
+        first.balance()
+        first.release()
+        assert first.store.owners(clock.now) == {}
+
+
+class TestLeasedEngine:
+    def test_two_nodes_do_not_duplicate_messages(self, tmp_path,
+                                                 monkeypatch):
+        tenants = [Tenant(f'token{i}', str(i)) for i in range(20)]
+        monkeypatch.setattr(
+            engine, 'request_api_answer',
+            lambda timestamp, headers, **kwargs: {
+                'homeworks': [{'homework_name': 'hw', 'status': 'approved'}],
+                'current_date': 1,
+            }
+        )
+        clock = FakeClock(1000.0)
+        bot = RecordingBot()
+        store = MemoryStateStore()
+        nodes = [make_node(tmp_path / 'leases.db', name, clock)
+                 for name in 'ab']
+        for node in nodes + nodes:
+            node.balance()
+        for node in nodes:
+            poller = engine.PollingEngine(bot, tenants, store=store,
+                                          delivery=fast_delivery(bot),
+                                          coordinator=node)
+            asyncio.run(poller.poll_round())
+
+        assert sorted(chat_id for chat_id, _ in bot.sent) == sorted(
+            tenant.chat_id for tenant in tenants)
+
+    def test_taken_over_shard_resumes_from_checkpoint(self, tmp_path,
+                                                      monkeypatch):
+        tenant = Tenant('token', '1')
+        requested = []
+
+        def mock_request_api_answer(timestamp, headers, **kwargs):
+            requested.append(timestamp)
+            return {'homeworks': [], 'current_date': 700}
+
+        monkeypatch.setattr(engine, 'request_api_answer',
+                            mock_request_api_answer)
+        clock = FakeClock(1000.0)
+        store = MemoryStateStore()
+        node = make_node(tmp_path / 'leases.db', 'a', clock)
+        bot = RecordingBot()
+        poller = engine.PollingEngine(bot, [tenant], store=store,
+                                      delivery=fast_delivery(bot),
+                                      coordinator=node)
+        store.checkpoint(tenant.key, 600, {'hw': 'approved'})
+        poller.take_over(node.balance()[0])
+
+        asyncio.run(poller.poll_round())
+        assert requested == [600]
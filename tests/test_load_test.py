@@ -0,0 +1,34 @@
+import pytest
+import telegram
+
+from benchmarks.load_test import percentile, run_load_test
+from benchmarks.stand_ins import TelegramStandIn
+
+
+class TestLoadTest:
+    def test_percentile(self):
+        values = list(range(1, 101))
+        assert percentile(values, 0.5) == 51
+        assert percentile(values, 0.99) == 100
+        assert percentile([], 0.5) == 0.0
+
+    def test_engine_against_stand_ins(self):
+        report = run_load_test(tenants=5, duration=1.5, interval=0.1,
+                               change_every=0.5, concurrency=4, seed=1)
+        assert report['polls'] >= 10
+        assert report['verdicts'] > 0
+        assert 0 < report['p50'] <= report['p99'] < 1
+        assert report['max_rss_mb'] > 0
+
+    def test_telegram_stand_in_throttles(self):
+        stand_in = TelegramStandIn(throttle_rate=1, retry_after=3)
+        stand_in.server.start()
+        bot = telegram.Bot(token='123456:stand-in',
+                           base_url=stand_in.base_url)
+        try:
+            with pytest.raises(telegram.error.RetryAfter) as error:
+                bot.send_message(chat_id=1, text='hi')
+        finally:
+            stand_in.server.stop()
+        assert error.value.retry_after == 3
+        assert stand_in.throttled == 1
@@ -0,0 +1,82 @@
+import gzip
+import json
+import logging
+import queue
+
+from log_config import (DroppingQueueHandler, JsonFormatter, RateSampler,
+                        build_log_handlers)
+from utils import FakeClock
+
+
+def make_record(message):
+    return logging.LogRecord('bot', logging.ERROR, __file__, 1, message,
+                             None, None)
+
+
+class TestLogConfig:
+    def test_json_formatter(self):
+        data = json.loads(JsonFormatter().format(make_record('Сбой')))
+        assert data['level'] == 'ERROR'
+        assert data['message'] == 'Сбой'
+
+    def test_json_formatter_redacts_tokens(self):
+        record = make_record("{'Authorization': 'OAuth y0_secret'}")
+        data = json.loads(JsonFormatter().format(record))
+        assert data['message'] == "{'Authorization': 'OAuth ***'}"
+
+    def test_file_is_rotated_and_compressed(self, tmp_path):
+        path = tmp_path / 'bot.log'
+        handler, listener = build_log_handlers(str(path), max_bytes=200,
+                                               backup_count=2)
+        logger = logging.getLogger('test_log_config')
+        logger.propagate = False
+        logger.addHandler(handler)
+        listener.start()
+        try:
+            for number in range(20):
+                logger.error('запись %s', number)
+        finally:
+            listener.stop()
+            logger.removeHandler(handler)
+        archive = tmp_path / 'bot.log.1.gz'
+        assert archive.exists()
+        assert not (tmp_path / 'bot.log.3.gz').exists()
+        line = gzip.decompress(archive.read_bytes()).decode().splitlines()[0]
+        assert json.loads(line)['message'].startswith('запись')
+
+    def test_entry_point_setup_keeps_message_and_exc(self, tmp_path):
+        path = tmp_path / 'bot.log'
+        handler, listener = build_log_handlers(str(path))
+        root = logging.getLogger()
+        handlers, level = root.handlers[:], root.level
+        root.handlers = []
+        try:
+            logging.basicConfig(level=logging.INFO, handlers=[handler])
+            listener.start()
+            try:
+                raise ValueError('boom')
+            except ValueError:
+                logging.exception('Сбой %s', 1)
+            logging.info('Готово')
+        finally:
+            listener.stop()
+            root.handlers, root.level = handlers, level
+        error, info = map(json.loads, path.read_text().splitlines())
+        assert error['message'] == 'Сбой 1'
+        assert error['exc'].startswith('Traceback')
+        assert error['exc'].endswith('ValueError: boom')
+        assert info['message'] == 'Готово'
+        assert 'exc' not in info
+
+    def test_full_queue_drops_records(self):
+        handler = DroppingQueueHandler(queue.Queue(1))
+        handler.emit(make_record('first'))
+        handler.emit(make_record('second'))
+        assert handler.dropped == 1
+
+    def test_rate_sampler(self):
+        clock = FakeClock()
+        sampler = RateSampler(limit=2, interval=60, clock=clock)
+        assert [sampler.allow() for _ in range(3)] == [True, True, False]
+        clock.now = 60
+        assert sampler.allow()
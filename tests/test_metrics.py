@@ -0,0 +1,70 @@
+import json
+import threading
+import urllib.request
+
+import pytest
+
+from metrics import (Counter, Gauge, Histogram, Registry,
+                     start_metrics_server)
+from scheduler import PollScheduler
+
+
+@pytest.fixture
+def registry():
+    return Registry()
+
+
+class TestMetrics:
+    def test_counter_and_gauge_render(self, registry):
+        polls = Counter('bot_polls_total', 'Опросы', registry=registry)
+        polls.inc()
+        polls.inc(2, exception='ResponseError')
+        lag = Gauge('bot_lag_seconds', 'Отставание', registry=registry)
+        lag.set_function(lambda: 1.5)
+        text = registry.render()
+        assert '# TYPE bot_polls_total counter' in text
+        assert 'bot_polls_total 1' in text
+        assert 'bot_polls_total{exception="ResponseError"} 2' in text
+        assert 'bot_lag_seconds 1.5' in text
+
+    def test_histogram_buckets_are_cumulative(self, registry):
+        latency = Histogram('bot_latency_seconds', 'Задержка',
+                            buckets=(0.1, 1), registry=registry)
+        for value in (0.05, 0.5, 5):
+            latency.observe(value, stage='fetch')
+        lines = registry.render().splitlines()
+        assert 'bot_latency_seconds_bucket{stage="fetch",le="0.1"} 1' in lines
+        assert 'bot_latency_seconds_bucket{stage="fetch",le="1"} 2' in lines
+        assert 'bot_latency_seconds_bucket{stage="fetch",le="+Inf"} 3' in lines
+        assert 'bot_latency_seconds_count{stage="fetch"} 3' in lines
+        assert latency.count(stage='fetch') == 3
+
+    def test_metrics_and_health_endpoints(self, registry):
+        Counter('bot_polls_total', 'Опросы', registry=registry).inc()
+        server = start_metrics_server(0, registry=registry,
+                                      health=lambda: {'state': 'closed'},
+                                      host='127.0.0.1')
+        url = f'http://127.0.0.1:{server.server_port}'
+        try:
+            with urllib.request.urlopen(url + '/metrics') as response:
+                assert b'bot_polls_total 1' in response.read()
+            with urllib.request.urlopen(url + '/health') as response:
+                assert json.load(response) == {'state': 'closed'}
+        finally:
+            server.shutdown()
+            server.server_close()
+
+
+class TestSchedulerLag:
+    def test_lag_does_not_touch_heap(self):
+        scheduler = PollScheduler(jitter=0)
+        for key in range(100):
+            scheduler.schedule(key, 0)
+            scheduler.schedule(key, 1000)
+        heap = list(scheduler.heap)
+        threads = [threading.Thread(target=scheduler.lag) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert scheduler.heap == heap
@@ -0,0 +1,63 @@
+import asyncio
+import threading
+
+from pipeline import PIPELINE_ITEMS, PIPELINE_SECONDS, Pipeline, Stage
+
+
+class TestPipeline:
+    def test_items_pass_all_stages_and_errors_are_reported(self):
+        done, failed = [], []
+
+        def check(item):
+            if item == 3:
+                raise ValueError('bad')
+            return item
+
+        async def scenario():
+            pipeline = Pipeline(
+                [Stage('double', lambda item: item * 2, concurrency=2),
+                 Stage('check', check),
+                 Stage('skip', lambda item: None if item == 4 else item,
+                       blocking=True)],
+                on_done=done.append,
+                on_error=lambda item, error: failed.append((item, error))
+            )
+            async with pipeline:
+                for item in range(1, 4):
+                    await pipeline.put(item)
+                await pipeline.put(1.5)
+
+        asyncio.run(scenario())
+        assert sorted(done) == [2, 6]
+        assert [(item, str(error)) for item, error in failed] == [(3, 'bad')]
+        assert PIPELINE_ITEMS.value(stage='check', result='error') == 1
+        assert PIPELINE_SECONDS.count(stage='double') == 4
+
+    def test_full_queue_blocks_previous_stage(self):
+        gate = threading.Event()
+        done = []
+
+        def stalled(item):
+            gate.wait(5)
+            return item
+
+        async def scenario():
+            pipeline = Pipeline(
+                [Stage('first', lambda item: item, maxsize=1),
+                 Stage('stalled', stalled, maxsize=1, blocking=True)],
+                on_done=done.append
+            )
+            async with pipeline:
+                puts = asyncio.gather(*(pipeline.put(item)
+                                        for item in range(5)))
+                await asyncio.sleep(0.05)
+                assert not puts.done()
+                assert pipeline.snapshot() == {
+                    'first': {'depth': 1, 'busy': 1, 'concurrency': 1},
+                    'stalled': {'depth': 1, 'busy': 1, 'concurrency': 1},
+                }
+                gate.set()
+                await puts
+
+        asyncio.run(scenario())
+        assert done == list(range(5))
@@ -0,0 +1,61 @@
+import pytest
+
+from benchmarks.registry import run_benchmark
+from registry import StatusMap, TenantRegistry
+from scheduler import PollScheduler
+from tenants import Tenant
+
+
+class TestStatusMap:
+    def test_behaves_like_dict(self):
+        statuses = StatusMap({'hw1': 'reviewing', 2: 'approved'})
+        statuses.update({'hw1': 'rejected', 'hw3': 'approved'})
+        statuses['hw4'] = 'reviewing'
+        del statuses['2']
+        assert statuses == {'hw1': 'rejected', 'hw3': 'approved',
+                            'hw4': 'reviewing'}
+        assert statuses.get('missing') is None
+        with pytest.raises(KeyError):
+            statuses['missing']
+        assert statuses.codes == bytes((2, 0, 1))
+
+    def test_homework_keys_are_shared(self):
+        first = StatusMap({''.join(['hw', '1']): 'approved'})
+        second = StatusMap({''.join(['hw', '1']): 'approved'})
+        assert first.homeworks[0] is second.homeworks[0]
+
+
+class TestTenantRegistry:
+    def test_columns_are_keyed_by_tenant(self):
+        registry = TenantRegistry()
+        tenant = Tenant('token', '1')
+        record = registry.add(tenant, 100, {'hw': 'approved'})
+        assert registry.add(tenant) is record
+        assert len(registry) == 1
+        assert registry.timestamps[tenant.key] == 100
+        registry.failures[tenant.key] += 1
+        assert registry.failures[tenant.key] == 1
+        assert registry.statuses[tenant.key] == {'hw': 'approved'}
+        assert registry.due_at.get(tenant.key) is None
+        assert registry.tenant(tenant.key) is tenant
+
+    def test_scheduler_keeps_due_times_in_column(self):
+        registry = TenantRegistry()
+        now = [0.0]
+        scheduler = PollScheduler(base_interval=10, jitter=0,
+                                  clock=lambda: now[0],
+                                  due_at=registry.due_at)
+        for index in range(3):
+            scheduler.add(registry.add(Tenant(f'token{index}',
+                                              str(index))).key)
+        now[0] = 10
+        assert len(scheduler.pop_due()) == 3
+        assert all(registry.due_at.get(key) is None
+                   for key in registry.records)
+        scheduler.reschedule(Tenant('token0', '0').key, {})
+        assert scheduler.wait_time() == pytest.approx(
+            scheduler.idle_interval)
+
+    def test_benchmark_reports_savings(self):
+        report = run_benchmark(tenants=500, seed=1)
+        assert report['registry_bytes'] < report['dicts_bytes']
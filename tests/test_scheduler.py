@@ -0,0 +1,50 @@
+import random
+
+from scheduler import PollScheduler
+from utils import FakeClock
+
+
+def make_scheduler(clock, jitter=0):
+    return PollScheduler(base_interval=600, reviewing_interval=300,
+                         idle_interval=1800, max_backoff=3600,
+                         jitter=jitter, clock=clock, rng=random.Random(1))
+
+
+class TestPollScheduler:
+    def test_interval_adapts_to_statuses_and_errors(self):
+        scheduler = make_scheduler(FakeClock())
+        assert scheduler.interval({'1': 'reviewing', '2': 'approved'}) == 300
+        assert scheduler.interval({'1': 'rejected'}) == 600
+        assert scheduler.interval({'1': 'approved'}) == 1800
+        assert scheduler.interval({}) == 1800
+        assert scheduler.interval({}, failures=1) == 1200
+        assert scheduler.interval({}, failures=10) == 3600
+
+    def test_pop_due_respects_reschedule(self):
+        clock = FakeClock()
+        scheduler = make_scheduler(clock)
+        scheduler.schedule('a', 10)
+        scheduler.schedule('b', 20)
+        scheduler.schedule('a', 30)
+        clock.now = 25
+        assert scheduler.pop_due() == ['b']
+        assert scheduler.wait_time() == 5
+        clock.now = 40
+        assert scheduler.lag() == 10
+        assert scheduler.pop_due() == ['a']
+        assert scheduler.wait_time() is None
+        assert scheduler.due_at == {}
+
+    def test_initial_polls_are_spread(self):
+        clock = FakeClock()
+        scheduler = make_scheduler(clock, jitter=0.1)
+        for key in range(1000):
+            scheduler.add(key)
+        clock.now = 60
+        assert 50 < len(scheduler.pop_due()) < 150
+
+    def test_jitter_bounds(self):
+        clock = FakeClock()
+        scheduler = make_scheduler(clock, jitter=0.1)
+        scheduler.reschedule('a', {'1': 'rejected'})
+        assert 540 <= scheduler.due_at['a'] <= 660
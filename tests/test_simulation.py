@@ -0,0 +1,83 @@
+import random
+
+import engine
+from benchmarks.simulation import (DAY, ScriptedPracticum, make_script,
+                                   run_simulation)
+from clock import VirtualClock, run_virtual
+from delivery import DeliveryQueue, RateLimiter
+from scheduler import PollScheduler
+from tenants import Tenant
+from utils import RecordingBot
+
+
+def test_scripted_api_returns_changes_since_from_date():
+    clock = VirtualClock()
+    script = make_script(clock.time(), DAY, random.Random(1))
+    practicum = ScriptedPracticum(clock, {'token': script})
+    headers = {'Authorization': 'OAuth token'}
+    clock.advance(DAY)
+
+    everything = practicum.get('', headers=headers,
+                               params={'from_date': 0}).json()
+    latest = practicum.get('', headers=headers,
+                           params={'from_date': script[-1].at}).json()
+
+    assert everything['current_date'] == int(clock.time())
+    assert len(everything['homeworks']) == script[-1].homework + 1
+    assert everything['homeworks'][0]['status'] == script[-1].status
+    assert [homework['status'] for homework in latest['homeworks']] == [
+        script[-1].status]
+
+
+def test_every_change_is_delivered_once():
+    report = run_simulation(tenants=5, days=2, seed=1)
+
+    assert report['transitions'] > 0
+    assert report['missed'] == 0
+    assert report['duplicates'] == 0
+    assert report['speedup'] > 100
+
+
+def test_api_errors_do_not_lose_or_repeat_messages():
+    report = run_simulation(tenants=5, days=2, error_rate=0.3, seed=2)
+
+    assert report['errors'] > 0
+    assert report['missed'] == 0
+    assert report['duplicates'] == 0
+
+
+def test_simulation_is_deterministic():
+    first = run_simulation(tenants=3, days=1, error_rate=0.1, seed=3)
+    second = run_simulation(tenants=3, days=1, error_rate=0.1, seed=3)
+
+    assert first['sent'] == second['sent']
+    assert first['polls'] == second['polls']
+
+
+def test_new_messages_wake_outbox(monkeypatch):
+    clock = VirtualClock()
+    sent = []
+    answer = {'homeworks': [{'homework_name': 'hw1', 'status': 'approved'}],
+              'current_date': 1}
+    monkeypatch.setattr(engine, 'request_api_answer',
+                        lambda *args, **kwargs: answer)
+    bot = RecordingBot()
+    bot.send_message = lambda chat_id=None, text=None: sent.append(
+        clock.monotonic())
+    poller = engine.PollingEngine(
+        bot, [Tenant('token', '1')], clock=clock,
+        scheduler=PollScheduler(base_interval=10, clock=clock.monotonic),
+        delivery=DeliveryQueue(bot, clock=clock.monotonic,
+                               limiter=RateLimiter(clock=clock.monotonic)))
+    poller.outbox_tick = 3600
+
+    async def scenario():
+        try:
+            await engine.asyncio.wait_for(poller.run(), 100)
+        except engine.asyncio.TimeoutError:
+            pass
+
+    run_virtual(scenario(), clock)
+
+    assert len(sent) == 1
+    assert sent[0] <= 10
@@ -0,0 +1,92 @@
+import pytest
+
+import storage
+from storage import (MemoryStateStore, OutboxMessage, SQLiteStateStore,
+                     StateStore)
+
+
+@pytest.fixture(params=['memory', 'sqlite'])
+def make_store(request, tmp_path):
+    path = tmp_path / 'state.sqlite3'
+
+    def factory():
+        if request.param == 'memory':
+            return shared
+        return SQLiteStateStore(path, batch_size=100, flush_interval=60)
+
+    shared = MemoryStateStore()
+    return factory
+
+
+class TestStateStore:
+    def test_incomplete_backend_fails_on_creation(self):
+        class NoOutbox(StateStore):
+            def load_all(self):
+                return {}
+
+            def checkpoint(self, tenant, timestamp, statuses=None,
+                           messages=(), not_before=0.0):
+                pass
+
+        with pytest.raises(TypeError, match='claim_messages'):
+            NoOutbox()
+
+    def test_state_survives_restart(self, make_store):
+        store = make_store()
+        store.checkpoint('1:abc', 100, {'hw1': 'reviewing'})
+        store.checkpoint('1:abc', 200, {'hw1': 'approved', 'hw2': 'rejected'})
+        store.checkpoint('2:def', 150)
+        store.close()
+
+        state = make_store().load_all()
+        assert state == {
+            '1:abc': (200, {'hw1': 'approved', 'hw2': 'rejected'}),
+            '2:def': (150, {}),
+        }
+
+    def test_sqlite_writes_are_batched(self, tmp_path):
+        path = tmp_path / 'state.sqlite3'
+        store = SQLiteStateStore(path, batch_size=3, flush_interval=60)
+        reader = SQLiteStateStore(path)
+        store.checkpoint('1:abc', 100)
+        assert reader.load_all() == {}
+        store.checkpoint('1:abc', 200, {'hw1': 'approved', 'hw2': 'approved'})
+        assert reader.load_all()['1:abc'][0] == 200
+        journal_mode, = store.connection.execute(
+            'PRAGMA journal_mode').fetchone()
+        assert journal_mode == 'wal'
+        store.close()
+        reader.close()
+
+    def test_outbox_is_saved_with_checkpoint(self, make_store):
+        store = make_store()
+        message = OutboxMessage('k1', '1', 'Изменился статус')
+        store.checkpoint('1:abc', 100, {'hw1': 'approved'}, [message])
+        store.checkpoint('1:abc', 100, {}, [message])
+        store.close()
+
+        store = make_store()
+        assert store.claim_messages(10, now=0) == [message]
+        assert store.claim_messages(10, now=1) == []
+
+    def test_failed_messages_are_retried_then_dropped(self, make_store,
+                                                      monkeypatch):
+        monkeypatch.setattr(storage, 'OUTBOX_MAX_ATTEMPTS', 2)
+        store = make_store()
+        store.checkpoint('1:abc', 100, {}, [OutboxMessage('k1', '1', 'a'),
+                                           OutboxMessage('k2', '1', 'b')])
+        first, second = store.claim_messages(10, now=0)
+        store.settle([(first, True), (second, False)], now=0)
+        assert store.claim_messages(10, now=1) == []
+
+        retry, = store.claim_messages(10, now=storage.OUTBOX_RETRY)
+        assert retry == second._replace(attempts=1)
+        store.settle([(retry, False)], now=100)
+        assert store.claim_messages(10, now=10 ** 6) == []
+
+    def test_messages_wait_until_not_before(self, make_store):
+        store = make_store()
+        message = OutboxMessage('k1', '1', 'a')
+        store.checkpoint('1:abc', 100, {}, [message], not_before=50)
+        assert store.claim_messages(10, now=49) == []
+        assert store.claim_messages(10, now=50) == [message]
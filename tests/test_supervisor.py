@@ -0,0 +1,99 @@
+import asyncio
+import multiprocessing
+import queue
+import sys
+import time
+
+from supervisor import HashRing, Supervisor, merge_metrics, serve_worker
+from tenants import Tenant
+
+
+def crashing_worker(node, tenants, commands, reports, global_rate):
+    if node == 0:
+        sys.exit(1)
+    time.sleep(30)
+
+
+class FakeEngine:
+    def __init__(self):
+        self.added = []
+
+    async def run(self):
+        await asyncio.Event().wait()
+
+    def add_tenants(self, tenants):
+        self.added.extend(tenants)
+
+    def health(self):
+        return {'tenants': len(self.added)}
+
+
+class TestHashRing:
+    def test_keys_are_spread_and_move_only_from_removed_node(self):
+        tenants = [Tenant(f'token{i}', str(i)) for i in range(2000)]
+        ring = HashRing(range(4))
+        shards = ring.assign(tenants)
+        assert all(300 < len(shard) < 700 for shard in shards.values())
+
+        ring.remove(2)
+        moved = {tenant.key for tenant in shards[2]}
+        for node, shard in ring.assign(tenants).items():
+            kept = {tenant.key for tenant in shards[node]}
+            assert {tenant.key for tenant in shard} - kept <= moved
+
+
+class TestSupervisor:
+    def test_metrics_are_merged_with_worker_label(self):
+        text = ('# HELP bot_polls_total Опросы\n'
+                '# TYPE bot_polls_total counter\n'
+                'bot_polls_total 3\n'
+                'bot_sends_total{result="sent"} 2\n')
+        merged = merge_metrics({0: text, 1: text}).splitlines()
+        assert merged.count('# TYPE bot_polls_total counter') == 1
+        assert 'bot_polls_total{worker="1"} 3' in merged
+        assert 'bot_sends_total{worker="0",result="sent"} 2' in merged
+
+    def test_worker_accepts_tenants_and_reports(self):
+        engine = FakeEngine()
+        commands, reports = queue.Queue(), queue.Queue()
+        commands.put([Tenant('token', '1')])
+
+        async def scenario():
+            try:
+                await asyncio.wait_for(
+                    serve_worker(engine, 7, commands, reports, 0.01), 0.1)
+            except asyncio.TimeoutError:
+                pass
+
+        asyncio.run(scenario())
+        assert engine.added == [Tenant('token', '1')]
+        node, metrics, health = reports.get_nowait()
+        assert node == 7
+        assert '# TYPE' in metrics
+        assert health == {'tenants': 1}
+
+    def test_crashing_worker_is_evicted_and_rebalanced(self):
+        tenants = [Tenant(f'token{i}', str(i)) for i in range(30)]
+        pool = Supervisor(tenants, processes=3, max_restarts=1,
+                          target=crashing_worker,
+                          context=multiprocessing.get_context('fork'))
+        pool.start()
+        try:
+            orphans = list(pool.workers[0].tenants)
+            deadline = time.monotonic() + 10
+            while 0 in pool.workers and time.monotonic() < deadline:
+                pool.workers[0].process.join(1)
+                pool.check()
+            assert sorted(pool.workers) == [1, 2]
+            assert sum(len(worker.tenants)
+                       for worker in pool.workers.values()) == 30
+            handed = []
+            for worker in pool.workers.values():
+                try:
+                    handed.extend(worker.commands.get(timeout=1))
+                except queue.Empty:
+                    pass
+            assert sorted(handed) == sorted(orphans)
+            assert all(node['alive'] for node in pool.health().values())
+        finally:
+            pool.stop()
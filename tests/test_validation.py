@@ -0,0 +1,66 @@
+import asyncio
+
+import engine
+from benchmarks.validation import run_benchmark
+from homework import HOMEWORK_VERDICTS, parse_status
+from storage import MemoryStateStore
+from tenants import Tenant
+from utils import RecordingBot, fast_delivery
+from validation import (MISSING_NAME, MISSING_STATUS, NOT_A_DICT,
+                        UNKNOWN_STATUS, ItemError, render_status,
+                        validate_homeworks)
+
+
+class TestValidateHomeworks:
+    def test_errors_are_returned_per_item(self):
+        good = {'homework_name': 'hw', 'status': 'approved'}
+        valid, errors = validate_homeworks([
+            good, 'hw', {'status': 'approved'}, {'homework_name': 'hw'},
+            {'homework_name': 'hw', 'status': 'lost'},
+            {'homework_name': 'hw', 'status': ['approved']},
+        ])
+        assert valid == [good]
+        assert errors == [
+            ItemError(1, NOT_A_DICT, 'str'),
+            ItemError(2, MISSING_NAME, None),
+            ItemError(3, MISSING_STATUS, None),
+            ItemError(4, UNKNOWN_STATUS, 'lost'),
+            ItemError(5, UNKNOWN_STATUS, ['approved']),
+        ]
+
+    def test_render_matches_parse_status(self):
+        for status in HOMEWORK_VERDICTS:
+            homework = {'homework_name': 'hw {x}', 'status': status}
+            assert render_status(homework) == parse_status(homework)
+
+    def test_benchmark_reports_per_item_cost(self):
+        report = run_benchmark(homeworks=200, invalid_rate=0.1, repeat=1,
+                               seed=1)
+        assert report['invalid'] > 0
+        assert report['batch_ns'] > 0
+        assert report['single_ns'] > 0
+
+
+class TestEngineValidation:
+    def test_broken_homework_does_not_block_others(self, monkeypatch):
+        tenant = Tenant('token', '1')
+        store = MemoryStateStore()
+        store.checkpoint(tenant.key, 500, {})
+        monkeypatch.setattr(
+            engine, 'request_api_answer',
+            lambda timestamp, headers, **kwargs: {
+                'homeworks': [{'homework_name': 'hw1', 'status': 'lost'},
+                              {'homework_name': 'hw2', 'status': 'approved'}],
+                'current_date': 600,
+            }
+        )
+        bot = RecordingBot()
+        poller = engine.PollingEngine(bot, [tenant], store=store,
+                                      delivery=fast_delivery(bot))
+        invalid = engine.INVALID_HOMEWORKS.value(reason=UNKNOWN_STATUS)
+
+        assert asyncio.run(poller.poll_round()) == 0
+        assert [text.split('"')[1] for _, text in bot.sent] == ['hw2']
+        assert engine.INVALID_HOMEWORKS.value(
+            reason=UNKNOWN_STATUS) - invalid == 1
+        assert store.load_all()[tenant.key][0] == 600
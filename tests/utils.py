@@ -5,6 +5,8 @@ from http import HTTPStatus
 from inspect import signature
 from types import ModuleType
 
+from delivery import DeliveryQueue, RateLimiter
+
 
 def check_function(scope: ModuleType, func_name: str, params_qty: int = 0):
     """If scope has a function with specific name and params with qty."""
@@ -103,3 +105,26 @@ class MockTelegramBot:
 
 class BreakInfiniteLoop(Exception):
     pass
+
+
+class FakeClock:
+    def __init__(self, now=0.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class RecordingBot:
+    def __init__(self):
+        self.sent = []
+        self.error = None
+
+    def send_message(self, chat_id=None, text=None, **kwargs):
+        if self.error:
+            raise self.error
+        self.sent.append((chat_id, text))
+
+
+def fast_delivery(bot):
+    return DeliveryQueue(bot, limiter=RateLimiter(1000, 1000))
@@ -0,0 +1,52 @@
+"""Проверка списка домашних работ за один проход без исключений.
+
+В отличие от `parse_status`, который проверяет одну работу и бросает
+исключение, `validate_homeworks` возвращает корректные работы и список
+ошибок: одна испорченная запись не мешает обработать остальные.
+"""
+from collections import namedtuple
+
+from homework import HOMEWORK_VERDICTS, PARSE_STATUS
+
+NOT_A_DICT = 'not_a_dict'
+MISSING_NAME = 'missing_homework_name'
+MISSING_STATUS = 'missing_status'
+UNKNOWN_STATUS = 'unknown_status'
+
+ItemError = namedtuple('ItemError', ('index', 'reason', 'value'))
+
+# Текст сообщения до и после имени работы для каждого известного статуса:
+# склейка строк заметно дешевле `str.format` для кириллицы.
+TEMPLATES = {
+    status: tuple(PARSE_STATUS.replace('{verdicts}', verdict)
+                  .split('{homework_name}'))
+    for status, verdict in HOMEWORK_VERDICTS.items()
+}
+
+
+def validate_homeworks(homeworks):
+    """Корректные работы и ошибки `ItemError` по остальным."""
+    templates = TEMPLATES
+    valid = []
+    errors = []
+    for index, homework in enumerate(homeworks):
+        if not isinstance(homework, dict):
+            errors.append(ItemError(index, NOT_A_DICT,
+                                    type(homework).__name__))
+        elif 'homework_name' not in homework:
+            errors.append(ItemError(index, MISSING_NAME, None))
+        else:
+            status = homework.get('status')
+            if isinstance(status, str) and status in templates:
+                valid.append(homework)
+            elif status is None:
+                errors.append(ItemError(index, MISSING_STATUS, None))
+            else:
+                errors.append(ItemError(index, UNKNOWN_STATUS, status))
+    return valid, errors
+
+
+def render_status(homework):
+    """Сообщение о статусе работы, прошедшей `validate_homeworks`."""
+    prefix, suffix = TEMPLATES[homework['status']]
+    return prefix + str(homework['homework_name']) + suffix